@@ -1,19 +1,70 @@
-import pandas as pd
-import os
-from config import SILVER_DIR, GOLD_DIR, setup_directories
+import argparse
+from config import GOLD_DATASET_DIR, MOEDA_BASE, REPORT_CURRENCIES, setup_directories
+from gold_store import KEY_COLUMNS, write_gold_partition
+from cross_rates import save_cross_rate_matrices
+from metrics import timed, record_rows, record_file_bytes, enable_profiling
+from catalog import silver_catalog
+from silver_store import read_silver
 
-def get_latest_silver_file():
-    """Encontra o arquivo .csv mais recente na pasta SILVER."""
-    try:
-        # Busca por arquivos .csv (mudamos o formato do Silver para CSV)
-        files = [f for f in os.listdir(SILVER_DIR) if f.endswith('_silver.csv')]
-        if not files:
-            return None
-        files.sort(reverse=True)
-        return os.path.join(SILVER_DIR, files[0])
-    except FileNotFoundError:
-        return None
+def get_latest_silver_file(base_currency=MOEDA_BASE):
+    """Encontra o arquivo mais recente da moeda base na pasta SILVER (consulta indexada ao catálogo).
+
+    Sem o filtro, num dia em que só outra moeda base foi coletada o GOLD agregaria o arquivo dela.
+    """
+    return silver_catalog().latest(base_currency=base_currency)
+
+# Colunas do antigo GOLD de relatório (o prefixo BRL_ era fixo, qualquer que fosse a
+# moeda base: "BRL_to_USD" é a taxa base -> USD) e seus nomes no GOLD largo
+LEGACY_COLUMNS = {'BRL_to_USD': 'USD', 'BRL_to_EUR': 'EUR'}
+
+def build_gold(df_silver):
+    """Transforma o DataFrame SILVER (formato longo) no GOLD largo (sem I/O).
+
+    Uma linha por (collected_date, base_currency) e uma coluna por moeda cotada
+    (1 moeda base = N unidades da moeda). Moedas novas viram colunas novas; as
+    que deixam de ser cotadas ficam nulas nas linhas seguintes.
+    """
+
+    # O PIVOT transforma o formato longo (normalizado) em formato largo (analítico)
+    # Por exemplo: cria colunas USD, EUR, etc.
+    df_gold = df_silver.pivot(
+        index=KEY_COLUMNS,
+        columns='currency',
+        values='rate'
+    ).reset_index()
+    df_gold.columns.name = None
+    return df_gold
+
+def report_view(df_gold, currencies=REPORT_CURRENCIES):
+    """Chaves + colunas das moedas do relatório presentes no GOLD (aceita também o esquema antigo).
+
+    Com currencies=None ficam todas as moedas (as colunas antigas já mapeadas).
+    """
+    df_gold = df_gold.copy()
+    for legacy, code in LEGACY_COLUMNS.items():
+        if legacy in df_gold.columns:
+            df_gold[code] = df_gold[code].fillna(df_gold[legacy]) if code in df_gold.columns else df_gold[legacy]
+    if currencies is None:
+        currencies = [col for col in df_gold.columns if col not in KEY_COLUMNS and col not in LEGACY_COLUMNS]
+    return df_gold[KEY_COLUMNS + [code for code in currencies if code in df_gold.columns]]
+
+def save_gold(df_silver, df_gold):
+    """Persiste a camada GOLD: matrizes de taxas cruzadas e dataset Parquet particionado."""
 
+    # Matriz completa de taxas cruzadas (todas as moedas contra todas), calculada
+    # sobre o SILVER completo, antes da seleção de colunas do relatório
+    matrix_files = save_cross_rate_matrices(df_silver)
+    record_file_bytes("gold", "written", *matrix_files)
+    print(f"   Matrizes de taxas cruzadas salvas em: {', '.join(matrix_files)}")
+
+    # O Parquet é o formato mais eficiente para Engenharia de Dados
+    written = write_gold_partition(df_gold, root=GOLD_DATASET_DIR)
+    record_rows("gold", "written", len(df_gold))
+    record_file_bytes("gold", "written", *written)
+    print(f"   [SUCESSO] Dados agregados salvos em: {', '.join(written)} (Formato PARQUET)")
+    return written
+
+@timed("gold")
 def aggregate_and_save_gold():
     """Lê o Silver (DataFrame), agrega e salva na camada GOLD (Parquet)."""
     
@@ -28,42 +79,24 @@ def aggregate_and_save_gold():
     
     print(f"   Lendo dados de: {silver_path}")
     try:
-        # Lê o CSV normalizado para um DataFrame
-        df_silver = pd.read_csv(silver_path)
+        # Lê o arquivo normalizado (memory map no Arrow); de um pacote, só o último dia
+        df_silver = read_silver(silver_path, start_date=silver_catalog().latest_date())
+        record_rows("gold", "read", len(df_silver))
+        record_file_bytes("gold", "read", silver_path)
     except Exception as e:
         print(f"[ERRO] Falha ao ler o arquivo SILVER: {e}")
         return
 
     # 2. AGREGAÇÃO / PREPARAÇÃO PARA ANÁLISE (GOLD LÓGICA)
-    
-    # O PIVOT transforma o formato longo (normalizado) em formato largo (analítico)
-    # Por exemplo: cria colunas USD, EUR, etc.
-    df_gold = df_silver.pivot(
-        index=['collected_date', 'base_currency'],
-        columns='currency',
-        values='rate'
-    ).reset_index()
+    df_gold = build_gold(df_silver)
 
-    # Exemplo de cálculo Gold: Taxa de USD para EUR
-    if 'USD' in df_gold.columns and 'EUR' in df_gold.columns:
-        df_gold['USD_to_EUR'] = df_gold['EUR'] / df_gold['USD']
-        
-    # Renomeia as colunas para o formato final de relatório
-    df_gold.rename(columns={'USD': 'BRL_to_USD', 'EUR': 'BRL_to_EUR'}, inplace=True)
-    
-    # Seleciona apenas as colunas do relatório final
-    gold_columns = ['collected_date', 'base_currency', 'BRL_to_USD', 'BRL_to_EUR', 'USD_to_EUR']
-    df_gold = df_gold[[col for col in gold_columns if col in df_gold.columns]]
-
-    # 3. Salva na camada GOLD em formato PARQUET
-    filename_from_silver = os.path.basename(silver_path).replace("_silver.csv", "")
-    gold_file_path = os.path.join(GOLD_DIR, f"{filename_from_silver}_gold.parquet")
-    
-    # O Parquet é o formato mais eficiente para Engenharia de Dados
-    df_gold.to_parquet(gold_file_path, index=False)
-        
-    print(f"   [SUCESSO] Dados agregados salvos em: {gold_file_path} (Formato PARQUET)")
+    # 3. Salva na camada GOLD (matrizes de taxas cruzadas + dataset Parquet)
+    save_gold(df_silver, df_gold)
     print("--- AGREGAÇÃO GOLD CONCLUÍDA ---")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregação da camada GOLD.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    if parser.parse_args().profile:
+        enable_profiling()
     aggregate_and_save_gold()
\ No newline at end of file
@@ -1,151 +1,366 @@
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
+import json
+import hashlib
+import argparse
 from datetime import datetime, timedelta
-from google import genai
-from google.genai.errors import APIError
-from config import GOLD_DIR, GEMINI_API_KEY, setup_directories
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import (
+    LLM_MODEL, MOEDA_BASE, GOLD_DATASET_DIR, REPORTS_DIR, REPORT_CURRENCIES, REPORT_MAX_GAP_DAYS, setup_directories,
+)
+from gold_store import query_gold, gold_partition_files
+from aggregate_gold import report_view
+from gold_index import GoldIndex, PERIODS, CHANGE_SUFFIXES
+from llm import generate_text, get_cache, stream_printer
+from llm_prompt import compact_rates_table, comparison_changes, gold_rates
+from metrics import timed, record_file_bytes, enable_profiling
 
-# Configuração de estilo do Matplotlib
-plt.style.use('ggplot') 
+# Os gráficos usam o backend Agg diretamente (Figure + FigureCanvasAgg), sem o
+# estado global do pyplot: cada processo mantém UMA Figure e apenas limpa os eixos
+# entre um gráfico e outro, o que permite renderizar em lote num pool de processos.
+RENDER_STATE_FILE = "_render_state.json"
+# Versão do layout do gráfico: alterá-la força a regeração de todos os PNGs
+RENDER_VERSION = "1"
+FIGSIZE = (10, 6)
 
-# Função utilitária para carregar o arquivo Parquet de uma data específica
-def load_gold_data(date: datetime):
-    """Tenta carregar o arquivo Parquet para a data fornecida."""
-    date_str = date.strftime("%Y-%m-%d")
-    
-    # Busca o arquivo pelo padrão de nome (ex: 2025-09-29_gold.parquet)
-    # Procuramos o arquivo que começa com a data_str
-    try:
-        files = [f for f in os.listdir(GOLD_DIR) if f.startswith(date_str) and f.endswith('_gold.parquet')]
-        if not files:
-            return None
-            
-        file_path = os.path.join(GOLD_DIR, files[0])
-        return pd.read_parquet(file_path)
-    except Exception as e:
-        print(f"   [AVISO] Falha ao carregar dados de {date_str}: {e}")
-        return None
-
-def generate_comparison_report():
-    """Compara o câmbio de hoje com o de ontem, gera gráfico e análise LLM."""
-    
-    setup_directories()
-    print("--- INICIANDO ANÁLISE COMPARATIVA ---")
+_figure = None  # Figure reaproveitada por todos os gráficos do processo
+_layout_key = None  # textos (título, rótulos, eixo y) do último tight_layout (as margens continuam valendo)
+
+
+def _get_axes():
+    """Eixos limpos da Figure do processo (criada, com backend Agg, no primeiro uso)."""
+    global _figure
+    if _figure is None:
+        # Import tardio: o matplotlib só é carregado quando há gráfico a gerar
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        # Configuração de estilo do Matplotlib
+        matplotlib.style.use('ggplot')
+        _figure = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(_figure)
+        _figure.add_subplot()
+    ax = _figure.axes[0]
+    ax.clear()
+    return ax
+
+def render_chart(report_path, title, labels, values):
+    """Desenha o gráfico de barras das variações % e salva o PNG em report_path."""
+    ax = _get_axes()
+    positions = np.arange(len(values))
+    colors = ['g' if x >= 0 else 'r' for x in values] # Verde para alta, vermelho para baixa
+    ax.bar(positions, values, width=0.5, color=colors)
 
-    # 1. Definir Datas
-    TODAY = datetime.now().date()
-    YESTERDAY = TODAY - timedelta(days=1)
+    ax.set_title(title, fontsize=14)
+    ax.set_ylabel('Variação %')
+    ax.set_xlabel('Taxa de Câmbio')
+    ax.set_xticks(positions)
+    ax.set_xticklabels(labels, rotation=45, ha='right')
+
+    # O tight_layout é a parte mais cara do desenho: como as margens só dependem
+    # dos textos, ele é refeito apenas quando os rótulos, os valores do eixo y
+    # (formatados como no desenho) ou o tamanho do título mudam
+    global _layout_key
+    y_ticks = ax.yaxis.get_major_formatter().format_ticks(ax.get_yticks())
+    layout_key = (len(title), tuple(labels), tuple(y_ticks))
+    if _layout_key != layout_key:
+        ax.figure.tight_layout()
+        _layout_key = layout_key
+    ax.figure.savefig(report_path)
+    return report_path
+
+def _render_jobs(jobs):
+    """Desenha uma lista de gráficos; uma falha não interrompe os demais: [(caminho ou None, erro ou None)]."""
+    results = []
+    for job in jobs:
+        try:
+            results.append((render_chart(*job), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+def chart_title(base_currency, report_date, reference_date):
+    """Título com as duas datas comparadas: a referência as-of pode ser a sexta ou vários dias antes."""
+    return (f'Variação Percentual do Câmbio (Base {base_currency}): '
+            f'{report_date:%d/%m/%Y} vs {reference_date:%d/%m/%Y}')
+
+def report_filename(report_date, base_currency=MOEDA_BASE):
+    """exchange_report_YYYYMMDD.png para a base padrão, exchange_report_YYYYMMDD_<BASE>.png para as demais."""
+    if base_currency == MOEDA_BASE:
+        return f'exchange_report_{report_date.strftime("%Y%m%d")}.png'
+    return f'exchange_report_{report_date.strftime("%Y%m%d")}_{base_currency}.png'
+
+def build_comparison(df_today, df_yesterday):
+    """Taxas de hoje e variação % (colunas *_CHANGE_PCT) contra ontem, uma linha por moeda base."""
+    # Seleciona as colunas de taxas para o cálculo (exclui datas e moedas base)
+    rate_cols = [col for col in df_today.columns if col not in ['collected_date', 'base_currency']]
     
-    # --- Configuração do LLM (Copiado do enrich_llm.py) ---
-    LLM_MODEL = 'gemini-2.5-flash' # Definindo o modelo aqui
+    # Garante que os DataFrames têm a mesma estrutura para a comparação
+    # (moedas que ontem não eram cotadas ficam sem variação)
+    df_comp = pd.merge(df_today, df_yesterday.reindex(columns=df_today.columns), on='base_currency',
+                       suffixes=('_today', '_yesterday'))
+    today = df_comp[[f'{col}_today' for col in rate_cols]].to_numpy(dtype='float64', na_value=np.nan)
+    yesterday = df_comp[[f'{col}_yesterday' for col in rate_cols]].to_numpy(dtype='float64', na_value=np.nan)
 
-    try:
-        if not GEMINI_API_KEY:
-            raise ValueError("A chave GEMINI_API_KEY não foi encontrada no .env.")
+    # Variação % = ((Hoje - Ontem) / Ontem) * 100, todas as moedas de uma vez
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (today - yesterday) / yesterday * 100
+
+    # Calcula a variação percentual para cada moeda e mantém o valor atual (necessário para o LLM)
+    columns = {'collected_date': df_comp['collected_date_today'], 'base_currency': df_comp['base_currency']}
+    for i, col in enumerate(rate_cols):
+        columns[f'{col}_CHANGE_PCT'] = change[:, i]
+        columns[col] = today[:, i]
+    return pd.DataFrame(columns)
+
+@timed("report")
+def generate_comparison_report(report_date=None, df_today=None, df_yesterday=None, use_llm=True):
+    """Compara o câmbio de hoje com o de ontem, gera gráfico e análise LLM.
+
+    report_date permite gerar o relatório de outro dia (padrão: hoje). Os
+    DataFrames GOLD podem ser entregues já em memória (ex: pelo run_pipeline);
+    os que faltarem são lidos do dataset GOLD.
+    """
     
-        client = genai.Client(api_key=GEMINI_API_KEY)
-    except ValueError as e:
-        print(f"[ERRO DE CONFIGURAÇÃO] {e}")
-        client = None
+    setup_directories()
+    print("--- INICIANDO ANÁLISE COMPARATIVA ---")
 
-    # 2. Carregar Dados
-    df_today = load_gold_data(datetime.combine(TODAY, datetime.min.time()))
-    df_yesterday = load_gold_data(datetime.combine(YESTERDAY, datetime.min.time()))
+    # 1. Definir Datas e carregar o GOLD recente, indexado por data (as-of)
+    TODAY = report_date or datetime.now().date()
+    index = GoldIndex.load(TODAY)
 
+    # 2. Dados do dia: os que vieram em memória ou a última observação até a data.
+    # O relatório (gráfico, título, LLM e nome do arquivo) é sempre o da moeda base padrão
     if df_today is None:
-        print(f"[ERRO] Não há dados GOLD para hoje ({TODAY}). Execute a pipeline completa primeiro.")
+        df_today = index.frame_as_of(TODAY, bases=[MOEDA_BASE])
+    else:
+        df_today = df_today[df_today['base_currency'] == MOEDA_BASE]
+    if df_today is None or df_today.empty:
+        print(f"[ERRO] Não há dados GOLD em ou até {REPORT_MAX_GAP_DAYS} dias antes de {TODAY}. Execute a pipeline completa primeiro.")
         return
-    
+    observed = pd.Timestamp(df_today['collected_date'].iloc[0]).date()
+    if observed != TODAY:
+        print(f"   [AVISO] Sem dados GOLD em {TODAY}; usando a última observação ({observed}).")
+
+    # Referência: última observação anterior ao dia observado (na segunda-feira, a sexta)
     if df_yesterday is None:
-        print(f"[ERRO] Não há dados GOLD para ontem ({YESTERDAY}). Impossível comparar. Crie o arquivo histórico.")
-        # Se não houver ontem, apenas gera o gráfico de hoje (opcional)
-        df_comparison = df_today 
+        df_yesterday = index.frame_as_of(observed - timedelta(days=1), bases=[MOEDA_BASE])
     else:
-        # 3. Calcular Variação Percentual
-        print("   Comparando dados de hoje com o dia anterior...")
-        
-        # Seleciona as colunas de taxas para o cálculo (exclui datas e moedas base)
-        rate_cols = [col for col in df_today.columns if col not in ['collected_date', 'base_currency']]
-        
-        # Garante que os DataFrames têm a mesma estrutura para a comparação
-        df_comp = pd.merge(df_today, df_yesterday, on='base_currency', suffixes=('_today', '_yesterday'))
-        
-        # Calcula a variação percentual para cada moeda
-        df_comparison = pd.DataFrame()
-        df_comparison['collected_date'] = df_comp['collected_date_today']
-        df_comparison['base_currency'] = df_comp['base_currency']
-        
-        for col in rate_cols:
-            col_today = f'{col}_today'
-            col_yesterday = f'{col}_yesterday'
-            
-            # Variação % = ((Hoje - Ontem) / Ontem) * 100
-            df_comparison[f'{col}_CHANGE_PCT'] = (
-                (df_comp[col_today] - df_comp[col_yesterday]) / df_comp[col_yesterday]
-            ) * 100
-            
-            # Adiciona o valor atual para referência (necessário para o LLM)
-            df_comparison[col] = df_comp[col_today]
-        
-        print("   Cálculo de variação percentual concluído.")
-        
+        df_yesterday = df_yesterday[df_yesterday['base_currency'] == MOEDA_BASE]
+    if df_yesterday.empty:
+        print(f"[ERRO] Não há dados GOLD anteriores a {observed} para comparar.")
+        return
+    YESTERDAY = pd.Timestamp(df_yesterday['collected_date'].iloc[0]).date()
+
+    # O GOLD guarda todas as moedas: o gráfico usa só as de REPORT_CURRENCIES, e o
+    # LLM recebe também as de maior variação (llm_prompt.compact_rates_table)
+    df_today = report_view(df_today, currencies=None)
+    df_yesterday = report_view(df_yesterday, currencies=None)
+
+    print(f"   Comparando {observed} com a observação anterior ({YESTERDAY})...")
+    # 3. Calcular Variação Percentual (DoD no gráfico; WoW e MoM também seguem para o LLM)
+    df_comparison = build_comparison(df_today, df_yesterday)
+    for period in ("WoW", "MoM"):
+        df_reference = report_view(index.frame_as_of(pd.Timestamp(observed) - PERIODS[period], bases=[MOEDA_BASE]),
+                                   currencies=None)
+        if not df_reference.empty:
+            df_changes = build_comparison(df_today, df_reference).filter(regex='^base_currency$|_CHANGE_PCT$')
+            df_changes.columns = [col.replace('_CHANGE_PCT', CHANGE_SUFFIXES[period]) for col in df_changes.columns]
+            df_comparison = df_comparison.merge(df_changes, on='base_currency', how='left')
+    print("   Cálculo de variação percentual concluído.")
+
     # --- 4. Geração do Gráfico ---
-    plot_data = df_comparison.filter(regex='_CHANGE_PCT$').iloc[0] # Pega a primeira linha com as variações
+    plot_columns = [f'{code}_CHANGE_PCT' for code in REPORT_CURRENCIES if f'{code}_CHANGE_PCT' in df_comparison.columns]
+    plot_data = df_comparison[plot_columns].iloc[0] # Pega a primeira linha com as variações
     
     # Remove colunas que são NaN ou desnecessárias
     plot_data.dropna(inplace=True) 
     
-    plt.figure(figsize=(10, 6))
-    colors = ['g' if x >= 0 else 'r' for x in plot_data] # Verde para alta, vermelho para baixa
-    plot_data.plot(kind='bar', color=colors)
-    
-    plt.title(f'Variação Percentual do Câmbio (Base {df_today["base_currency"].iloc[0]}): Hoje vs Ontem', fontsize=14)
-    plt.ylabel('Variação %')
-    plt.xlabel('Taxa de Câmbio')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    
     # Salva o gráfico
-    report_file_name = f'exchange_report_{TODAY.strftime("%Y%m%d")}.png'
+    report_file_name = report_filename(observed, MOEDA_BASE)
     report_path = os.path.join(os.getcwd(), report_file_name) # Salva na raiz do projeto
-    plt.savefig(report_path)
-    plt.close()
+    render_chart(report_path, chart_title(df_today["base_currency"].iloc[0], observed, YESTERDAY),
+                 list(plot_data.index), plot_data.to_numpy())
+    record_file_bytes("report", "written", report_path)
     
     print(f"   [SUCESSO] Gráfico de variação salvo em: {report_path}")
 
     # --- 5. Enriquecimento com LLM (Com dados de variação) ---
-    if client:
-        print("   Enviando dados de variação para o LLM...")
-        
-        # Converte a comparação para Markdown para o LLM
-        llm_input_data = df_comparison.to_markdown(index=False)
-        
-        prompt = f"""
-        A tabela abaixo contém as taxas de câmbio de hoje e a variação percentual (colunas com '_CHANGE_PCT') em relação ao dia anterior (Base: BRL).
+    # O cliente Gemini só é criado pela camada llm.py se a resposta não estiver em cache
+    if not use_llm:
+        print("--- ANÁLISE COMPARATIVA CONCLUÍDA ---")
+        return report_path
 
-        Dados para Análise:
-        {llm_input_data}
+    print("   Enviando dados de variação para o LLM...")
+    from google.genai.errors import APIError
+    
+    # Tabela compacta: moedas do relatório + as de maior variação, dentro do orçamento de tokens
+    base_currency = df_today["base_currency"].iloc[0]
+    llm_input_data = compact_rates_table(gold_rates(df_today), comparison_changes(df_comparison.iloc[0]))
+    
+    prompt = f"""
+    A tabela abaixo (separada por ';') contém as taxas de câmbio de {observed} (1 {base_currency} = taxa unidades da moeda) e a variação percentual em relação ao dia anterior (DoD%), à semana anterior (WoW%) e ao mês anterior (MoM%); '-' indica variação sem referência. Estão as moedas do relatório ({', '.join(REPORT_CURRENCIES)}) e as de maior variação no dia.
 
-        Crie uma Explicação Executiva em linguagem natural, com no máximo 5 linhas, que interprete a variação percentual das moedas (USD, EUR, JPY) e resuma se o Real se valorizou ou desvalorizou mais significativamente em relação a elas.
-        """
-        try:
-            response = client.models.generate_content(
-                model=LLM_MODEL,
-                contents=prompt
-            )
+    Dados para Análise:
+    {llm_input_data}
 
+    Crie uma Explicação Executiva em linguagem natural, com no máximo 5 linhas, que interprete a variação percentual das moedas do relatório, destaque as maiores variações e resuma se o {base_currency} se valorizou ou desvalorizou mais significativamente em relação a elas.
+    """
+    try:
+        # A resposta é impressa em streaming, à medida que os trechos chegam
+        analysis = generate_text(
+            prompt,
+            model=LLM_MODEL,
+            source_paths=gold_partition_files(YESTERDAY, observed),
+            on_text=stream_printer("✨ ANÁLISE EXECUTIVA (LLM) ✨"),
+        )
+        if analysis is None:
+            print("[AVISO] O LLM não pode ser utilizado pois a chave de API está ausente ou inválida.")
+        else:
             print("\n" + "="*50)
-            print("          ✨ ANÁLISE EXECUTIVA (LLM) ✨")
-            print("="*50)
-            print(response.text)
-            print("="*50)
-
-        except APIError as e:
-            print(f"[ERRO DE API DO LLM] Falha ao comunicar com a API Gemini: {e}")
-            
+            print(f"   Cache LLM: {get_cache().save_stats()}")
+
+    except APIError as e:
+        print(f"[ERRO DE API DO LLM] Falha ao comunicar com a API Gemini: {e}")
+        
     print("--- ANÁLISE COMPARATIVA CONCLUÍDA ---")
+    return report_path
 
 
+# --- Renderização em lote (intervalo de datas × moedas base) ---
+
+def chart_hash(title, labels, values):
+    """Impressão digital dos dados de um gráfico (e da versão do layout)."""
+    digest = hashlib.sha256()
+    for part in (RENDER_VERSION, title, "\0".join(labels)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\0")
+    digest.update(np.asarray(values, dtype='float64').tobytes())
+    return digest.hexdigest()
+
+def load_render_state(output_dir=REPORTS_DIR):
+    try:
+        with open(os.path.join(output_dir, RENDER_STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_render_state(state, output_dir=REPORTS_DIR):
+    path = os.path.join(output_dir, RENDER_STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def build_chart_jobs(df_gold, start_date, end_date, bases=None, output_dir=REPORTS_DIR):
+    """Um gráfico por (dia observado, moeda base) do intervalo que tenha observação anterior no GOLD.
+
+    A referência de cada dia é a última observação anterior a ele (as-of), então
+    segundas-feiras e dias após falhas de coleta comparam com o último dia cotado.
+    Retorna {(data, moeda base): (caminho, título, rótulos, valores)} e a lista de pares sem referência.
+    """
+    index = GoldIndex(report_view(df_gold))
+    labels = np.array([f'{col}_CHANGE_PCT' for col in index.columns])
+    start, end = np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')
+
+    jobs, missing = {}, []
+    for base_currency in (b for b in index.bases() if not bases or b in bases):
+        days = index.dates(base_currency)
+        days = days[(days >= start) & (days <= end)]
+        # Todas as datas da moeda base de uma vez: busca binária da observação anterior
+        _, references, changes = index.compare(base_currency, days, days - np.timedelta64(1, 'D'), REPORT_MAX_GAP_DAYS)
+        for day, reference, row in zip(days.astype(object), references, changes):
+            if np.isnat(reference):
+                missing.append((day, base_currency))
+                continue
+            valid = ~np.isnan(row)
+            path = os.path.join(output_dir, report_filename(day, base_currency))
+            jobs[(day.isoformat(), base_currency)] = (
+                path, chart_title(base_currency, day, pd.Timestamp(reference).date()), list(labels[valid]), row[valid],
+            )
+    return jobs, sorted(missing)
+
+@timed("report")
+def render_reports(start_date, end_date=None, bases=None, max_workers=None, force=False,
+                   output_dir=REPORTS_DIR, gold_root=GOLD_DATASET_DIR):
+    """Gera os gráficos de variação de cada (dia, moeda base) do intervalo em um pool de processos.
+
+    O GOLD do intervalo é lido uma única vez. Gráficos cujos dados (e versão do
+    layout) têm o mesmo hash da última renderização são pulados, a menos que
+    force=True. Retorna {(data, moeda base): caminho do PNG} dos gráficos gerados.
+    """
+    start = pd.Timestamp(start_date).date()
+    end = pd.Timestamp(end_date).date() if end_date is not None else start
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"--- INICIANDO RENDERIZAÇÃO EM LOTE ({start} a {end}) ---")
+
+    # Dias antes do início: referências as-of dos primeiros dias do intervalo
+    df_gold = query_gold(start - timedelta(days=REPORT_MAX_GAP_DAYS + 1), end, root=gold_root)
+    if df_gold.empty:
+        print("[ERRO] Não há dados GOLD no intervalo. Execute a pipeline completa primeiro.")
+        return {}
+    jobs, missing = build_chart_jobs(df_gold, start, end, bases, output_dir)
+    for day, base_currency in missing:
+        print(f"   [AVISO] {day} {base_currency}: sem observação anterior para comparar, gráfico não gerado.")
+
+    state = load_render_state(output_dir)
+    pending, hashes = {}, {}
+    for key, job in jobs.items():
+        name = os.path.basename(job[0])
+        hashes[name] = chart_hash(*job[1:])
+        if force or state.get(name) != hashes[name] or not os.path.exists(job[0]):
+            pending[key] = job
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending)))
+    print(f"   {len(pending)} gráficos a gerar ({len(jobs) - len(pending)} inalterados), {workers} processos...")
+    items = list(pending.items())
+    if workers == 1:
+        results = _render_jobs([job for _, job in items])
+    else:
+        # Lotes grandes por processo: a Figure de cada worker é reaproveitada entre eles
+        chunksize = max(1, len(items) // (workers * 4))
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render_jobs, [job for _, job in chunk]) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    # Processo do pool encerrado no meio do lote
+                    results.extend((None, f"{type(e).__name__}: {e}") for _ in chunk)
+
+    # O estado é gravado para os gráficos desenhados, mesmo que outros tenham falhado
+    rendered = {}
+    for (key, job), (path, error) in zip(items, results):
+        if error is not None:
+            print(f"   [ERRO] {key[0]} {key[1]}: falha ao gerar o gráfico: {error}")
+            continue
+        rendered[key] = path
+        state[os.path.basename(path)] = hashes[os.path.basename(path)]
+    save_render_state(state, output_dir)
+    record_file_bytes("report", "written", *rendered.values())
+
+    print(f"--- RENDERIZAÇÃO CONCLUÍDA ({len(rendered)} de {len(pending)} gráficos em: {output_dir}) ---")
+    return rendered
+
 if __name__ == "__main__":
-    generate_comparison_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Relatório comparativo (gráfico + análise LLM).")
+    parser.add_argument("--start", help="Modo em lote: data inicial (YYYY-MM-DD), apenas gráficos.")
+    parser.add_argument("--end", help="Modo em lote: data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    parser.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: todas do GOLD).")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos da renderização em lote.")
+    parser.add_argument("--force", action="store_true", help="Regera também os gráficos inalterados.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    if args.start:
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        render_reports(args.start, args.end, bases=bases, max_workers=args.workers, force=args.force)
+    else:
+        generate_comparison_report()
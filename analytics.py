@@ -0,0 +1,238 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from config import CROSS_RATES_DIR, ANALYTICS_DIR, ANALYTICS_WINDOWS, MOEDA_BASE, setup_directories
+from cross_rates import load_currency_index, load_cross_rate_matrix, currency_index_path
+from catalog import matrix_catalog
+
+# Motor de séries temporais sobre o histórico GOLD: volatilidade, médias móveis,
+# mínimo/máximo, variação percentual e drawdown em janelas de N dias, para todas
+# as moedas ao mesmo tempo (uma coluna por moeda, uma linha por dia).
+
+
+def list_history_dates(base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    """Datas (YYYY-MM-DD) com matriz de taxas cruzadas para a moeda base, em ordem."""
+    return [entry["date"] for entry in matrix_catalog(directory).entries(base_currency=base)]
+
+def load_rate_vector(date_str, codes, base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    """Taxas BASE -> moeda de um dia, alinhadas ao índice global (NaN onde não há dado).
+
+    Lê apenas a linha da moeda base da matriz (memory-map).
+    """
+    matrix = load_cross_rate_matrix(date_str, base, directory)
+    vector = np.full(len(codes), np.nan)
+    base_id = codes.index(base)
+    if base_id < matrix.shape[0]:
+        vector[:matrix.shape[1]] = matrix[base_id]
+    return vector
+
+def load_rate_history(base=MOEDA_BASE, directory=CROSS_RATES_DIR, start=None):
+    """Carrega o histórico inteiro de uma vez como DataFrame (dias × moedas)."""
+    codes = load_currency_index(currency_index_path(directory))
+    dates = [d for d in list_history_dates(base, directory) if start is None or d >= start]
+    if not dates or base not in codes:
+        return pd.DataFrame(columns=codes)
+
+    rates = np.vstack([load_rate_vector(d, codes, base, directory) for d in dates])
+    return pd.DataFrame(rates, index=pd.to_datetime(dates), columns=codes)
+
+def compute_rolling_stats(df_rates, window):
+    """Estatísticas móveis vetorizadas sobre todo o histórico (pandas rolling).
+
+    Retorna um DataFrame com MultiIndex de colunas (estatística, moeda).
+    """
+    log_returns = np.log(df_rates / df_rates.shift(1))
+    rolling = df_rates.rolling(window, min_periods=1)
+    rolling_max = rolling.max()
+
+    stats = {
+        "rate": df_rates,
+        f"ma_{window}": rolling.mean(),
+        f"min_{window}": rolling.min(),
+        f"max_{window}": rolling_max,
+        # Desvio padrão dos retornos logarítmicos diários, em %
+        f"volatility_{window}": log_returns.rolling(window, min_periods=2).std() * 100,
+        f"pct_change_{window}": (df_rates / df_rates.shift(window - 1) - 1) * 100,
+        f"drawdown_{window}": (df_rates / rolling_max - 1) * 100,
+    }
+    return pd.concat(stats, axis=1)
+
+
+class RollingState:
+    """Estado incremental das estatísticas móveis de uma janela.
+
+    Guarda um buffer circular (janela × moedas) e somas acumuladas, então
+    acrescentar um dia custa O(moedas): soma/soma dos quadrados dos retornos e
+    soma das taxas são atualizadas subtraindo o dia que sai da janela.
+    """
+
+    def __init__(self, window, n_currencies=0):
+        self.window = window
+        self.last_date = None
+        # Maior mtime das matrizes já aplicadas: uma matriz antiga regravada depois disso invalida o estado
+        self.synced_mtime = 0.0
+        self.pos = 0
+        self.count = 0
+        self.rates = np.full((window, n_currencies), np.nan)
+        self.returns = np.full((window, n_currencies), np.nan)
+        self.last_rate = np.full(n_currencies, np.nan)
+        self.sum_rate = np.zeros(n_currencies)
+        self.cnt_rate = np.zeros(n_currencies)
+        self.sum_ret = np.zeros(n_currencies)
+        self.sumsq_ret = np.zeros(n_currencies)
+        self.cnt_ret = np.zeros(n_currencies)
+
+    def _grow(self, n_currencies):
+        """Acomoda moedas novas no índice (colunas extras começam vazias)."""
+        extra = n_currencies - self.rates.shape[1]
+        if extra <= 0:
+            return
+        pad_2d = np.full((self.window, extra), np.nan)
+        self.rates = np.hstack([self.rates, pad_2d])
+        self.returns = np.hstack([self.returns, pad_2d.copy()])
+        self.last_rate = np.concatenate([self.last_rate, np.full(extra, np.nan)])
+        for name in ("sum_rate", "cnt_rate", "sum_ret", "sumsq_ret", "cnt_ret"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra)]))
+
+    @staticmethod
+    def _add(total, count, values, sign, squares=None):
+        valid = ~np.isnan(values)
+        total[valid] += sign * values[valid]
+        count[valid] += sign
+        if squares is not None:
+            squares[valid] += sign * values[valid] ** 2
+
+    def update(self, date_str, vector):
+        """Acrescenta um dia ao estado em O(moedas)."""
+        self._grow(len(vector))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_return = np.log(vector / self.last_rate)
+
+        # Retira da janela o dia mais antigo (posição que será sobrescrita)
+        self._add(self.sum_rate, self.cnt_rate, self.rates[self.pos], -1)
+        self._add(self.sum_ret, self.cnt_ret, self.returns[self.pos], -1, self.sumsq_ret)
+
+        self.rates[self.pos] = vector
+        self.returns[self.pos] = log_return
+        self._add(self.sum_rate, self.cnt_rate, vector, +1)
+        self._add(self.sum_ret, self.cnt_ret, log_return, +1, self.sumsq_ret)
+
+        self.last_rate = np.array(vector, dtype=np.float64)
+        self.pos = (self.pos + 1) % self.window
+        self.count += 1
+        self.last_date = date_str
+
+    def snapshot(self, codes):
+        """Estatísticas da janela atual para todas as moedas (uma linha por moeda)."""
+        n = len(codes)
+        self._grow(n)
+        w = self.window
+        latest = self.rates[(self.pos - 1) % w]
+        # Com a janela cheia, a posição atual do buffer guarda o dia mais antigo
+        oldest = self.rates[self.pos] if self.count >= w else np.full(n, np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ma = self.sum_rate / self.cnt_rate
+            variance = (self.sumsq_ret - self.sum_ret ** 2 / self.cnt_ret) / (self.cnt_ret - 1)
+            volatility = np.sqrt(np.clip(variance, 0, None)) * 100
+            volatility[self.cnt_ret < 2] = np.nan
+            rolling_max = np.max(np.where(np.isnan(self.rates), -np.inf, self.rates), axis=0)
+            rolling_min = np.min(np.where(np.isnan(self.rates), np.inf, self.rates), axis=0)
+            rolling_max[np.isinf(rolling_max)] = np.nan
+            rolling_min[np.isinf(rolling_min)] = np.nan
+
+            return pd.DataFrame({
+                "rate": latest,
+                f"ma_{w}": ma,
+                f"min_{w}": rolling_min,
+                f"max_{w}": rolling_max,
+                f"volatility_{w}": volatility,
+                f"pct_change_{w}": (latest / oldest - 1) * 100,
+                f"drawdown_{w}": (latest / rolling_max - 1) * 100,
+            }, index=pd.Index(codes, name="currency"))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path, window=self.window, pos=self.pos, count=self.count, last_date=self.last_date or "",
+            synced_mtime=self.synced_mtime,
+            rates=self.rates, returns=self.returns, last_rate=self.last_rate,
+            sum_rate=self.sum_rate, cnt_rate=self.cnt_rate, sum_ret=self.sum_ret,
+            sumsq_ret=self.sumsq_ret, cnt_ret=self.cnt_ret,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        state = cls(int(data["window"]))
+        state.pos = int(data["pos"])
+        state.count = int(data["count"])
+        state.last_date = str(data["last_date"]) or None
+        # Estados gravados antes do synced_mtime são recalculados uma vez
+        state.synced_mtime = float(data["synced_mtime"]) if "synced_mtime" in data.files else 0.0
+        for name in ("rates", "returns", "last_rate", "sum_rate", "cnt_rate", "sum_ret", "sumsq_ret", "cnt_ret"):
+            setattr(state, name, data[name])
+        return state
+
+
+def state_path(window, base=MOEDA_BASE, directory=ANALYTICS_DIR):
+    return os.path.join(directory, f"rolling_{base}_{window}d.npz")
+
+def refresh_rolling_state(window, base=MOEDA_BASE, rates_dir=CROSS_RATES_DIR, state_dir=ANALYTICS_DIR):
+    """Atualiza o estado persistido apenas com os dias GOLD ainda não vistos.
+
+    Na primeira execução todo o histórico é percorrido uma vez; depois, cada dia
+    novo custa O(moedas). Se um dia anterior ao último aplicado foi acrescentado
+    (backfill) ou regravado, o buffer incremental não tem como inseri-lo no meio:
+    o estado é recalculado do zero. Retorna (estado, códigos das moedas).
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    path = state_path(window, base, state_dir)
+    state = RollingState.load(path) if os.path.exists(path) else RollingState(window)
+
+    codes = load_currency_index(currency_index_path(rates_dir))
+    entries = matrix_catalog(rates_dir).entries(base_currency=base)
+    if state.last_date is not None:
+        applied = [entry for entry in entries if entry["date"] <= state.last_date]
+        if len(applied) != state.count or any(entry["mtime"] > state.synced_mtime for entry in applied):
+            print(f"   [AVISO] Histórico de {base} alterado até {state.last_date}: "
+                  f"estatísticas de {window} dias recalculadas do zero.")
+            state = RollingState(window)
+
+    new_entries = [entry for entry in entries if state.last_date is None or entry["date"] > state.last_date]
+    for entry in new_entries:
+        state.update(entry["date"], load_rate_vector(entry["date"], codes, base, rates_dir))
+        state.synced_mtime = max(state.synced_mtime, entry["mtime"])
+
+    if new_entries:
+        state.save(path)
+    return state, codes
+
+def rolling_snapshot(windows=ANALYTICS_WINDOWS, base=MOEDA_BASE):
+    """Estatísticas atuais de todas as janelas configuradas, lado a lado."""
+    frames = []
+    for window in windows:
+        state, codes = refresh_rolling_state(window, base)
+        frames.append(state.snapshot(codes).drop(columns="rate") if frames else state.snapshot(codes))
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estatísticas móveis do histórico GOLD.")
+    parser.add_argument("--base", default=MOEDA_BASE, help="Moeda base das taxas.")
+    parser.add_argument("--windows", default=",".join(map(str, ANALYTICS_WINDOWS)),
+                        help="Janelas em dias, separadas por vírgula (ex: 7,30).")
+    parser.add_argument("--currencies", help="Moedas a exibir, separadas por vírgula (padrão: todas).")
+    parser.add_argument("--sort", help="Coluna usada para ordenar (ex: volatility_30).")
+    args = parser.parse_args()
+
+    setup_directories()
+    windows = [int(w) for w in args.windows.split(",")]
+    df_stats = rolling_snapshot(windows, args.base)
+    if args.currencies:
+        df_stats = df_stats.loc[[c.strip().upper() for c in args.currencies.split(",") if c.strip().upper() in df_stats.index]]
+    if args.sort and args.sort in df_stats.columns:
+        df_stats = df_stats.sort_values(args.sort, ascending=False)
+    print(df_stats.round(4).to_string())
@@ -0,0 +1,299 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import date, datetime, timedelta
+import numpy as np
+
+# Benchmark sintético de todas as etapas da pipeline.
+# Gera BRONZE realista para N dias × M moedas × K moedas base em um diretório
+# temporário (DATA_DIR), mede tempo e memória (variação do RSS; pico Python com --memory) de
+# cada etapa e grava o resultado em JSON para comparação entre commits. Roda offline: nenhuma etapa
+# acessa a API de câmbio nem o LLM.
+
+SAMPLE_BRONZE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_layers", "bronze", "2025-09-30.json")
+RESULTS_DIR = "bench_results"
+
+
+def currency_codes(n_currencies):
+    """Códigos reais do arquivo de exemplo, completados com códigos sintéticos se necessário."""
+    try:
+        with open(SAMPLE_BRONZE, 'r', encoding='utf-8') as f:
+            codes = list(json.load(f)["conversion_rates"])
+    except FileNotFoundError:
+        codes = ["BRL", "USD", "EUR", "JPY", "GBP"]
+
+    known = set(codes)
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    for combo in itertools.product(letters, repeat=3):
+        if len(codes) >= n_currencies:
+            break
+        code = "".join(combo)
+        if code not in known:
+            codes.append(code)
+    return codes[:n_currencies]
+
+def generate_synthetic_bronze(bronze_dir, days, currencies, bases, start=date(2020, 1, 1), seed=42):
+    """Gera arquivos BRONZE no formato da ExchangeRate-API (passeio aleatório log-normal).
+
+    A primeira moeda base usa o nome YYYY-MM-DD.json, as demais YYYY-MM-DD_<BASE>.json,
+    como o collect_bronze. Retorna a quantidade de arquivos gerados.
+    """
+    os.makedirs(bronze_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    codes = currency_codes(max(currencies, bases))
+    base_codes = codes[:bases]
+
+    # Taxas em relação a uma moeda âncora; cada base é obtida por divisão
+    levels = np.exp(rng.normal(0, 2, size=len(codes)))
+    levels[0] = 1.0
+    files = 0
+    for day in range(days):
+        current = start + timedelta(days=day)
+        levels *= np.exp(rng.normal(0, 0.005, size=len(codes)))
+        update_unix = int(datetime.combine(current, datetime.min.time()).timestamp())
+
+        for k, base in enumerate(base_codes):
+            rates = levels / levels[codes.index(base)]
+            payload = {
+                "result": "success",
+                "documentation": "https://www.exchangerate-api.com/docs",
+                "terms_of_use": "https://www.exchangerate-api.com/terms",
+                "time_last_update_unix": update_unix,
+                "time_last_update_utc": current.strftime("%a, %d %b %Y 00:00:01 +0000"),
+                "time_next_update_unix": update_unix + 86400,
+                "time_next_update_utc": (current + timedelta(days=1)).strftime("%a, %d %b %Y 00:00:01 +0000"),
+                "base_code": base,
+                "conversion_rates": {code: round(float(rate), 4) for code, rate in zip(codes, rates)},
+            }
+            suffix = "" if k == 0 else f"_{base}"
+            with open(os.path.join(bronze_dir, f"{current:%Y-%m-%d}{suffix}.json"), 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=4)
+            files += 1
+    return files
+
+def current_rss_mb():
+    """RSS atual do processo em MB.
+
+    O ru_maxrss é o pico desde o início do processo e nunca diminui; sem /proc
+    (fora do Linux) ele é o único valor disponível.
+    """
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def measure(name, fn, results, verbose=False, trace_memory=False):
+    """Executa fn medindo tempo de parede e RSS; com trace_memory, também o pico de memória Python.
+
+    Como o pico de RSS do processo só cresce, cada etapa registra a variação do RSS
+    (rss_delta_mb) e o quanto elevou o pico (peak_rss_growth_mb; dos processos filhos
+    em children_peak_rss_growth_mb), e não o pico acumulado das etapas anteriores.
+    O tracemalloc deixa as etapas com muitas alocações várias vezes mais lentas, por isso
+    só é ligado sob demanda (--memory), e os tempos dessas execuções não entram na comparação.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    output = io.StringIO()
+    rss_before = current_rss_mb()
+    peak_before = peak_rss_mb()
+    children_peak_before = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        value = fn()
+    elapsed = time.perf_counter() - started
+
+    results[name] = {
+        "seconds": round(elapsed, 4),
+        "rss_delta_mb": round(current_rss_mb() - rss_before, 2),
+        "peak_rss_growth_mb": round(peak_rss_mb() - peak_before, 2),
+        "children_peak_rss_growth_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN) - children_peak_before, 2),
+    }
+    line = (f"   {name:<18} {elapsed:9.3f}s  ΔRSS {results[name]['rss_delta_mb']:+8.2f} MB"
+            f"  pico +{results[name]['peak_rss_growth_mb']:.2f} MB")
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name]["peak_python_mb"] = round(peak / 2**20, 2)
+        line += f"  pico Python {results[name]['peak_python_mb']:8.2f} MB"
+    print(line)
+    return value
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(days, currencies, bases, workers=None, verbose=False, trace_memory=False):
+    """Executa todas as etapas sobre dados sintéticos e retorna o dicionário de resultados."""
+    work_dir = tempfile.mkdtemp(prefix="mba_bench_")
+    # O DATA_DIR precisa ser definido antes de importar os módulos da pipeline
+    os.environ["DATA_DIR"] = os.path.join(work_dir, "data_layers")
+    if not verbose:
+        logging.disable(logging.INFO)
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)  # O PNG do relatório é salvo no diretório atual (não no repositório)
+
+    import pandas as pd
+    from config import BRONZE_DIR, setup_directories
+    from process_silver import backfill_silver
+    from aggregate_gold import build_gold
+    from cross_rates import save_cross_rate_matrices, convert_batch, load_currency_index
+    from gold_store import write_gold_partition, query_gold
+    from analytics import refresh_rolling_state
+    from catalog import bronze_catalog, silver_catalog
+    from silver_store import read_silver
+    from analysis_report import generate_comparison_report, render_reports
+    import run_pipeline
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup_directories()
+    stages = {}
+    start = date(2020, 1, 1)
+    last_day = start + timedelta(days=days - 1)
+
+    try:
+        files = measure("generate_bronze", lambda: generate_synthetic_bronze(BRONZE_DIR, days, currencies, bases, start), stages, verbose, trace_memory)
+        # Os arquivos sintéticos não passam pela coleta: o catálogo BRONZE é reconstruído
+        bronze_catalog().rebuild()
+        bronze_bytes = sum(entry["bytes"] for entry in bronze_catalog().entries())
+
+        measure("silver_backfill", lambda: backfill_silver(max_workers=workers), stages, verbose, trace_memory)
+        silver_bytes = sum(entry["bytes"] for entry in silver_catalog().entries())
+
+        def gold_all_days():
+            frames = []
+            for entry in silver_catalog().entries():
+                df_silver = read_silver(entry["path"])
+                save_cross_rate_matrices(df_silver)
+                frames.append(build_gold(df_silver))
+            write_gold_partition(pd.concat(frames, ignore_index=True))
+        measure("gold_all_days", gold_all_days, stages, verbose, trace_memory)
+
+        measure("query_week", lambda: query_gold(last_day - timedelta(days=6), last_day), stages, verbose, trace_memory)
+
+        codes = np.array(load_currency_index())
+        rng = np.random.default_rng(0)
+        n_rows = 1_000_000
+        from_codes = codes[rng.integers(0, len(codes), n_rows)]
+        to_codes = codes[rng.integers(0, len(codes), n_rows)]
+        amounts = rng.random(n_rows) * 1000
+        measure("convert_batch_1M", lambda: convert_batch(last_day, from_codes, to_codes, amounts), stages, verbose, trace_memory)
+
+        # Serviço em processo: conversões unitárias com datas (e fins de semana) variados
+        from rate_service import RateService
+        service = RateService()
+        service_days = [str(last_day - timedelta(days=int(k))) for k in rng.integers(0, min(days, 30), 100_000)]
+        def service_convert():
+            for day, from_code, to_code in zip(service_days, from_codes, to_codes):
+                try:
+                    service.convert(day, from_code, to_code)
+                except KeyError:
+                    pass
+        measure("service_convert_100k", service_convert, stages, verbose, trace_memory)
+
+        measure("analytics_30d", lambda: refresh_rolling_state(30), stages, verbose, trace_memory)
+        measure("report", lambda: generate_comparison_report(report_date=last_day, use_llm=False), stages, verbose, trace_memory)
+        measure("report_batch", lambda: render_reports(start, last_day, max_workers=workers), stages, verbose, trace_memory)
+
+        # Pipeline completa em memória sobre um diretório limpo (mesmo BRONZE)
+        for layer in ("silver", "gold"):
+            shutil.rmtree(os.path.join(os.environ["DATA_DIR"], layer), ignore_errors=True)
+        if os.path.exists(run_pipeline.PIPELINE_STATE_FILE):
+            os.remove(run_pipeline.PIPELINE_STATE_FILE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_directories()
+        bronze_paths = [entry["path"] for entry in bronze_catalog().entries()]
+        measure("pipeline_in_memory", lambda: run_pipeline.run_pipeline(bronze_paths, report=False), stages, verbose, trace_memory)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"days": days, "currencies": currencies, "bases": bases, "workers": workers,
+                       "trace_memory": trace_memory},
+            "bronze_files": files,
+            "bronze_bytes": bronze_bytes,
+            "silver_bytes": silver_bytes,
+        },
+        "stages": stages,
+    }
+
+def compare_results(current, baseline, threshold, min_seconds=0.05):
+    """Lista as etapas que ficaram mais lentas que o baseline além do limite (ex: 0.2 = 20%).
+
+    Diferenças absolutas menores que min_seconds são ignoradas (ruído de etapas muito curtas).
+    """
+    regressions = []
+    # Tempos medidos com o tracemalloc ligado não são comparáveis com os medidos sem ele
+    traced = [run.get("meta", {}).get("params", {}).get("trace_memory", False) for run in (current, baseline)]
+    if traced[0] != traced[1]:
+        print("   [AVISO] Só uma das execuções rastreou memória (--memory): comparação de tempos ignorada.")
+        return regressions
+    for name, result in current["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or previous["seconds"] <= 0:
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        if ratio > 1 + threshold and result["seconds"] - previous["seconds"] > min_seconds:
+            regressions.append((name, previous["seconds"], result["seconds"], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sintético das etapas da pipeline.")
+    parser.add_argument("--days", type=int, default=30, help="Dias de histórico gerados.")
+    parser.add_argument("--currencies", type=int, default=160, help="Moedas por arquivo BRONZE.")
+    parser.add_argument("--bases", type=int, default=1, help="Moedas base por dia.")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do backfill SILVER.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: bench_results/bench_<timestamp>.json).")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para detectar regressões.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Tolerância de regressão (0.2 = 20%%).")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Diferença absoluta mínima para considerar regressão.")
+    parser.add_argument("--memory", action="store_true",
+                        help="Mede também o pico de memória Python (tracemalloc); deixa as etapas mais lentas.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída das etapas.")
+    args = parser.parse_args()
+
+    print(f"--- BENCHMARK: {args.days} dias × {args.currencies} moedas × {args.bases} bases ---")
+    results = run_benchmarks(args.days, args.currencies, args.bases, args.workers, args.verbose, args.memory)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"   [SUCESSO] Resultados salvos em: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold, args.min_seconds)
+        for name, before, after, ratio in regressions:
+            print(f"   [REGRESSÃO] {name}: {before:.3f}s -> {after:.3f}s ({(ratio - 1) * 100:+.1f}%)")
+        if regressions:
+            sys.exit(1)
+        print("   Nenhuma regressão acima do limite.")
@@ -0,0 +1,302 @@
+import os
+import gzip
+import json
+import zlib
+import time
+import hashlib
+import argparse
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+from config import BRONZE_SEGMENTS_DIR, MOEDA_BASE
+
+try:
+    import fcntl  # Trava entre processos (coletas simultâneas); indisponível no Windows
+except ImportError:
+    fcntl = None
+
+# Arquivo da BRONZE em segmentos: data_layers/bronze/segments/YYYY-MM.jsonl.gz
+# Cada coleta é acrescentada ao segmento do mês como um membro gzip independente
+# contendo UMA linha JSON, com o payload da API guardado como texto, byte a byte.
+# Como membros gzip concatenados formam um gzip válido, `zcat 2025-09.jsonl.gz`
+# devolve um JSONL comum. Ao lado de cada segmento, um índice TSV (.idx) guarda
+# data, moeda base, horário da coleta, offset/tamanho do membro e o SHA-256 do
+# payload: uma leitura pontual faz seek + descompressão de um único membro.
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx"
+
+Record = namedtuple("Record", ["collected_date", "base_currency", "collected_at", "offset", "length", "sha256"])
+
+_lock = threading.Lock()
+
+
+def _date_str(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def record_name(collected_date, base_currency):
+    """Nome equivalente ao do arquivo JSON (YYYY-MM-DD.json ou YYYY-MM-DD_<BASE>.json)."""
+    if base_currency == MOEDA_BASE:
+        return f"{_date_str(collected_date)}.json"
+    return f"{_date_str(collected_date)}_{base_currency}.json"
+
+def segment_path(collected_date, directory=BRONZE_SEGMENTS_DIR):
+    return os.path.join(directory, f"{_date_str(collected_date)[:7]}{SEGMENT_SUFFIX}")
+
+def index_path(segment):
+    return segment[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+def list_segments(directory=BRONZE_SEGMENTS_DIR):
+    """Segmentos em ordem cronológica (o nome é o mês)."""
+    try:
+        names = sorted(f for f in os.listdir(directory) if f.endswith(SEGMENT_SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+# --- Gravação ---
+
+def _encode_member(raw_bytes, collected_date, base_currency, collected_at):
+    line = json.dumps({
+        "collected_date": _date_str(collected_date),
+        "base_currency": base_currency,
+        "collected_at": collected_at,
+        "payload": raw_bytes.decode('utf-8'),
+    }) + "\n"
+    return gzip.compress(line.encode('utf-8'), mtime=0)
+
+def _index_line(record):
+    return "\t".join(str(value) for value in record) + "\n"
+
+def append_snapshot(raw_bytes, collected_date, base_currency, collected_at=None, directory=BRONZE_SEGMENTS_DIR):
+    """Acrescenta uma coleta (bytes crus da resposta da API) ao segmento do mês.
+
+    O membro é gravado e sincronizado antes da linha do índice: se o processo
+    cair entre os dois, rebuild_index() recupera o índice a partir do segmento.
+    Retorna o Record gravado no índice.
+    """
+    collected_at = time.time() if collected_at is None else collected_at
+    member = _encode_member(raw_bytes, collected_date, base_currency, collected_at)
+    sha256 = hashlib.sha256(raw_bytes).hexdigest()
+
+    os.makedirs(directory, exist_ok=True)
+    segment = segment_path(collected_date, directory)
+    with _lock, open(segment, 'ab') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        offset = f.seek(0, os.SEEK_END)
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+        record = Record(_date_str(collected_date), base_currency, collected_at, offset, len(member), sha256)
+        with open(index_path(segment), 'a', encoding='utf-8') as index:
+            index.write(_index_line(record))
+    return record
+
+
+# --- Leitura ---
+
+def read_index(segment):
+    """Registros do índice de um segmento, na ordem de gravação."""
+    records = []
+    try:
+        with open(index_path(segment), 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) == len(Record._fields):
+                    records.append(Record(fields[0], fields[1], float(fields[2]), int(fields[3]),
+                                          int(fields[4]), fields[5]))
+    except FileNotFoundError:
+        pass
+    return records
+
+def records(start_date=None, end_date=None, base_currency=None, latest_only=True, directory=BRONZE_SEGMENTS_DIR):
+    """[(segmento, Record)] no intervalo, em ordem de data; só os índices são lidos.
+
+    Com latest_only (padrão), várias coletas do mesmo dia e moeda base (ex:
+    snapshots intradiários) se reduzem à mais recente.
+    """
+    start = _date_str(start_date) if start_date is not None else None
+    end = _date_str(end_date) if end_date is not None else None
+    selected = []
+    for segment in list_segments(directory):
+        month = os.path.basename(segment)[:7]
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        for record in read_index(segment):
+            if (start and record.collected_date < start) or (end and record.collected_date > end):
+                continue
+            if base_currency and record.base_currency != base_currency:
+                continue
+            selected.append((segment, record))
+
+    if latest_only:
+        latest = {}
+        for segment, record in selected:
+            key = (record.collected_date, record.base_currency)
+            if key not in latest or record.collected_at >= latest[key][1].collected_at:
+                latest[key] = (segment, record)
+        selected = list(latest.values())
+    return sorted(selected, key=lambda item: (item[1].collected_date, item[1].base_currency, item[1].collected_at))
+
+def read_member(segment, record, handle=None):
+    """Lê (seek + descompressão de um único membro) a linha JSON de um registro."""
+    if handle is None:
+        with open(segment, 'rb') as f:
+            return read_member(segment, record, f)
+    handle.seek(record.offset)
+    return json.loads(gzip.decompress(handle.read(record.length)))
+
+def read_payload(segment, record, handle=None):
+    """Bytes crus do payload da API, idênticos aos recebidos na coleta."""
+    return read_member(segment, record, handle)["payload"].encode('utf-8')
+
+def iter_snapshots(start_date=None, end_date=None, base_currency=None, latest_only=True,
+                   directory=BRONZE_SEGMENTS_DIR, selection=None):
+    """Gera (nome, Record, bytes crus) de cada coleta do intervalo, uma de cada vez.
+
+    Cada segmento é aberto uma vez e percorrido pelos offsets do índice: só um
+    membro (uma coleta) fica em memória por vez, qualquer que seja o tamanho do segmento.
+    selection permite passar uma lista [(segmento, Record)] já filtrada por records().
+    """
+    if selection is None:
+        selection = records(start_date, end_date, base_currency, latest_only, directory)
+    current, handle = None, None
+    try:
+        for segment, record in selection:
+            if segment != current:
+                if handle is not None:
+                    handle.close()
+                current, handle = segment, open(segment, 'rb')
+            name = record_name(record.collected_date, record.base_currency)
+            yield name, record, read_payload(segment, record, handle)
+    finally:
+        if handle is not None:
+            handle.close()
+
+def latest_snapshot(base_currency=None, directory=BRONZE_SEGMENTS_DIR):
+    """(nome, Record, bytes crus) da coleta mais recente (da moeda base, se informada) ou None."""
+    for segment in reversed(list_segments(directory)):
+        candidates = [r for r in read_index(segment) if not base_currency or r.base_currency == base_currency]
+        if candidates:
+            record = max(candidates, key=lambda r: (r.collected_date, r.collected_at))
+            return record_name(record.collected_date, record.base_currency), record, read_payload(segment, record)
+    return None
+
+
+# --- Manutenção ---
+
+def _scan_members(segment, chunk_size=1024 * 1024):
+    """Percorre os membros gzip de um segmento em blocos: gera (offset, tamanho, conteúdo)."""
+    with open(segment, 'rb') as f:
+        offset = start = 0
+        decompressor, parts, pending = zlib.decompressobj(wbits=31), [], b""
+        while True:
+            chunk = pending or f.read(chunk_size)
+            pending = b""
+            if not chunk:
+                return
+            try:
+                parts.append(decompressor.decompress(chunk))
+            except zlib.error:
+                return  # membro corrompido: o segmento válido termina no membro anterior
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                end = offset + len(chunk) - len(pending)
+                yield start, end - start, b"".join(parts)
+                offset = start = end
+                decompressor, parts = zlib.decompressobj(wbits=31), []
+            else:
+                offset += len(chunk)
+
+def rebuild_index(segment):
+    """Reconstrói o índice varrendo o segmento; um membro final incompleto (queda no meio
+    de uma gravação) é descartado com truncate. Retorna o número de registros."""
+    rebuilt, valid_end = [], 0
+    for offset, length, content in _scan_members(segment):
+        line = json.loads(content)
+        payload = line["payload"].encode('utf-8')
+        rebuilt.append(Record(line["collected_date"], line["base_currency"], line["collected_at"],
+                              offset, length, hashlib.sha256(payload).hexdigest()))
+        valid_end = offset + length
+
+    with _lock:
+        if os.path.getsize(segment) > valid_end:
+            with open(segment, 'r+b') as f:
+                f.truncate(valid_end)
+        tmp_path = f"{index_path(segment)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(_index_line(record) for record in rebuilt)
+        os.replace(tmp_path, index_path(segment))
+    return len(rebuilt)
+
+def migrate_json_files(remove=False, directory=BRONZE_SEGMENTS_DIR, catalog=None):
+    """Copia os arquivos BRONZE *.json para os segmentos (idempotente).
+
+    Cada arquivo entra com o mtime como horário da coleta; arquivos já
+    presentes no índice (mesma data, base e SHA-256) são pulados. Com remove=True,
+    o JSON só é apagado depois de o payload ser relido do segmento e conferido.
+    Retorna (migrados, pulados).
+    """
+    if catalog is None:
+        from catalog import bronze_catalog
+        catalog = bronze_catalog()
+
+    known = {(r.collected_date, r.base_currency, r.sha256) for _, r in records(latest_only=False, directory=directory)}
+    migrated = skipped = 0
+    for entry in catalog.entries():
+        path = entry["path"]
+        with open(path, 'rb') as f:
+            raw_bytes = f.read()
+        key = (entry["date"], entry["base_currency"], hashlib.sha256(raw_bytes).hexdigest())
+        if key in known:
+            skipped += 1
+        else:
+            record = append_snapshot(raw_bytes, entry["date"], entry["base_currency"],
+                                     collected_at=entry["mtime"], directory=directory)
+            if read_payload(segment_path(entry["date"], directory), record) != raw_bytes:
+                raise IOError(f"Payload de {path} divergente após a migração; arquivo mantido.")
+            known.add(key)
+            migrated += 1
+        if remove:
+            os.remove(path)
+            catalog.remove(path)
+    return migrated, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segmentos comprimidos da camada BRONZE.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="Copia os arquivos bronze/*.json para os segmentos.")
+    migrate.add_argument("--remove", action="store_true", help="Apaga cada JSON depois de conferido no segmento.")
+    listing = commands.add_parser("list", help="Lista as coletas guardadas nos segmentos.")
+    listing.add_argument("--start", help="Data inicial (YYYY-MM-DD).")
+    listing.add_argument("--end", help="Data final (YYYY-MM-DD).")
+    listing.add_argument("--base", help="Filtra pela moeda base.")
+    listing.add_argument("--all", action="store_true", help="Inclui todas as coletas do dia, não só a mais recente.")
+    show = commands.add_parser("cat", help="Imprime o payload cru de uma coleta.")
+    show.add_argument("date", help="Data da coleta (YYYY-MM-DD).")
+    show.add_argument("--base", default=MOEDA_BASE, help="Moeda base da coleta.")
+    commands.add_parser("reindex", help="Reconstrói os índices a partir dos segmentos.")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrated, skipped = migrate_json_files(remove=args.remove)
+        print(f"   [SUCESSO] {migrated} arquivos migrados ({skipped} já presentes) para: {BRONZE_SEGMENTS_DIR}")
+    elif args.command == "list":
+        for segment, record in records(args.start, args.end, args.base, latest_only=not args.all):
+            collected_at = datetime.fromtimestamp(record.collected_at).isoformat(timespec="seconds")
+            print(f"{record.collected_date}  {record.base_currency:<5} {collected_at}  "
+                  f"{record.length:>8} bytes  {record.sha256[:12]}  {os.path.basename(segment)}@{record.offset}")
+    elif args.command == "cat":
+        found = records(args.date, args.date, args.base)
+        if not found:
+            print(f"[ERRO] Nenhuma coleta {args.base} em {args.date}.")
+        else:
+            print(read_payload(*found[-1]).decode('utf-8'))
+    elif args.command == "reindex":
+        for segment in list_segments():
+            print(f"   {os.path.basename(segment)}: {rebuild_index(segment)} registros")
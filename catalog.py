@@ -0,0 +1,323 @@
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import date, datetime
+from config import BRONZE_DIR, SILVER_DIR, GOLD_DATASET_DIR, CROSS_RATES_DIR, QUARANTINE_DIR, INSIGHTS_DIR, MOEDA_BASE
+
+# Catálogo das camadas: um índice SQLite por diretório (<camada>/_catalog.sqlite)
+# com data, moeda base, linhas, bytes, checksum e esquema de cada arquivo.
+# As etapas registram os arquivos ao gravá-los, e as buscas "mais recente",
+# "por data" e "por intervalo" usam índices em vez de os.listdir + sort, então
+# o custo não cresce com a quantidade de arquivos no diretório.
+
+CATALOG_FILE = "_catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,      -- relativo ao diretório da camada
+    date TEXT NOT NULL,         -- primeira data coberta pelo arquivo (YYYY-MM-DD)
+    date_end TEXT NOT NULL,     -- última data coberta (igual a date em arquivos diários)
+    base_currency TEXT,
+    rows INTEGER,
+    bytes INTEGER,
+    mtime REAL,
+    checksum TEXT,
+    schema TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS files_by_date ON files (date_end, path);
+CREATE INDEX IF NOT EXISTS files_by_base ON files (base_currency, date_end, path);
+"""
+
+
+def _date_str(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 do conteúdo de um arquivo (lido em blocos)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LayerCatalog:
+    """Índice SQLite dos arquivos de um diretório de camada.
+
+    Cada thread/processo usa sua própria conexão; o modo WAL permite leituras
+    durante a gravação de outro processo (ex: workers do backfill). Se o banco
+    ainda não existe, ele é construído a partir de uma única varredura do diretório.
+    """
+
+    def __init__(self, directory, suffix, indexer):
+        self.directory = directory
+        self.path = os.path.join(directory, CATALOG_FILE)
+        self.suffix = suffix
+        self.indexer = indexer  # função(caminho) -> metadados, usada no rebuild
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        # Conexões SQLite não sobrevivem a um fork: cada processo abre a sua.
+        # Se o diretório da camada foi apagado, o catálogo é recriado com ele.
+        if conn is not None and self._local.pid == os.getpid() and os.path.exists(self.path):
+            return conn
+
+        os.makedirs(self.directory, exist_ok=True)
+        created = not os.path.exists(self.path)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        if created:
+            self.rebuild()
+        return conn
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.directory)
+
+    def _absolute(self, relative_path):
+        return os.path.join(self.directory, relative_path)
+
+    def register(self, path, date_value, date_end=None, base_currency=None, rows=None, schema=None):
+        """Registra (ou atualiza) um arquivo recém-gravado; a instrução é atômica."""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._row(path, date_value, date_end, base_currency, rows, schema),
+        )
+
+    def _row(self, path, date_value, date_end=None, base_currency=None, rows=None, schema=None):
+        stat = os.stat(path)
+        return (
+            self._relative(path),
+            _date_str(date_value),
+            _date_str(date_end if date_end is not None else date_value),
+            base_currency,
+            rows,
+            stat.st_size,
+            stat.st_mtime,
+            file_checksum(path),
+            json.dumps(schema) if schema is not None else None,
+            datetime.now().isoformat(timespec="seconds"),
+        )
+
+    def remove(self, path):
+        self._connect().execute("DELETE FROM files WHERE path = ?", (self._relative(path),))
+
+    def _select(self, where="", params=(), order="date_end, path", limit=None):
+        sql = f"SELECT * FROM files {where} ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def latest_entry(self, base_currency=None):
+        """Metadados do arquivo mais recente (ou None); entradas de arquivos apagados são descartadas."""
+        where, params = ("WHERE base_currency = ?", (base_currency,)) if base_currency else ("", ())
+        while True:
+            rows = self._select(where, params, order="date_end DESC, path DESC", limit=1)
+            if not rows:
+                return None
+            entry = rows[0]
+            entry["path"] = self._absolute(entry["path"])
+            if os.path.exists(entry["path"]):
+                return entry
+            self.remove(entry["path"])
+
+    def latest(self, base_currency=None):
+        """Caminho do arquivo mais recente (ou None)."""
+        entry = self.latest_entry(base_currency)
+        return entry["path"] if entry else None
+
+    def latest_date(self, base_currency=None):
+        """Última data coberta pela camada (YYYY-MM-DD) ou None."""
+        entry = self.latest_entry(base_currency)
+        return entry["date_end"] if entry else None
+
+    def entries(self, start_date=None, end_date=None, base_currency=None):
+        """Metadados dos arquivos que cobrem algum dia do intervalo, em ordem de data."""
+        clauses, params = [], []
+        if start_date is not None:
+            clauses.append("date_end >= ?")
+            params.append(_date_str(start_date))
+        if end_date is not None:
+            clauses.append("date <= ?")
+            params.append(_date_str(end_date))
+        if base_currency:
+            clauses.append("base_currency = ?")
+            params.append(base_currency)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._select(where, params, order="date, path")
+        for entry in rows:
+            entry["path"] = self._absolute(entry["path"])
+        return rows
+
+    def find(self, start_date, end_date=None, base_currency=None):
+        """Caminhos dos arquivos de uma data (ou intervalo de datas)."""
+        end_date = start_date if end_date is None else end_date
+        return [entry["path"] for entry in self.entries(start_date, end_date, base_currency)]
+
+    def sync(self):
+        """Concilia o catálogo com o diretório sem reindexar tudo: arquivos copiados à mão
+        (ou sobrescritos fora das etapas) são indexados e entradas de arquivos apagados saem.
+
+        Só os arquivos novos ou com mtime diferente do registrado são lidos. Retorna quantas entradas mudaram.
+        """
+        known = {row["path"]: row["mtime"] for row in self._select()}
+        changed = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(dirpath, name)
+                relative = self._relative(path)
+                mtime = known.pop(relative, None)
+                try:
+                    if mtime is not None and os.stat(path).st_mtime == mtime:
+                        continue
+                    metadata = self.indexer(path)
+                except Exception:
+                    continue  # arquivo ilegível ou fora do padrão de nomes
+                if metadata is not None:
+                    self.register(path, **metadata)
+                    changed += 1
+        for relative in known:
+            self.remove(self._absolute(relative))
+            changed += 1
+        return changed
+
+    def rebuild(self):
+        """Reconstrói o catálogo com uma varredura do diretório (uso único ou após cópias manuais)."""
+        rows = []
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    metadata = self.indexer(path)
+                except Exception:
+                    continue  # arquivo ilegível ou fora do padrão de nomes
+                if metadata is not None:
+                    rows.append(self._row(path, **metadata))
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM files")
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+
+# --- Metadados de cada tipo de arquivo (usados apenas pelo rebuild) ---
+# As bibliotecas pesadas são importadas aqui dentro, para que a coleta não as carregue.
+
+def index_bronze_file(path):
+    """YYYY-MM-DD.json (moeda base padrão) ou YYYY-MM-DD_<BASE>.json."""
+    name = os.path.basename(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    rates = data.get("conversion_rates", {})
+    base = name[11:-len(".json")] if len(name) > len("YYYY-MM-DD.json") else data.get("base_code", MOEDA_BASE)
+    return {"date_value": name[:10], "base_currency": base, "rows": len(rates), "schema": sorted(data)}
+
+def index_silver_file(path):
+    """Arquivo SILVER (.arrow ou .csv): intervalo de datas e moeda base lidos dos dados (pacotes têm vários dias)."""
+    from silver_store import read_silver_table, silver_metadata
+    table = read_silver_table(path)
+    return silver_metadata(table) if len(table) else None
+
+def index_parquet_file(path):
+    """Partição Parquet: intervalo de datas lido da coluna collected_date."""
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    table = pq.read_table(path, columns=['collected_date'])
+    if not len(table):
+        return None
+    dates = pc.min_max(table.column(0)).as_py()
+    schema = pq.read_schema(path)
+    return {
+        "date_value": dates["min"],
+        "date_end": dates["max"],
+        "rows": len(table),
+        "schema": {field.name: str(field.type) for field in schema},
+    }
+
+def index_matrix_file(path):
+    """Matriz de taxas cruzadas <data>_<BASE>.npy."""
+    import numpy as np
+    name = os.path.basename(path)
+    matrix = np.load(path, mmap_mode='r')
+    return {
+        "date_value": name[:10],
+        "base_currency": name[11:-len(".npy")],
+        "rows": matrix.shape[0],
+        "schema": {"dtype": str(matrix.dtype), "shape": list(matrix.shape)},
+    }
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(directory, suffix, indexer):
+    """Catálogo (compartilhado no processo) de um diretório."""
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = LayerCatalog(directory, suffix, indexer)
+        return _catalogs[key]
+
+def bronze_catalog(directory=BRONZE_DIR):
+    return get_catalog(directory, ".json", index_bronze_file)
+
+def silver_catalog(directory=SILVER_DIR):
+    return get_catalog(directory, ("_silver.arrow", "_silver.csv"), index_silver_file)
+
+def dataset_catalog(root=GOLD_DATASET_DIR):
+    """Catálogo de um dataset Parquet particionado (GOLD ou quarentena)."""
+    return get_catalog(root, ".parquet", index_parquet_file)
+
+def matrix_catalog(directory=CROSS_RATES_DIR):
+    return get_catalog(directory, ".npy", index_matrix_file)
+
+LAYERS = {
+    "bronze": bronze_catalog,
+    "silver": silver_catalog,
+    "gold": dataset_catalog,
+    "cross_rates": matrix_catalog,
+    "quarantine": lambda: dataset_catalog(QUARANTINE_DIR),
+    "insights": lambda: dataset_catalog(INSIGHTS_DIR),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catálogo das camadas de dados.")
+    parser.add_argument("layer", choices=sorted(LAYERS), help="Camada consultada.")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstrói o catálogo varrendo o diretório.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Concilia o catálogo com o diretório (indexa só arquivos novos ou alterados).")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD).")
+    parser.add_argument("--base", help="Filtra pela moeda base.")
+    args = parser.parse_args()
+
+    catalog = LAYERS[args.layer]()
+    if args.rebuild:
+        print(f"   [SUCESSO] {catalog.rebuild()} arquivos catalogados em: {catalog.path}")
+    elif args.sync:
+        print(f"   [SUCESSO] {catalog.sync()} entradas atualizadas em: {catalog.path}")
+    else:
+        for entry in catalog.entries(args.start, args.end, args.base):
+            period = entry["date"] if entry["date"] == entry["date_end"] else f"{entry['date']}..{entry['date_end']}"
+            print(f"{period:<22} {entry['base_currency'] or '-':<5} {entry['rows'] or 0:>8} linhas "
+                  f"{entry['bytes']:>10} bytes  {entry['checksum'][:12]}  {entry['path']}")
@@ -0,0 +1,202 @@
+import sys
+import argparse
+from datetime import date
+from config import (
+    API_MAX_CONCURRENCY, MOEDA_BASE, LLM_MAX_CONCURRENCY, LLM_TOKENS_PER_MINUTE, SERVICE_HOST, SERVICE_PORT,
+)
+
+# CLI única da pipeline: python cli.py <etapa> [opções]
+# Cada subcomando importa seus módulos só ao ser executado, então pandas,
+# pyarrow, matplotlib e o SDK do Gemini não pesam na partida de etapas que
+# não os usam (ex: a coleta e a conversão de moedas disparadas pelo cron).
+
+
+def cmd_collect(args):
+    from collect_bronze import collect_and_save_bronze, collect_many_bronze
+    if args.bases or args.all_bases:
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        results = collect_many_bronze(bases, max_workers=args.workers)
+        return 0 if all(results.values()) else 1
+    return 0 if collect_and_save_bronze() else 1
+
+def cmd_silver(args):
+    from process_silver import process_and_save_silver, backfill_silver
+    if args.backfill:
+        backfill_silver(max_workers=args.workers)
+    else:
+        process_and_save_silver()
+    if args.pack:
+        from silver_store import pack_silver
+        pack_silver()
+    return 0
+
+def cmd_gold(args):
+    from aggregate_gold import aggregate_and_save_gold
+    aggregate_and_save_gold()
+    return 0
+
+def cmd_report(args):
+    if args.start:
+        from analysis_report import render_reports
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        render_reports(args.start, args.end, bases=bases, max_workers=args.workers, force=args.force)
+        return 0
+    from analysis_report import generate_comparison_report
+    report_path = generate_comparison_report(report_date=args.date, use_llm=not args.no_llm)
+    return 0 if report_path else 1
+
+def cmd_enrich(args):
+    if args.start:
+        from enrich_llm import enrich_date_range
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        df = enrich_date_range(args.start, args.end, bases=bases, max_concurrency=args.concurrency,
+                               tokens_per_minute=args.tpm, force=args.force)
+        return 0 if df is not None else 1
+    from enrich_llm import generate_insights_with_llm
+    generate_insights_with_llm()
+    return 0
+
+def cmd_query_rate(args):
+    # Somente NumPy: a matriz do dia é aberta via memory-map
+    from cross_rates import convert
+    from_code, to_code = args.from_code.upper(), args.to_code.upper()
+    try:
+        result = convert(args.date, from_code, to_code, args.amount, base=args.base)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"[ERRO] {e}")
+        return 1
+    print(f"{args.amount:.4f} {from_code} = {result:.4f} {to_code}")
+    return 0
+
+def cmd_query_gold(args):
+    from gold_store import latest_gold_date, query_gold
+    start = args.start or latest_gold_date()
+    if start is None:
+        print("[ERRO] Dataset GOLD vazio. Execute o aggregate_gold.py primeiro.")
+        return 1
+    columns = args.columns.split(",") if args.columns else None
+    print(query_gold(start, args.end, columns=columns).to_string(index=False))
+    return 0
+
+def cmd_query_quarantine(args):
+    from quality import query_quarantine
+    df = query_quarantine(args.start, args.end)
+    if df.empty:
+        print("Nenhuma violação registrada no período.")
+    else:
+        print(df.to_string(index=False))
+    return 0
+
+def cmd_serve(args):
+    from rate_service import RateService, make_server
+    server = make_server(RateService(base=args.base), args.host, args.port)
+    print(f"Serviço de conversão em http://{args.host}:{server.server_port} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+def cmd_daemon(args):
+    from config import setup_directories
+    from collector_daemon import Collector, run_downstream
+    setup_directories()
+    bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+    collector = Collector(
+        bases,
+        on_change=lambda changed: run_downstream(changed, report=not args.no_report, use_llm=args.llm),
+    )
+    print(f"--- COLETOR CONTÍNUO ({', '.join(collector.bases)}) ---")
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"--- COLETOR ENCERRADO {collector.stats} ---")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Pipeline de câmbio bronze -> silver -> gold.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    collect = commands.add_parser("collect", help="Coleta o câmbio de hoje na camada BRONZE.")
+    collect.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: MOEDAS_BASE do .env).")
+    collect.add_argument("--all-bases", action="store_true", help="Coleta concorrente de todas as moedas em MOEDAS_BASE.")
+    collect.add_argument("--workers", type=int, default=API_MAX_CONCURRENCY, help="Número máximo de requisições simultâneas.")
+    collect.set_defaults(handler=cmd_collect)
+
+    silver = commands.add_parser("silver", help="Normaliza o BRONZE mais recente (ou todos os pendentes).")
+    silver.add_argument("--backfill", action="store_true", help="Normaliza em paralelo todos os dias pendentes.")
+    silver.add_argument("--workers", type=int, default=None, help="Número de processos usados no backfill.")
+    silver.add_argument("--pack", action="store_true", help="Depois, junta os dias dos meses completos em pacotes mensais.")
+    silver.set_defaults(handler=cmd_silver)
+
+    gold = commands.add_parser("gold", help="Agrega a SILVER mais recente no dataset GOLD.")
+    gold.set_defaults(handler=cmd_gold)
+
+    report = commands.add_parser("report", help="Gera o gráfico de variação diária e a análise do LLM.")
+    report.add_argument("--date", type=date.fromisoformat, help="Data do relatório (YYYY-MM-DD). Padrão: hoje.")
+    report.add_argument("--no-llm", action="store_true", help="Gera apenas o gráfico.")
+    report.add_argument("--start", help="Modo em lote: data inicial (YYYY-MM-DD), apenas gráficos.")
+    report.add_argument("--end", help="Modo em lote: data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    report.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: todas do GOLD).")
+    report.add_argument("--workers", type=int, default=None, help="Número de processos da renderização em lote.")
+    report.add_argument("--force", action="store_true", help="Regera também os gráficos inalterados.")
+    report.set_defaults(handler=cmd_report)
+
+    enrich = commands.add_parser("enrich", help="Gera insights do LLM sobre os dados GOLD mais recentes (ou um intervalo).")
+    enrich.add_argument("--start", help="Modo em lote: data inicial (YYYY-MM-DD).")
+    enrich.add_argument("--end", help="Modo em lote: data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    enrich.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: todas do GOLD).")
+    enrich.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY, help="Requisições simultâneas ao LLM.")
+    enrich.add_argument("--tpm", type=int, default=LLM_TOKENS_PER_MINUTE, help="Cota de tokens por minuto.")
+    enrich.add_argument("--force", action="store_true", help="Regera insights já gravados.")
+    enrich.set_defaults(handler=cmd_enrich)
+
+    daemon = commands.add_parser("daemon", help="Coleta contínua guiada pelo horário de atualização da API.")
+    daemon.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: MOEDAS_BASE do .env).")
+    daemon.add_argument("--no-report", action="store_true", help="Não gera o relatório após novas coletas.")
+    daemon.add_argument("--llm", action="store_true", help="Inclui a análise do LLM no relatório.")
+    daemon.set_defaults(handler=cmd_daemon)
+
+    serve = commands.add_parser("serve", help="Serviço HTTP de conversão de moedas (matrizes GOLD em memória).")
+    serve.add_argument("--host", default=SERVICE_HOST)
+    serve.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve.add_argument("--base", default=MOEDA_BASE, help="Moeda base das matrizes usadas.")
+    serve.set_defaults(handler=cmd_serve)
+
+    query = commands.add_parser("query", help="Consultas rápidas às camadas GOLD.")
+    queries = query.add_subparsers(dest="query", required=True)
+
+    rate = queries.add_parser("rate", help="Converte valores entre duas moedas (matriz de taxas cruzadas).")
+    rate.add_argument("date", help="Data da cotação (YYYY-MM-DD).")
+    rate.add_argument("from_code", help="Moeda de origem (ex: USD).")
+    rate.add_argument("to_code", help="Moeda de destino (ex: EUR).")
+    rate.add_argument("amount", type=float, nargs="?", default=1.0)
+    rate.add_argument("--base", default=MOEDA_BASE, help="Moeda base da coleta usada na matriz.")
+    rate.set_defaults(handler=cmd_query_rate)
+
+    gold_query = queries.add_parser("gold", help="Linhas do dataset GOLD por intervalo de datas.")
+    gold_query.add_argument("--start", help="Data inicial (YYYY-MM-DD). Padrão: data mais recente.")
+    gold_query.add_argument("--end", help="Data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    gold_query.add_argument("--columns", help="Lista de colunas separadas por vírgula.")
+    gold_query.set_defaults(handler=cmd_query_gold)
+
+    quarantine = queries.add_parser("quarantine", help="Violações das regras de qualidade da SILVER.")
+    quarantine.add_argument("start", help="Data inicial (YYYY-MM-DD).")
+    quarantine.add_argument("end", nargs="?", help="Data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    quarantine.set_defaults(handler=cmd_query_quarantine)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        from metrics import enable_profiling
+        enable_profiling()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
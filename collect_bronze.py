@@ -1,29 +1,163 @@
 import requests
 import json
 import os
+import time
+import random
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 # ... imports
-from config import URL_API, BRONZE_DIR, FILENAME_BASE, setup_directories
+from config import (
+    URL_API, BRONZE_DIR, BRONZE_FORMAT, MOEDA_BASE, MOEDAS_BASE,
+    API_TIMEOUT, API_MAX_CONCURRENCY, API_RATE_LIMIT_PER_SEC,
+    API_MAX_RETRIES, API_BACKOFF_BASE, build_api_url, current_date_str, setup_directories,
+)
+from metrics import timed, track_latency, record_bytes, record_file_bytes, enable_profiling
+from catalog import bronze_catalog
+from bronze_archive import append_snapshot, segment_path
+from rate_snapshot import RateSnapshot
 
+# Status HTTP que indicam falha temporária (cota estourada ou erro do servidor)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token bucket thread-safe: limita as requisições por segundo à cota da API."""
+
+    def __init__(self, rate_per_sec, burst=1):
+        self.rate = rate_per_sec
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def create_session(pool_size=API_MAX_CONCURRENCY):
+    """Cria uma sessão HTTP com pool de conexões compartilhado entre as threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _retry_delay(attempt, response=None):
+    """Tempo de espera antes da próxima tentativa (Retry-After ou backoff exponencial)."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    # Backoff exponencial com jitter para não sincronizar as threads
+    return API_BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+
+def fetch_with_backoff(session, url, rate_limiter=None, max_retries=API_MAX_RETRIES, raw=False):
+    """Faz o GET com timeout, respeitando o rate limiter e com backoff em 429/5xx.
+
+    Retorna o JSON decodificado ou, com raw=True, os bytes exatos da resposta.
+    """
+    for attempt in range(max_retries + 1):
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            with track_latency("exchangerate_api") as outcome:
+                response = session.get(url, timeout=API_TIMEOUT)
+                outcome["status"] = response.status_code
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(_retry_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUS and attempt < max_retries:
+            time.sleep(_retry_delay(attempt, response))
+            continue
+
+        response.raise_for_status()
+        data = response.json()  # Valida o corpo mesmo no modo raw (erro vira RequestException)
+        return response.content if raw else data
+
+def bronze_filename(moeda_base, collected_date=None):
+    """Nome do arquivo BRONZE: a base padrão mantém o nome YYYY-MM-DD.json."""
+    # O nome base do arquivo será apenas a data de coleta, como solicitado
+    filename_base = collected_date or current_date_str()
+    if moeda_base == MOEDA_BASE:
+        return f"{filename_base}.json"
+    return f"{filename_base}_{moeda_base}.json"
+
+def check_payload(raw_bytes, moeda_base, collected_date=None):
+    """Confere a resposta com as regras por linha da SILVER (RateSnapshot, sem pandas).
+
+    A BRONZE guarda a resposta como veio; aqui os problemas só são avisados já
+    na coleta. Retorna a quantidade de taxas válidas (0 se a resposta for inválida).
+    """
+    try:
+        snapshot = RateSnapshot.from_payload(raw_bytes, collected_date or current_date_str())
+    except (KeyError, ValueError) as e:
+        print(f"   [AVISO] {moeda_base}: resposta da API fora do formato esperado ({e}).")
+        return 0
+    valid, violations = snapshot.validate()
+    if violations:
+        print(f"   [AVISO] {moeda_base}: {len(violations)} de {len(snapshot)} taxas violam as regras da SILVER.")
+    return len(valid)
+
+def _save_bronze(raw_bytes, moeda_base, collected_date=None, collected_at=None):
+    """Grava a resposta da API no formato configurado em BRONZE_FORMAT e retorna onde ela ficou.
+
+    collected_date (YYYY-MM-DD, padrão: hoje) e collected_at (unix, padrão: agora)
+    permitem datar a coleta pela atualização da API em vez do relógio local.
+    """
+    check_payload(raw_bytes, moeda_base, collected_date)
+    if BRONZE_FORMAT == "segments":
+        # Segmento mensal comprimido: os bytes da resposta são guardados sem alteração
+        record = append_snapshot(raw_bytes, collected_date or current_date_str(), moeda_base, collected_at)
+        record_bytes("bronze", "written", record.length)
+        return f"{segment_path(record.collected_date)}@{record.offset}"
+
+    raw_data = json.loads(raw_bytes)
+    filename = bronze_filename(moeda_base, collected_date)
+    bronze_file_path = os.path.join(BRONZE_DIR, filename)
+    with open(bronze_file_path, 'w', encoding='utf-8') as f:
+        json.dump(raw_data, f, indent=4)
+    record_file_bytes("bronze", "written", bronze_file_path)
+    bronze_catalog().register(
+        bronze_file_path, filename[:10], base_currency=moeda_base,
+        rows=len(raw_data.get("conversion_rates", {})), schema=sorted(raw_data),
+    )
+    return bronze_file_path
+
+@timed("bronze")
 def collect_and_save_bronze():
     setup_directories()
-    
-    # 1. DEFINIÇÃO CORRETA: Defina o caminho antes do bloco try/except
-    bronze_file_path = os.path.join(BRONZE_DIR, f"{FILENAME_BASE}.json")
-    
+
     print("--- INICIANDO COLETA BRONZE ---")
-    
+
     try:
         # ... (seu código de DEBUG da URL e Status Code aqui)
-        
-        response = requests.get(URL_API)
-        response.raise_for_status() 
-        raw_data = response.json()
-
-        # 2. Salva na camada BRONZE (aqui apenas o comando de salvar, sem redefinição)
-        with open(bronze_file_path, 'w', encoding='utf-8') as f:
-            json.dump(raw_data, f, indent=4)
-        
-        # 3. A impressão de sucesso agora funciona, pois a variável foi definida
+
+        with create_session(pool_size=1) as session:
+            raw_bytes = fetch_with_backoff(session, URL_API, raw=True)
+
+        # 2. Salva na camada BRONZE
+        bronze_file_path = _save_bronze(raw_bytes, MOEDA_BASE)
+
         print(f"   [SUCESSO] Dados brutos salvos em: {bronze_file_path}")
         print("--- COLETA BRONZE CONCLUÍDA ---")
         return bronze_file_path
@@ -34,5 +168,60 @@ def collect_and_save_bronze():
         print(f"   Detalhes: {e}")
         return None
 
+@timed("bronze")
+def collect_many_bronze(bases=None, max_workers=API_MAX_CONCURRENCY, rate_per_sec=API_RATE_LIMIT_PER_SEC):
+    """Coleta várias moedas base em paralelo, cada uma salva em seu próprio arquivo BRONZE.
+
+    As threads compartilham o mesmo pool de conexões e o mesmo rate limiter,
+    então o tempo total fica próximo ao de uma requisição enquanto a cota permitir.
+    Retorna um dicionário {moeda_base: caminho_do_arquivo ou None}.
+    """
+    setup_directories()
+    bases = bases or MOEDAS_BASE
+    workers = max(1, min(max_workers, len(bases)))
+
+    print(f"--- INICIANDO COLETA BRONZE CONCORRENTE ({len(bases)} moedas base) ---")
+
+    rate_limiter = RateLimiter(rate_per_sec, burst=workers)
+    results = {}
+
+    def collect_base(moeda_base):
+        try:
+            raw_bytes = fetch_with_backoff(session, build_api_url(moeda_base), rate_limiter, raw=True)
+            path = _save_bronze(raw_bytes, moeda_base)
+            print(f"   [SUCESSO] {moeda_base}: dados brutos salvos em: {path}")
+            return path
+        except requests.exceptions.RequestException as e:
+            print(f"   [ERRO] {moeda_base}: falha na coleta. Detalhes: {e}")
+            return None
+        except (OSError, ValueError) as e:
+            # Disco cheio ou resposta que não é JSON: só esta moeda base falha, as demais seguem
+            print(f"   [ERRO] {moeda_base}: falha ao salvar na BRONZE. Detalhes: {e}")
+            return None
+
+    with create_session(pool_size=workers) as session:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for moeda_base, path in zip(bases, executor.map(collect_base, bases)):
+                results[moeda_base] = path
+
+    ok = sum(1 for path in results.values() if path)
+    print(f"--- COLETA BRONZE CONCLUÍDA ({ok}/{len(bases)} moedas base) ---")
+    return results
+
 if __name__ == "__main__":
-    collect_and_save_bronze()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Coleta da camada BRONZE.")
+    parser.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: MOEDAS_BASE do .env).")
+    parser.add_argument("--all-bases", action="store_true",
+                        help="Coleta concorrente de todas as moedas em MOEDAS_BASE.")
+    parser.add_argument("--workers", type=int, default=API_MAX_CONCURRENCY,
+                        help="Número máximo de requisições simultâneas.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    if args.bases or args.all_bases:
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        collect_many_bronze(bases, max_workers=args.workers)
+    else:
+        collect_and_save_bronze()
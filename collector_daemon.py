@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from config import (
+    MOEDA_BASE, MOEDAS_BASE, BRONZE_FORMAT, API_MAX_CONCURRENCY, API_RATE_LIMIT_PER_SEC,
+    COLLECTOR_STATE_FILE, COLLECTOR_GRACE_SECONDS, COLLECTOR_RETRY_SECONDS,
+    build_api_url, setup_directories,
+)
+from collect_bronze import RateLimiter, create_session, fetch_with_backoff, _save_bronze
+from metrics import timed, enable_profiling
+
+logger = logging.getLogger(__name__)
+
+# Coletor contínuo da BRONZE.
+# A API informa quando as taxas foram atualizadas (time_last_update_unix) e quando
+# serão de novo (time_next_update_unix). Cada moeda base é buscada logo depois
+# da próxima atualização anunciada (+ COLLECTOR_GRACE_SECONDS), em vez de num
+# horário fixo do cron; respostas com o mesmo time_last_update_unix já visto não
+# são gravadas, e só as moedas base que mudaram seguem para as etapas seguintes.
+
+
+def load_collector_state(path=COLLECTOR_STATE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_collector_state(state, path=COLLECTOR_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def update_date(last_update_unix):
+    """Data (UTC) da atualização das taxas: é ela, e não o relógio local, que nomeia a coleta."""
+    return datetime.fromtimestamp(last_update_unix, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def run_downstream(changed, report=True, use_llm=False):
+    """Etapas seguintes apenas para as coletas novas ({moeda_base: onde a coleta foi gravada})."""
+    if BRONZE_FORMAT == "segments":
+        # Os segmentos ainda não passam pelo run_pipeline: SILVER pelo backfill
+        # (só as coletas novas estão pendentes), GOLD de cada dia normalizado e,
+        # como no run_pipeline, o relatório do dia mais recente da moeda base padrão
+        from process_silver import backfill_silver
+        from aggregate_gold import build_gold, save_gold
+        from silver_store import read_silver
+        report_date = None
+        for silver_path in backfill_silver():
+            df_silver = read_silver(silver_path)
+            save_gold(df_silver, build_gold(df_silver))
+            if (df_silver['base_currency'] == MOEDA_BASE).any():
+                day = df_silver['collected_date'].max().date()
+                report_date = max(report_date or day, day)
+        if report and report_date is not None:
+            from analysis_report import generate_comparison_report
+            generate_comparison_report(report_date=report_date, use_llm=use_llm)
+    else:
+        from run_pipeline import run_pipeline
+        run_pipeline(sorted(changed.values()), report=report, use_llm=use_llm)
+
+
+class Collector:
+    """Agenda por moeda base guiada pelo time_next_update_unix da própria API.
+
+    fetch(base) -> bytes e save(bytes, base, collected_date, collected_at) podem
+    ser substituídos (testes, fontes alternativas); clock é o relógio em segundos unix.
+    """
+
+    def __init__(self, bases=None, on_change=run_downstream, fetch=None, save=_save_bronze,
+                 clock=time.time, state_file=COLLECTOR_STATE_FILE, max_workers=API_MAX_CONCURRENCY):
+        self.bases = bases or MOEDAS_BASE
+        self.on_change = on_change
+        self.fetch = fetch or self._fetch_from_api
+        self.save = save
+        self.clock = clock
+        self.state_file = state_file
+        self.max_workers = max(1, min(max_workers, len(self.bases)))
+        self.state = load_collector_state(state_file)
+        self.lock = threading.Lock()
+        self._session = None
+        self._rate_limiter = RateLimiter(API_RATE_LIMIT_PER_SEC, burst=self.max_workers)
+        self.stats = {"requests": 0, "unchanged": 0, "written": 0, "errors": 0, "downstream_errors": 0}
+
+    def _count(self, key):
+        # As moedas base são coletadas em threads: os contadores são atualizados sob o lock
+        with self.lock:
+            self.stats[key] += 1
+
+    def _retry_later(self, base, seen, now):
+        with self.lock:
+            self.state[base] = {**seen, "next_fetch": now + COLLECTOR_RETRY_SECONDS}
+
+    def _fetch_from_api(self, base):
+        # As moedas base são buscadas em threads: uma única sessão (e pool de conexões) para todas
+        with self.lock:
+            if self._session is None:
+                self._session = create_session(pool_size=self.max_workers)
+        return fetch_with_backoff(self._session, build_api_url(base), self._rate_limiter, raw=True)
+
+    def next_fetch(self, base):
+        """Horário (unix) da próxima busca da moeda base; 0 se nunca foi coletada."""
+        return self.state.get(base, {}).get("next_fetch", 0)
+
+    def due_bases(self, now=None):
+        now = self.clock() if now is None else now
+        return [base for base in self.bases if self.next_fetch(base) <= now]
+
+    def seconds_until_next(self):
+        return max(0.0, min(self.next_fetch(base) for base in self.bases) - self.clock())
+
+    def _collect_base(self, base):
+        """Busca uma moeda base; retorna o local da coleta gravada ou None (sem mudança/erro)."""
+        now = self.clock()
+        with self.lock:
+            seen = self.state.get(base, {})
+        self._count("requests")
+        try:
+            raw_bytes = self.fetch(base)
+            data = json.loads(raw_bytes)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"   [ERRO] {base}: falha na coleta, nova tentativa em {COLLECTOR_RETRY_SECONDS:.0f}s. Detalhes: {e}")
+            self._count("errors")
+            self._retry_later(base, seen, now)
+            return None
+
+        last_update = data.get("time_last_update_unix")
+        next_update = data.get("time_next_update_unix")
+        path = None
+        if last_update is not None and last_update == seen.get("last_update_unix"):
+            self._count("unchanged")
+            print(f"   [PULADO] {base}: sem atualização desde {update_date(last_update)}.")
+        else:
+            collected_date = update_date(last_update) if last_update is not None else None
+            try:
+                path = self.save(raw_bytes, base, collected_date, last_update)
+            except Exception as e:
+                # Disco cheio, permissão, resposta fora do padrão...: a atualização
+                # não é marcada como vista e a moeda é buscada de novo mais tarde
+                print(f"   [ERRO] {base}: falha ao gravar a coleta, nova tentativa em {COLLECTOR_RETRY_SECONDS:.0f}s. Detalhes: {e}")
+                self._count("errors")
+                self._retry_later(base, seen, now)
+                return None
+            self._count("written")
+            print(f"   [SUCESSO] {base}: nova atualização salva em: {path}")
+
+        # Próxima busca logo após a atualização anunciada; se o horário anunciado
+        # já passou (API atrasada), tenta de novo em COLLECTOR_RETRY_SECONDS
+        next_fetch = now + COLLECTOR_RETRY_SECONDS
+        if next_update is not None and next_update + COLLECTOR_GRACE_SECONDS > now:
+            next_fetch = next_update + COLLECTOR_GRACE_SECONDS
+        with self.lock:
+            self.state[base] = {
+                "last_update_unix": last_update if last_update is not None else seen.get("last_update_unix"),
+                "next_update_unix": next_update,
+                "next_fetch": next_fetch,
+                "checked_at": now,
+            }
+        return path
+
+    @timed("collector")
+    def poll(self):
+        """Coleta as moedas base vencidas; dispara as etapas seguintes para as que mudaram.
+
+        Retorna {moeda_base: local da coleta gravada}.
+        """
+        due = self.due_bases()
+        if not due:
+            return {}
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(due))) as executor:
+                paths = dict(zip(due, executor.map(self._collect_base, due)))
+        finally:
+            # O agendamento das moedas já coletadas é gravado mesmo se outra falhou
+            with self.lock:
+                save_collector_state(self.state, self.state_file)
+
+        changed = {base: path for base, path in paths.items() if path}
+        if changed:
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                # As coletas já estão gravadas; as etapas seguintes podem ser refeitas
+                # com run_pipeline.py --backfill sem derrubar o coletor
+                self._count("downstream_errors")
+                logger.exception(f"Falha nas etapas seguintes para {sorted(changed)}: {e}")
+        return changed
+
+    def run(self, stop_event=None, max_polls=None):
+        """Laço principal: dorme até a próxima busca agendada e coleta (Ctrl+C ou stop_event encerra)."""
+        stop_event = stop_event or threading.Event()
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                wait = self.seconds_until_next()
+                if wait > 0:
+                    next_at = datetime.fromtimestamp(self.clock() + wait).isoformat(timespec="seconds")
+                    print(f"   Próxima coleta em {next_at}.")
+                if stop_event.wait(wait):
+                    break
+                try:
+                    self.poll()
+                except Exception as e:
+                    # Ex: falha ao gravar o estado; o laço continua após um intervalo
+                    logger.exception(f"Falha no ciclo do coletor: {e}")
+                    if stop_event.wait(COLLECTOR_RETRY_SECONDS):
+                        break
+                polls += 1
+        finally:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coletor contínuo guiado pelo time_next_update_unix da API.")
+    parser.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: MOEDAS_BASE do .env).")
+    parser.add_argument("--no-report", action="store_true", help="Não gera o relatório após novas coletas.")
+    parser.add_argument("--llm", action="store_true", help="Inclui a análise do LLM no relatório.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc de cada ciclo.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    setup_directories()
+    bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+    collector = Collector(
+        bases,
+        on_change=lambda changed: run_downstream(changed, report=not args.no_report, use_llm=args.llm),
+    )
+    print(f"--- COLETOR CONTÍNUO ({', '.join(collector.bases)}) ---")
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"--- COLETOR ENCERRADO {collector.stats} ---")
@@ -7,6 +7,26 @@ load_dotenv()
 
 # --- Configurações do LLM ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash") # Modelo rápido e eficiente para texto
+# Endpoint do Gemini (vazio = padrão do SDK); o load_test.py aponta para um servidor local
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+
+# Cache em disco das respostas do LLM (validade em segundos e tamanho máximo em bytes)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Enriquecimento em lote: requisições simultâneas, cota de tokens por minuto
+# (prompt + resposta) e retentativas em erros de cota (429) ou do servidor
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "250000"))
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "1024"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+
+# Prompts com dados: orçamento de tokens da tabela enviada (~4 caracteres por token)
+# e quantas moedas de maior variação entram além das de REPORT_CURRENCIES
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "400"))
+LLM_PROMPT_TOP_MOVERS = int(os.getenv("LLM_PROMPT_TOP_MOVERS", "8"))
 
 # --- Configurações da API (Lidas do .env) ---
 # Usamos os.getenv() para ler as variáveis
@@ -14,24 +34,117 @@ API_KEY = os.getenv("API_KEY")
 MOEDA_BASE = os.getenv("MOEDA_BASE", "BRL") # O "BRL" é um valor padrão caso não encontre
 API_BASE_URL = os.getenv("API_BASE_URL")
 
+# Lista de moedas base para a coleta concorrente (ex: MOEDAS_BASE=BRL,USD,EUR)
+MOEDAS_BASE = [m.strip().upper() for m in os.getenv("MOEDAS_BASE", MOEDA_BASE).split(",") if m.strip()]
+
+# Limites da coleta: timeout por requisição, concorrência, cota da API e retentativas
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "10"))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+API_RATE_LIMIT_PER_SEC = float(os.getenv("API_RATE_LIMIT_PER_SEC", "5"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))
+
+
+def build_api_url(moeda_base):
+    """Monta a URL completa da API para uma moeda base, sem hardcode."""
+    return f"{API_BASE_URL}/{API_KEY}/latest/{moeda_base}"
+
 # Monta a URL completa sem hardcode
-URL_API = f"{API_BASE_URL}/{API_KEY}/latest/{MOEDA_BASE}"
+URL_API = build_api_url(MOEDA_BASE)
 
 
 # --- Configurações de Diretórios e Camadas ---
-DATA_DIR = "data_layers"
+# Pode ser redirecionado (ex: benchmarks e testes usam um diretório temporário)
+DATA_DIR = os.getenv("DATA_DIR", "data_layers")
 # Renomeando a camada de RAW para BRONZE (se ainda não o fizemos)
 BRONZE_DIR = os.path.join(DATA_DIR, "bronze")
 SILVER_DIR = os.path.join(DATA_DIR, "silver")
 GOLD_DIR = os.path.join(DATA_DIR, "gold")
 
+# Formato de gravação da BRONZE: "json" (um arquivo por coleta) ou "segments"
+# (segmentos mensais JSONL comprimidos, só de acréscimo, com índice de offsets)
+BRONZE_FORMAT = os.getenv("BRONZE_FORMAT", "json").lower()
+BRONZE_SEGMENTS_DIR = os.path.join(BRONZE_DIR, "segments")
+
+# Dataset GOLD particionado no estilo Hive (year=YYYY/month=MM)
+GOLD_DATASET_DIR = os.path.join(GOLD_DIR, "dataset")
+
+# Matrizes N×N de taxas cruzadas (uma por dia e moeda base) e o índice moeda -> inteiro
+CROSS_RATES_DIR = os.path.join(GOLD_DIR, "cross_rates")
+CURRENCY_INDEX_FILE = os.path.join(CROSS_RATES_DIR, "currency_index.json")
+
+# Serviço local de conversão (HTTP + API em processo): vetores de taxas por data
+# mantidos em cache LRU e recarga quando um novo dia GOLD é gravado
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_CACHE_DAYS = int(os.getenv("SERVICE_CACHE_DAYS", "256"))
+SERVICE_RELOAD_SECONDS = float(os.getenv("SERVICE_RELOAD_SECONDS", "1"))
+
+# Estado incremental das estatísticas móveis (volatilidade, médias, drawdown)
+ANALYTICS_DIR = os.path.join(GOLD_DIR, "analytics")
+ANALYTICS_WINDOWS = [int(w) for w in os.getenv("ANALYTICS_WINDOWS", "7,30").split(",")]
+
+# Cache das respostas do LLM, endereçado pelo hash de modelo + prompt + dados GOLD
+LLM_CACHE_DIR = os.path.join(DATA_DIR, "llm_cache")
+
+# Upserts do GOLD gravam arquivos delta na partição do mês; a partir deste número
+# de deltas a partição é compactada (em segundo plano) de volta em part-0.parquet
+GOLD_COMPACT_MIN_FILES = int(os.getenv("GOLD_COMPACT_MIN_FILES", "8"))
+
+# Dias de GOLD lidos antes da data do relatório: referências as-of das comparações
+# DoD/WoW/MoM quando o dia anterior não tem cotação (fins de semana, falhas de coleta)
+REPORT_LOOKBACK_DAYS = int(os.getenv("REPORT_LOOKBACK_DAYS", "40"))
+# Maior distância (dias) entre a data pedida e a observação usada no lugar dela
+REPORT_MAX_GAP_DAYS = int(os.getenv("REPORT_MAX_GAP_DAYS", "5"))
+
+# Moedas exibidas no gráfico e na análise do relatório (o GOLD guarda todas)
+REPORT_CURRENCIES = [m.strip().upper() for m in os.getenv("REPORT_CURRENCIES", "USD,EUR,JPY").split(",") if m.strip()]
+
+# Insights do LLM por (data, moeda base), particionados por mês ao lado do GOLD
+INSIGHTS_DIR = os.path.join(GOLD_DIR, "insights")
+
+# Gráficos gerados em lote (intervalo de datas × moedas base) e o hash dos dados de cada um
+REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+
+# Métricas por etapa (log JSON estruturado + textfile do Prometheus) e perfis do --profile
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+PROFILE_DIR = os.path.join(METRICS_DIR, "profiles")
+PIPELINE_PROFILE = os.getenv("PIPELINE_PROFILE", "0") == "1"
+
+# Coletor contínuo (collector_daemon.py): última atualização vista por moeda base
+# e agenda da próxima coleta, derivada do time_next_update_unix da API
+COLLECTOR_STATE_FILE = os.path.join(DATA_DIR, "_collector_state.json")
+COLLECTOR_GRACE_SECONDS = float(os.getenv("COLLECTOR_GRACE_SECONDS", "60"))
+COLLECTOR_RETRY_SECONDS = float(os.getenv("COLLECTOR_RETRY_SECONDS", "600"))
+
+# Estado do run_pipeline: hash das entradas de cada etapa por arquivo BRONZE
+PIPELINE_STATE_FILE = os.path.join(DATA_DIR, "_pipeline_state.json")
+
+# Formato dos arquivos da SILVER: "arrow" (Arrow IPC tipado, lido por memory map,
+# ver silver_store.py) ou "csv" (o formato antigo, legível em qualquer ferramenta)
+SILVER_FORMAT = os.getenv("SILVER_FORMAT", "arrow").lower()
+
+# Manifesto do backfill da SILVER (watermark + arquivos BRONZE já processados)
+SILVER_MANIFEST = os.path.join(SILVER_DIR, "_manifest.json")
+
+# Regras de qualidade da SILVER: linhas reprovadas vão para a tabela de quarentena
+# (Parquet particionado por mês). Os limites de anomalia comparam cada taxa com
+# os QUALITY_HISTORY_DAYS dias anteriores da mesma moeda e base.
+QUARANTINE_DIR = os.path.join(SILVER_DIR, "quarantine")
+QUALITY_HISTORY_DAYS = int(os.getenv("QUALITY_HISTORY_DAYS", "30"))
+QUALITY_ZSCORE_MAX = float(os.getenv("QUALITY_ZSCORE_MAX", "6"))
+QUALITY_MAX_PCT_JUMP = float(os.getenv("QUALITY_MAX_PCT_JUMP", "0.25"))
+
 
 # --- Nomenclatura dos Arquivos (YYYY-MM-DD) ---
 # O professor solicitou o formato YYYY-MM-DD no nome do arquivo
-DATE_STR = datetime.now().strftime("%Y-%m-%d")
+def current_date_str():
+    """Data de coleta calculada a cada chamada (e não na importação do módulo).
 
-# O nome base do arquivo será apenas a data de coleta, como solicitado
-FILENAME_BASE = f"{DATE_STR}"
+    Um processo que atravessa a meia-noite (cron frequente, coletor contínuo)
+    passa a gravar no arquivo do novo dia sem precisar ser reiniciado.
+    """
+    return datetime.now().strftime("%Y-%m-%d")
 
 
 def setup_directories():
@@ -40,4 +153,6 @@ def setup_directories():
     os.makedirs(BRONZE_DIR, exist_ok=True)
     os.makedirs(SILVER_DIR, exist_ok=True)
     os.makedirs(GOLD_DIR, exist_ok=True)
+    os.makedirs(GOLD_DATASET_DIR, exist_ok=True)
+    os.makedirs(CROSS_RATES_DIR, exist_ok=True)
     print("Diretórios de camadas de dados verificados.")
\ No newline at end of file
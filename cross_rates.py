@@ -0,0 +1,156 @@
+import os
+import json
+import argparse
+from datetime import date, datetime
+from functools import lru_cache
+import numpy as np
+from config import CROSS_RATES_DIR, CURRENCY_INDEX_FILE, MOEDA_BASE
+from catalog import matrix_catalog
+
+# Matriz de taxas cruzadas: M[i, j] = quantas unidades da moeda j valem 1 unidade da moeda i.
+# As moedas são mapeadas para inteiros por um índice global e estável (currency_index.json),
+# então a posição de uma moeda é a mesma em todas as matrizes, de todos os dias.
+
+
+def _date_str(value):
+    """Normaliza str/date/datetime para o formato YYYY-MM-DD."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def load_currency_index(index_file=CURRENCY_INDEX_FILE):
+    """Carrega a lista de códigos de moeda; a posição na lista é o id inteiro."""
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def update_currency_index(new_codes, index_file=CURRENCY_INDEX_FILE):
+    """Acrescenta ao índice os códigos ainda desconhecidos (os ids existentes nunca mudam)."""
+    codes = load_currency_index(index_file)
+    known = set(codes)
+    added = [code for code in new_codes if code not in known and not known.add(code)]
+    if added:
+        codes.extend(added)
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        tmp_path = f"{index_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(codes, f)
+        os.replace(tmp_path, index_file)
+        _code_lookup.cache_clear()
+    return codes
+
+@lru_cache(maxsize=4)
+def _code_lookup(index_file=CURRENCY_INDEX_FILE):
+    """Estruturas de busca do índice: dict código -> id e arrays ordenados para busca vetorizada."""
+    codes = load_currency_index(index_file)
+    ids = {code: i for i, code in enumerate(codes)}
+    codes_array = np.array(codes, dtype='U8')
+    order = np.argsort(codes_array)
+    return ids, codes_array[order], order
+
+def currency_ids(codes, index_file=CURRENCY_INDEX_FILE):
+    """Converte um array de códigos em ids inteiros (-1 para moedas desconhecidas)."""
+    _, sorted_codes, order = _code_lookup(index_file)
+    query = np.asarray(codes, dtype='U8')
+    if len(sorted_codes) == 0:
+        return np.full(query.shape, -1, dtype=np.int64)
+    pos = np.searchsorted(sorted_codes, query)
+    pos = np.clip(pos, 0, len(sorted_codes) - 1)
+    found = sorted_codes[pos] == query
+    return np.where(found, order[pos], -1)
+
+def build_cross_rate_matrix(currencies, rates, index_codes):
+    """Calcula a matriz completa de taxas cruzadas com uma única divisão externa (outer) do NumPy.
+
+    currencies/rates são as taxas de um dia em relação à moeda base
+    (1 BASE = rate unidades de currency). Moedas ausentes no dia ficam NaN.
+    """
+    ids = {code: i for i, code in enumerate(index_codes)}
+    vector = np.full(len(index_codes), np.nan)
+    vector[[ids[c] for c in currencies]] = np.asarray(rates, dtype=np.float64)
+
+    # M[i, j] = (BASE -> j) / (BASE -> i)
+    with np.errstate(invalid='ignore'):
+        return vector[np.newaxis, :] / vector[:, np.newaxis]
+
+def currency_index_path(directory):
+    return os.path.join(directory, os.path.basename(CURRENCY_INDEX_FILE))
+
+def matrix_path(date_value, base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    return os.path.join(directory, f"{_date_str(date_value)}_{base}.npy")
+
+def save_cross_rate_matrices(df_silver, directory=CROSS_RATES_DIR):
+    """Gera e salva a matriz de taxas cruzadas de cada (dia, moeda base) de um DataFrame SILVER."""
+    os.makedirs(directory, exist_ok=True)
+    index_file = currency_index_path(directory)
+    index_codes = update_currency_index(df_silver['currency'].unique(), index_file=index_file)
+
+    catalog = matrix_catalog(directory)
+    written = []
+    for (collected_date, base), df_day in df_silver.groupby(['collected_date', 'base_currency']):
+        matrix = build_cross_rate_matrix(df_day['currency'].values, df_day['rate'].values, index_codes)
+        file_path = matrix_path(collected_date, base, directory)
+        tmp_path = f"{file_path}.tmp.npy"
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, file_path)
+        catalog.register(
+            file_path, collected_date, base_currency=base, rows=matrix.shape[0],
+            schema={"dtype": str(matrix.dtype), "shape": list(matrix.shape)},
+        )
+        written.append(file_path)
+    load_cross_rate_matrix.cache_clear()
+    return written
+
+@lru_cache(maxsize=64)
+def load_cross_rate_matrix(date_value, base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    """Abre a matriz de um dia via memory-map (somente as páginas acessadas são lidas)."""
+    return np.load(matrix_path(date_value, base, directory), mmap_mode='r')
+
+def convert(date_value, from_code, to_code, amount=1.0, base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    """Converte amount de from_code para to_code na data informada (busca O(1) na matriz)."""
+    ids, _, _ = _code_lookup(currency_index_path(directory))
+    matrix = load_cross_rate_matrix(_date_str(date_value), base, directory)
+    try:
+        i, j = ids[from_code], ids[to_code]
+        rate = matrix[i, j]
+    except (KeyError, IndexError):
+        raise KeyError(f"Par {from_code}/{to_code} indisponível em {_date_str(date_value)}.")
+    return float(rate) * amount
+
+def convert_batch(date_value, from_codes, to_codes, amounts, base=MOEDA_BASE, directory=CROSS_RATES_DIR):
+    """Conversão vetorizada de muitas linhas (from, to, amount) de uma só vez.
+
+    from_codes/to_codes podem ser códigos (str) ou ids inteiros já codificados
+    por currency_ids(). Pares indisponíveis resultam em NaN.
+    """
+    index_file = currency_index_path(directory)
+    matrix = load_cross_rate_matrix(_date_str(date_value), base, directory)
+
+    def to_ids(codes):
+        codes = np.asarray(codes)
+        ids = codes.astype(np.int64) if codes.dtype.kind in 'iu' else currency_ids(codes, index_file)
+        # Moedas criadas depois desta matriz também ficam indisponíveis
+        return np.where(ids < matrix.shape[0], ids, -1)
+
+    i, j = to_ids(from_codes), to_ids(to_codes)
+    valid = (i >= 0) & (j >= 0)
+    rates = matrix[np.where(valid, i, 0), np.where(valid, j, 0)]
+    return np.where(valid, rates, np.nan) * np.asarray(amounts, dtype=np.float64)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversão de moedas usando a matriz de taxas cruzadas GOLD.")
+    parser.add_argument("date", help="Data da cotação (YYYY-MM-DD).")
+    parser.add_argument("from_code", help="Moeda de origem (ex: USD).")
+    parser.add_argument("to_code", help="Moeda de destino (ex: EUR).")
+    parser.add_argument("amount", type=float, nargs="?", default=1.0)
+    parser.add_argument("--base", default=MOEDA_BASE, help="Moeda base da coleta usada na matriz.")
+    args = parser.parse_args()
+
+    try:
+        result = convert(args.date, args.from_code.upper(), args.to_code.upper(), args.amount, base=args.base)
+        print(f"{args.amount:.4f} {args.from_code.upper()} = {result:.4f} {args.to_code.upper()}")
+    except (FileNotFoundError, KeyError) as e:
+        print(f"[ERRO] {e}")
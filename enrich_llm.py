@@ -1,86 +1,106 @@
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from datetime import datetime
 import pandas as pd
-import os
-import json
-from google import genai
-from google.genai.errors import APIError
-from config import GOLD_DIR, GEMINI_API_KEY, setup_directories
+from config import (
+    LLM_MODEL, MOEDA_BASE, GOLD_DATASET_DIR, INSIGHTS_DIR, REPORT_CURRENCIES,
+    LLM_MAX_CONCURRENCY, LLM_TOKENS_PER_MINUTE, setup_directories,
+)
+from gold_store import latest_gold_date, query_gold, gold_partition_files, write_gold_partition
+from gold_index import GoldIndex
+from llm_prompt import compact_rates_table, comparison_changes, gold_rates
 
 # --- Configuração do LLM ---
-# A inicialização é feita fora das funções para reuso
-try:
-    if not GEMINI_API_KEY:
-        raise ValueError("A chave GEMINI_API_KEY não foi encontrada no .env.")
+# O cliente Gemini e o cache de respostas ficam na camada compartilhada llm.py
+from llm import generate_text, generate_text_async, get_client, get_cache, stream_printer, TokenBudget
+from metrics import timed, record_rows, enable_profiling
+
+# Tabela de insights (data_layers/gold/insights/year=/month=): um texto por (data, moeda base)
+INSIGHTS_KEY = ['collected_date', 'base_currency']
+INSIGHTS_COLUMNS = ['collected_date', 'base_currency', 'model', 'insights', 'generated_at']
+
+
+def build_insights_prompt(df_gold, base_currency=MOEDA_BASE, changes=None):
+    """Prompt dos insights para a linha GOLD de uma moeda base.
+
+    changes (moedas × DoD/WoW/MoM, ver llm_prompt.comparison_changes) escolhe as
+    moedas de maior variação que entram na tabela junto com as do relatório.
+    """
+    # Tabela compacta para o LLM (moedas do relatório + maiores variações, dentro do orçamento de tokens)
+    data_for_llm = compact_rates_table(gold_rates(df_gold), changes)
+    collected_date = pd.Timestamp(df_gold['collected_date'].iloc[0]).date()
+    return f"""
+    A tabela abaixo (separada por ';') contém as taxas de câmbio de {collected_date} em relação à moeda base ({base_currency}): 1 {base_currency} = taxa unidades da moeda. As colunas DoD%, WoW% e MoM%, quando presentes, são a variação percentual contra o dia, a semana e o mês anteriores ('-' = sem referência). Estão as moedas do relatório ({', '.join(REPORT_CURRENCIES)}) e as de maior variação no dia.
     
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    LLM_MODEL = 'gemini-2.5-flash' # Modelo rápido e eficiente para texto
-except ValueError as e:
-    print(f"[ERRO DE CONFIGURAÇÃO] {e}")
-    client = None
+    Dados da Tabela GOLD:
+    {data_for_llm}
+    
+    Com base nesses dados, crie dois parágrafos distintos:
+    1. Resumo Executivo: Uma explicação simples, em termos de negócio, sobre como está a variação das moedas do relatório ({', '.join(REPORT_CURRENCIES)}) frente à moeda base ({base_currency}) HOJE, focando nas taxas de câmbio atuais e citando as maiores variações. Não inclua a data na resposta.
+    2. Análise Sugerida: Uma sugestão de análise que poderia ser feita se houvesse dados históricos (como volatilidade, comparação com o mês passado). Use exemplos como: "A volatilidade do JPY em relação ao USD está acima da média" ou "O Euro está 5% mais valorizado em relação ao mês passado."
 
+    Formate sua resposta usando os cabeçalhos 'Resumo Executivo:' e 'Análise Sugerida:'.
+    """
 
-def get_latest_gold_file():
-    """Encontra o arquivo .parquet mais recente na pasta GOLD."""
-    try:
-        files = [f for f in os.listdir(GOLD_DIR) if f.endswith('_gold.parquet')]
-        if not files:
-            return None
-        files.sort(reverse=True)
-        return os.path.join(GOLD_DIR, files[0])
-    except FileNotFoundError:
+def day_changes(df_changes, collected_date, base_currency):
+    """Variações (moedas × períodos) de um (dia, moeda base) em GoldIndex.changes_frame, ou None."""
+    if df_changes is None or df_changes.empty:
         return None
+    match = df_changes[(df_changes['collected_date'] == pd.Timestamp(collected_date))
+                       & (df_changes['base_currency'] == base_currency)]
+    return comparison_changes(match.iloc[0]) if not match.empty else None
 
+def load_latest_gold_data():
+    """Carrega do dataset GOLD as linhas da data mais recente (ou None)."""
+    latest_date = latest_gold_date()
+    if latest_date is None:
+        return None, None
+    return latest_date, query_gold(latest_date)
+
+@timed("enrich")
 def generate_insights_with_llm():
     """Lê os dados Gold e usa o LLM para gerar insights e explicações."""
     
-    if not client:
-        print("[AVISO] O LLM não pode ser utilizado pois a chave de API está ausente ou inválida.")
-        return
-
     setup_directories()
     print("--- INICIANDO ENRIQUECIMENTO COM LLM ---")
 
-    # 1. Encontrar e Ler o arquivo GOLD (Parquet)
-    gold_path = get_latest_gold_file()
-    if not gold_path:
-        print("[ERRO] Nenhum arquivo Parquet encontrado na camada GOLD. Execute 'aggregate_gold.py' primeiro.")
+    # 1. Encontrar e Ler os dados GOLD mais recentes (dataset Parquet particionado)
+    latest_date, df_gold = load_latest_gold_data()
+    if df_gold is None or df_gold.empty:
+        print("[ERRO] Nenhum dado encontrado na camada GOLD. Execute 'aggregate_gold.py' primeiro.")
         return
     
-    df_gold = pd.read_parquet(gold_path)
-    print(f"   Lendo dados de: {gold_path}")
+    print(f"   Lendo dados GOLD de: {latest_date}")
+    record_rows("enrich", "read", len(df_gold))
 
-    # 2. Preparar os dados para o Prompt
-    # Convertendo o DataFrame em uma string Markdown ou JSON para o LLM
-    data_for_llm = df_gold.to_markdown(index=False)
-    
-    # 3. Definir o Prompt e enviar ao LLM
-    prompt = f"""
-    A tabela abaixo contém as taxas de câmbio mais recentes em relação ao Real Brasileiro (BRL).
-    
-    Dados da Tabela GOLD:
-    {data_for_llm}
-    
-    Com base nesses dados, crie dois parágrafos distintos:
-    1. Resumo Executivo: Uma explicação simples, em termos de negócio, sobre como está a variação das 3 principais moedas (USD, EUR, JPY) frente ao Real (BRL) HOJE, focando nas taxas de câmbio atuais. Não inclua a data na resposta.
-    2. Análise Sugerida: Uma sugestão de análise que poderia ser feita se houvesse dados históricos (como volatilidade, comparação com o mês passado). Use exemplos como: "A volatilidade do JPY em relação ao USD está acima da média" ou "O Euro está 5% mais valorizado em relação ao mês passado."
-
-    Formate sua resposta usando os cabeçalhos 'Resumo Executivo:' e 'Análise Sugerida:'.
-    """
+    # 2. Preparar os dados e o Prompt (moeda base padrão; variações as-of do histórico recente)
+    base_currency = MOEDA_BASE if (df_gold['base_currency'] == MOEDA_BASE).any() else df_gold['base_currency'].iloc[0]
+    df_changes = GoldIndex.load(latest_date).changes_frame([latest_date], bases=[base_currency])
+    prompt = build_insights_prompt(
+        df_gold[df_gold['base_currency'] == base_currency], base_currency,
+        day_changes(df_changes, latest_date, base_currency),
+    )
     
     print("   Enviando dados para o LLM para gerar insights...")
+    # Import tardio: o SDK do Gemini só é carregado quando a etapa chega ao LLM
+    from google.genai.errors import APIError
 
     try:
-        # 4. Chamada da API do Gemini
-        response = client.models.generate_content(
+        # 4. Chamada da API do Gemini (ou resposta do cache, se dados e prompt não mudaram);
+        # 5. os resultados são impressos em streaming, à medida que os trechos chegam
+        insights = generate_text(
+            prompt,
             model=LLM_MODEL,
-            contents=prompt
+            source_paths=gold_partition_files(latest_date),
+            on_text=stream_printer("✨ INSIGHTS GERADOS PELO LLM ✨"),
         )
+        if insights is None:
+            print("[AVISO] O LLM não pode ser utilizado pois a chave de API está ausente ou inválida.")
+            return
 
-        # 5. Imprimir Resultados
         print("\n" + "="*50)
-        print("          ✨ INSIGHTS GERADOS PELO LLM ✨")
-        print("="*50)
-        print(response.text)
-        print("="*50)
+        print(f"   Cache LLM: {get_cache().save_stats()}")
 
     except APIError as e:
         print(f"[ERRO DE API DO LLM] Falha ao comunicar com a API Gemini: {e}")
@@ -88,5 +108,142 @@ def generate_insights_with_llm():
         print(f"[ERRO INESPERADO] {e}")
 
 
+# --- Enriquecimento em lote (intervalo de datas × moedas base) ---
+
+def query_insights(start_date, end_date=None, root=INSIGHTS_DIR):
+    """Insights gravados no intervalo de datas (DataFrame possivelmente vazio)."""
+    return query_gold(start_date, end_date, root=root)
+
+def write_insights(df_insights, root=INSIGHTS_DIR):
+    """Grava (upsert por data e moeda base) os insights na tabela particionada por mês."""
+    if df_insights is None or df_insights.empty:
+        return []
+    return write_gold_partition(df_insights, root=root, key_columns=INSIGHTS_KEY)
+
+async def _enrich_jobs(jobs, client, model, max_concurrency, tokens_per_minute, cache, root=INSIGHTS_DIR):
+    """Dispara as requisições do lote, no máximo max_concurrency ao mesmo tempo.
+
+    Os insights de um mês são gravados assim que o último pedido do mês termina
+    (e os já gerados são gravados se o lote for interrompido): um lote longo não
+    perde as respostas já pagas ao LLM. Retorna (linhas geradas, arquivos gravados).
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    budget = TokenBudget(tokens_per_minute)
+
+    async def run(collected_date, base_currency, prompt):
+        async with semaphore:
+            try:
+                text = await generate_text_async(prompt, client, model=model, cache=cache, budget=budget)
+            except Exception as e:
+                print(f"   [ERRO] {collected_date} {base_currency}: falha ao gerar insights: {e}")
+                return collected_date, None
+        print(f"   [SUCESSO] {collected_date} {base_currency}: insights gerados.")
+        return collected_date, {
+            'collected_date': collected_date,
+            'base_currency': base_currency,
+            'model': model,
+            'insights': text,
+            'generated_at': datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def month_of(collected_date):
+        return pd.Timestamp(collected_date).strftime("%Y-%m")
+
+    remaining = Counter(month_of(job[0]) for job in jobs)
+    pending_rows = defaultdict(list)  # mês -> linhas ainda não gravadas
+    rows, written = [], []
+
+    def flush(month):
+        month_rows = pending_rows.pop(month, [])
+        if month_rows:
+            written.extend(write_insights(pd.DataFrame(month_rows, columns=INSIGHTS_COLUMNS), root=root))
+
+    # Tarefas criadas na ordem dos pedidos (por data): o semáforo os libera nessa ordem e os meses terminam em sequência
+    tasks = [asyncio.ensure_future(run(*job)) for job in jobs]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            collected_date, row = await next_result
+            month = month_of(collected_date)
+            if row is not None:
+                rows.append(row)
+                pending_rows[month].append(row)
+            remaining[month] -= 1
+            if not remaining[month]:
+                flush(month)
+    finally:
+        for month in list(pending_rows):
+            flush(month)
+    return rows, written
+
+@timed("enrich")
+def enrich_date_range(start_date, end_date=None, bases=None, client=None, model=LLM_MODEL,
+                      max_concurrency=LLM_MAX_CONCURRENCY, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                      force=False, root=INSIGHTS_DIR, gold_root=GOLD_DATASET_DIR, cache=None):
+    """Gera os insights de cada (data, moeda base) do GOLD no intervalo, em requisições assíncronas.
+
+    Pares que já têm insights na tabela são pulados (a menos que force=True),
+    então um lote interrompido pode ser retomado. O prompt já contém os dados do
+    dia, então o cache do LLM é endereçado só por modelo + prompt. Os insights
+    de cada mês são gravados (upsert na partição mensal) assim que o mês termina.
+    Retorna o DataFrame de insights gerados (ou None se o LLM não estiver configurado).
+    """
+    print("--- INICIANDO ENRIQUECIMENTO EM LOTE COM LLM ---")
+    # O histórico antes do intervalo dá as referências das variações DoD/WoW/MoM
+    index = GoldIndex.load(start_date, end_date, root=gold_root)
+    df_gold = query_gold(start_date, end_date, root=gold_root)
+    if bases:
+        df_gold = df_gold[df_gold['base_currency'].isin(bases)]
+    record_rows("enrich", "read", len(df_gold))
+
+    if not force and not df_gold.empty:
+        done = query_insights(start_date, end_date, root=root)
+        if not done.empty:
+            done_keys = pd.MultiIndex.from_frame(done[INSIGHTS_KEY])
+            df_gold = df_gold[~pd.MultiIndex.from_frame(df_gold[INSIGHTS_KEY]).isin(done_keys)]
+
+    df_changes = index.changes_frame(df_gold['collected_date'].unique(), bases=list(df_gold['base_currency'].unique()))
+    jobs = [
+        (collected_date, base_currency, build_insights_prompt(
+            df_day, base_currency, day_changes(df_changes, collected_date, base_currency),
+        ))
+        for (collected_date, base_currency), df_day in df_gold.groupby(INSIGHTS_KEY, sort=True)
+    ]
+    if not jobs:
+        print("   Nenhum dia pendente de insights no intervalo.")
+        return pd.DataFrame(columns=INSIGHTS_COLUMNS)
+
+    client = client or get_client()
+    if client is None:
+        print("[AVISO] O LLM não pode ser utilizado pois a chave de API está ausente ou inválida.")
+        return None
+
+    cache = cache or get_cache()
+    print(f"   {len(jobs)} pedidos ao LLM (até {max_concurrency} simultâneos, {tokens_per_minute} tokens/min)...")
+    rows, written = asyncio.run(_enrich_jobs(jobs, client, model, max_concurrency, tokens_per_minute, cache, root))
+    df_insights = pd.DataFrame(rows, columns=INSIGHTS_COLUMNS).sort_values(INSIGHTS_KEY, ignore_index=True)
+
+    record_rows("enrich", "written", len(df_insights))
+    print(f"   Cache LLM: {cache.save_stats()}")
+    print(f"--- ENRIQUECIMENTO CONCLUÍDO ({len(df_insights)}/{len(jobs)} pedidos) em: {', '.join(written) or '-'} ---")
+    return df_insights
+
+
 if __name__ == "__main__":
-    generate_insights_with_llm()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Enriquecimento dos dados GOLD com o LLM.")
+    parser.add_argument("--start", help="Modo em lote: data inicial (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Modo em lote: data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    parser.add_argument("--bases", help="Moedas base separadas por vírgula (padrão: todas do GOLD).")
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY, help="Requisições simultâneas ao LLM.")
+    parser.add_argument("--tpm", type=int, default=LLM_TOKENS_PER_MINUTE, help="Cota de tokens por minuto.")
+    parser.add_argument("--force", action="store_true", help="Regera insights já gravados.")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    if args.start:
+        bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+        enrich_date_range(args.start, args.end, bases=bases, max_concurrency=args.concurrency,
+                          tokens_per_minute=args.tpm, force=args.force)
+    else:
+        generate_insights_with_llm()
@@ -0,0 +1,371 @@
+import os
+import json
+import glob
+import math
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import date, datetime, timezone
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from rate_snapshot import RateSnapshot
+
+# Servidores locais que substituem a ExchangeRate-API e o Gemini em testes de carga.
+# A API de câmbio reenvia coletas gravadas na BRONZE (com uma pequena variação
+# determinística por dia e troca de base), o Gemini devolve respostas prontas, e
+# ambos injetam latência, erros 5xx e 429 com Retry-After conforme um FaultProfile.
+# A pipeline é apontada para eles por API_BASE_URL e GEMINI_BASE_URL (config.py).
+# Este módulo não importa config: o DATA_DIR do teste pode ser definido depois.
+
+RECORDED_BRONZE_DIR = os.path.join("data_layers", "bronze")
+
+DEFAULT_LLM_ANSWER = (
+    "**Análise (resposta simulada do servidor de teste de carga):** as moedas principais "
+    "variaram pouco em relação à moeda base; nenhuma tendência relevante no período."
+)
+
+
+class FaultProfile:
+    """Latência (média ± jitter, em ms) e taxas de erro 5xx e de 429 injetadas em cada resposta."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def decide(self):
+        """(espera em segundos, status de falha ou None) da próxima resposta."""
+        with self.lock:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            draw = self.random.random()
+        if draw < self.throttle_rate:
+            return delay, 429
+        if draw < self.throttle_rate + self.error_rate:
+            return delay, 503
+        return delay, None
+
+    def as_dict(self):
+        return {
+            "latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate,
+            "throttle_rate": self.throttle_rate, "retry_after": self.retry_after,
+        }
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Base dos handlers: resposta JSON e falhas injetadas antes de atender a rota."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    service = None
+
+    def _send_json(self, status, payload, headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.service.count(status)
+
+    def _inject_fault(self):
+        """Aplica a latência sorteada; True se a resposta já foi uma falha injetada."""
+        delay, status = self.service.fault.decide()
+        if delay:
+            time.sleep(delay)
+        if status is None:
+            return False
+        headers = {"Retry-After": f"{self.service.fault.retry_after:g}"} if status == 429 else None
+        self._send_json(status, self.service.error_payload(status), headers)
+        return True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeService:
+    """Servidor HTTP local numa thread própria (port=0 escolhe uma porta livre)."""
+
+    handler = FakeHandler
+
+    def __init__(self, fault=None, host="127.0.0.1", port=0):
+        self.fault = fault or FaultProfile()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        handler = type(f"Bound{self.handler.__name__}", (self.handler,), {"service": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, status):
+        with self.lock:
+            self.stats[str(status)] += 1
+
+    def error_payload(self, status):
+        return {"error": status}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --- ExchangeRate-API ---
+
+def load_recorded_payloads(directory=RECORDED_BRONZE_DIR):
+    """Respostas válidas da API gravadas na BRONZE (uma por arquivo JSON, em ordem de nome)."""
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get("result") == "success" and "conversion_rates" in payload:
+            payloads.append(payload)
+    if not payloads:
+        raise FileNotFoundError(f"Nenhuma resposta da API gravada em {directory}.")
+    return payloads
+
+
+class ExchangeRateHandler(FakeHandler):
+    """GET /<chave>/latest/<moeda base> no formato da ExchangeRate-API v6."""
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) != 3 or parts[1] != "latest":
+            self._send_json(404, {"result": "error", "error-type": "unknown-endpoint"})
+            return
+        if self._inject_fault():
+            return
+        body = self.service.payload(parts[2].upper())
+        if body is None:
+            self._send_json(404, {"result": "error", "error-type": "unsupported-code"})
+        else:
+            self._send_json(200, body)
+
+
+class FakeExchangeRateAPI(FakeService):
+    """Reenvia as coletas gravadas como se a API publicasse uma atualização por dia.
+
+    `day` (0, 1, ...) escolhe a atualização servida: time_last_update_unix é
+    start_date + day dias (00:00 UTC), e as taxas são as da coleta gravada
+    day % N com uma variação log-normal determinística por dia, trocadas para a
+    moeda base pedida (a taxa da própria base continua exatamente 1).
+    """
+
+    handler = ExchangeRateHandler
+
+    def __init__(self, recorded_dir=RECORDED_BRONZE_DIR, start_date=None, volatility=0.003, **kwargs):
+        super().__init__(**kwargs)
+        self.recorded = [
+            RateSnapshot.from_payload(payload, "1970-01-01") for payload in load_recorded_payloads(recorded_dir)
+        ]
+        start = date.fromisoformat(str(start_date)) if start_date else date.today()
+        self.start_unix = int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp())
+        self.volatility = volatility
+        self.day = 0
+        self._cache = {}
+
+    def update_unix(self, day=None):
+        return self.start_unix + 86400 * (self.day if day is None else day)
+
+    def snapshot(self, day):
+        """Taxas (base da coleta gravada) da atualização do dia, com a variação do dia aplicada."""
+        recorded = self.recorded[day % len(self.recorded)]
+        rng = random.Random(day)
+        rates = [rate * math.exp(rng.gauss(0.0, self.volatility)) for rate in recorded.rates]
+        return RateSnapshot(recorded.collected_date, recorded.base_currency, recorded.ids, rates)
+
+    def payload(self, base, day=None):
+        """Corpo JSON (bytes) da resposta para a moeda base; None se ela não é cotada."""
+        day = self.day if day is None else day
+        key = (base, day)
+        with self.lock:
+            body = self._cache.get(key)
+        if body is not None:
+            return body
+        try:
+            snapshot = self.snapshot(day).rebase(base)
+        except KeyError:
+            return None
+        last_update = self.update_unix(day)
+        body = json.dumps({
+            "result": "success",
+            "documentation": "https://www.exchangerate-api.com/docs",
+            "terms_of_use": "https://www.exchangerate-api.com/terms",
+            "time_last_update_unix": last_update,
+            "time_last_update_utc": datetime.fromtimestamp(last_update, tz=timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000"),
+            "time_next_update_unix": last_update + 86400,
+            "time_next_update_utc": datetime.fromtimestamp(last_update + 86400, tz=timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000"),
+            "base_code": base,
+            "conversion_rates": dict(zip(snapshot.codes(), snapshot.rates)),
+        }).encode('utf-8')
+        with self.lock:
+            self._cache[key] = body
+        return body
+
+    def error_payload(self, status):
+        error_type = "quota-reached" if status == 429 else "internal-error"
+        return {"result": "error", "error-type": error_type}
+
+
+# --- Gemini (generateContent da API REST v1beta) ---
+
+class GeminiHandler(FakeHandler):
+    """POST /<versão>/models/<modelo>:generateContent (ou :streamGenerateContent, em SSE) com uma resposta pronta."""
+
+    def _send_stream(self, chunks):
+        """Eventos SSE ("data: <json>") em chunked encoding, com chunk_ms entre um trecho e outro."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i and self.service.chunk_ms:
+                time.sleep(self.service.chunk_ms / 1000)
+            event = f"data: {json.dumps(chunk)}\r\n\r\n".encode('utf-8')
+            self.wfile.write(f"{len(event):X}\r\n".encode('ascii') + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        self.service.count(200)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        path = urlparse(self.path).path
+        stream = path.endswith(":streamGenerateContent")
+        if not stream and not path.endswith(":generateContent"):
+            self._send_json(404, self.service.error_payload(404))
+            return
+        if self._inject_fault():
+            return
+        try:
+            request = json.loads(body)
+            prompt = "".join(part.get("text", "") for content in request["contents"] for part in content["parts"])
+        except (KeyError, TypeError, ValueError):
+            self._send_json(400, self.service.error_payload(400))
+            return
+        if stream:
+            self._send_stream(self.service.response_chunks(prompt))
+        else:
+            self._send_json(200, self.service.response(prompt))
+
+
+class FakeGemini(FakeService):
+    """Devolve as respostas prontas em rodízio, com usage_metadata estimado (~4 caracteres por token).
+
+    Em streaming, a resposta sai em trechos de words_per_chunk palavras, chunk_ms entre eles.
+    """
+
+    handler = GeminiHandler
+    STATUS_NAMES = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}
+
+    def __init__(self, answers=None, chunk_ms=0.0, words_per_chunk=8, **kwargs):
+        super().__init__(**kwargs)
+        self.answers = list(answers or [DEFAULT_LLM_ANSWER])
+        self.chunk_ms = chunk_ms
+        self.words_per_chunk = words_per_chunk
+        self._next = 0
+
+    def next_answer(self):
+        with self.lock:
+            answer = self.answers[self._next % len(self.answers)]
+            self._next += 1
+        return answer
+
+    def response(self, prompt, text=None):
+        text = self.next_answer() if text is None else text
+        prompt_tokens, output_tokens = max(1, len(prompt) // 4), max(1, len(text) // 4)
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": "fake",
+        }
+
+    def response_chunks(self, prompt):
+        """Respostas parciais do streaming; a última traz finishReason e o consumo de tokens."""
+        words = self.next_answer().split(" ")
+        size = max(1, self.words_per_chunk)
+        pieces = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        chunks = [{"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}],
+                   "modelVersion": "fake"} for piece in pieces[:-1]]
+        return chunks + [self.response(prompt, pieces[-1])]
+
+    def error_payload(self, status):
+        error = {"code": status, "message": f"Falha simulada ({status}).", "status": self.STATUS_NAMES.get(status, "INTERNAL")}
+        if status == 429:
+            error["details"] = [{
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": f"{self.fault.retry_after:g}s",
+            }]
+        return {"error": error}
+
+
+def load_answers(path):
+    """Respostas prontas do LLM: lista JSON de textos ou um arquivo de texto (uma resposta por arquivo)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    try:
+        answers = json.loads(content)
+    except ValueError:
+        return [content]
+    return [answers] if isinstance(answers, str) else [str(answer) for answer in answers]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidores locais da ExchangeRate-API e do Gemini para testes de carga.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--api-port", type=int, default=8801)
+    parser.add_argument("--llm-port", type=int, default=8802)
+    parser.add_argument("--recorded", default=RECORDED_BRONZE_DIR, help="Diretório com as respostas gravadas da API.")
+    parser.add_argument("--answers", help="Respostas prontas do LLM (lista JSON ou texto).")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--chunk-ms", type=float, default=0.0, help="Intervalo entre os trechos das respostas em streaming.")
+    args = parser.parse_args()
+
+    def fault():
+        return FaultProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate, args.retry_after)
+
+    api = FakeExchangeRateAPI(args.recorded, fault=fault(), host=args.host, port=args.api_port).start()
+    llm = FakeGemini(load_answers(args.answers) if args.answers else None, chunk_ms=args.chunk_ms,
+                     fault=fault(), host=args.host, port=args.llm_port).start()
+    print(f"API_BASE_URL={api.url}")
+    print(f"GEMINI_BASE_URL={llm.url}")
+    print("Ctrl+C para encerrar.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+        llm.stop()
+        print(f"API: {dict(api.stats)} | LLM: {dict(llm.stats)}")
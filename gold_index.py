@@ -0,0 +1,151 @@
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import GOLD_DATASET_DIR, MOEDA_BASE, REPORT_LOOKBACK_DAYS, REPORT_MAX_GAP_DAYS
+from gold_store import KEY_COLUMNS, query_gold
+
+# Acesso ao GOLD por data com semântica "as-of": para cada moeda base, as datas
+# observadas ficam num array ordenado (datetime64[D]) e as taxas numa matriz
+# (dias × moedas) alinhada a ele. "Última observação em ou antes de D" é uma
+# busca binária (np.searchsorted), e muitas datas (ou pares de datas) são
+# resolvidas de uma vez, para todas as moedas. Fins de semana, feriados e dias
+# sem coleta usam a observação anterior em vez de quebrar a comparação.
+
+# Períodos de comparação: a referência é a observação as-of da data observada menos o período
+PERIODS = {
+    "DoD": pd.DateOffset(days=1),
+    "WoW": pd.DateOffset(weeks=1),
+    "MoM": pd.DateOffset(months=1),
+}
+# Sufixo das colunas de variação % de cada período (DoD mantém o nome usado pelo relatório)
+CHANGE_SUFFIXES = {"DoD": "_CHANGE_PCT", "WoW": "_WOW_PCT", "MoM": "_MOM_PCT"}
+
+
+def to_days(values):
+    """str/date/datetime/Timestamp (ou listas deles) -> array datetime64[D]."""
+    return np.atleast_1d(pd.to_datetime(values).to_numpy().astype('datetime64[D]'))
+
+def shift_days(days, period):
+    """Datas menos o período (NaT continua NaT)."""
+    return (pd.DatetimeIndex(days) - PERIODS[period]).to_numpy().astype('datetime64[D]')
+
+
+class GoldIndex:
+    """Histórico GOLD indexado por data, por moeda base."""
+
+    def __init__(self, df_gold):
+        self.columns = [col for col in df_gold.columns if col not in KEY_COLUMNS]
+        self.series = {}
+        if df_gold.empty:
+            return
+        df_gold = df_gold.assign(collected_date=to_days(df_gold['collected_date']))
+        for base_currency, df_base in df_gold.groupby('base_currency', sort=True):
+            df_base = df_base.sort_values('collected_date').drop_duplicates('collected_date', keep='last')
+            self.series[base_currency] = (
+                df_base['collected_date'].to_numpy().astype('datetime64[D]'),
+                df_base[self.columns].to_numpy(dtype='float64', na_value=np.nan),
+            )
+
+    @classmethod
+    def load(cls, start_date, end_date=None, lookback_days=REPORT_LOOKBACK_DAYS, columns=None, root=GOLD_DATASET_DIR):
+        """Lê o GOLD do intervalo e mais lookback_days antes dele (as referências das comparações)."""
+        start = pd.Timestamp(start_date) - pd.Timedelta(days=lookback_days)
+        end = pd.Timestamp(end_date if end_date is not None else start_date)
+        return cls(query_gold(start.date(), end.date(), columns=columns, root=root))
+
+    def bases(self):
+        return list(self.series)
+
+    def dates(self, base_currency):
+        """Datas observadas (ordenadas) da moeda base."""
+        return self.series[base_currency][0] if base_currency in self.series else to_days([])
+
+    def positions(self, base_currency, dates, tolerance_days=None):
+        """Posição da última observação em ou antes de cada data (-1 se não houver).
+
+        Com tolerance_days, observações mais antigas que a data menos a tolerância não contam.
+        """
+        days = self.dates(base_currency)
+        query = to_days(dates)
+        positions = np.searchsorted(days, query, side='right') - 1
+        missing = np.isnat(query) | (positions < 0)
+        if tolerance_days is not None and len(days):
+            missing |= (query - days[np.maximum(positions, 0)]) > np.timedelta64(tolerance_days, 'D')
+        return np.where(missing, -1, positions)
+
+    def as_of(self, base_currency, dates, tolerance_days=None):
+        """(datas observadas, taxas datas × moedas) as-of cada data; NaT/NaN onde não há observação."""
+        positions = self.positions(base_currency, dates, tolerance_days)
+        found = positions >= 0
+        if not found.any():
+            return (np.full(len(positions), np.datetime64('NaT'), dtype='datetime64[D]'),
+                    np.full((len(positions), len(self.columns)), np.nan))
+        days, values = self.series[base_currency]
+        safe = np.maximum(positions, 0)
+        observed = np.where(found, days[safe], np.datetime64('NaT'))
+        rates = np.where(found[:, np.newaxis], values[safe], np.nan)
+        return observed, rates
+
+    def compare(self, base_currency, dates, reference_dates, tolerance_days=None):
+        """As-of join de pares de datas: variação % de cada moeda entre a referência e a data.
+
+        Retorna (datas observadas, datas de referência observadas, variação % datas × moedas).
+        """
+        observed, current = self.as_of(base_currency, dates, tolerance_days)
+        reference, previous = self.as_of(base_currency, reference_dates, tolerance_days)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (current / previous - 1) * 100
+        return observed, reference, change
+
+    def changes(self, base_currency, dates, period="DoD", tolerance_days=REPORT_MAX_GAP_DAYS):
+        """Variação % DoD/WoW/MoM: a referência é a observação as-of da data observada menos o período.
+
+        Numa segunda-feira, o DoD compara com a sexta (a última observação até domingo);
+        referências mais de tolerance_days antes do alvo ficam sem comparação (NaN).
+        """
+        observed = self.as_of(base_currency, dates, tolerance_days)[0]
+        return self.compare(base_currency, observed, shift_days(observed, period), tolerance_days)
+
+    def frame_as_of(self, date_value, bases=None, tolerance_days=REPORT_MAX_GAP_DAYS):
+        """Linhas GOLD (uma por moeda base) da última observação em ou antes da data."""
+        rows = []
+        for base_currency in bases or self.bases():
+            observed, rates = self.as_of(base_currency, [date_value], tolerance_days)
+            if not np.isnat(observed[0]):
+                rows.append([pd.Timestamp(observed[0]).date(), base_currency, *rates[0]])
+        return pd.DataFrame(rows, columns=KEY_COLUMNS + self.columns)
+
+    def changes_frame(self, dates, bases=None, periods=("DoD", "WoW", "MoM"), tolerance_days=REPORT_MAX_GAP_DAYS):
+        """Variações de todas as moedas por (data observada, moeda base), uma coluna por moeda e período."""
+        frames = []
+        for base_currency in bases or self.bases():
+            observed = np.unique(self.as_of(base_currency, dates, tolerance_days)[0])
+            observed = observed[~np.isnat(observed)]
+            if not len(observed):
+                continue
+            parts = [pd.DataFrame({'collected_date': observed, 'base_currency': base_currency})]
+            for period in periods:
+                reference, change = self.compare(
+                    base_currency, observed, shift_days(observed, period), tolerance_days,
+                )[1:]
+                parts.append(pd.DataFrame({f"{period}_reference": reference}))
+                parts.append(pd.DataFrame(change, columns=[f"{col}{CHANGE_SUFFIXES[period]}" for col in self.columns]))
+            frames.append(pd.concat(parts, axis=1))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=KEY_COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Variações DoD/WoW/MoM do GOLD com datas as-of.")
+    parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"), help="Data (YYYY-MM-DD). Padrão: hoje.")
+    parser.add_argument("--base", default=MOEDA_BASE, help="Moeda base.")
+    parser.add_argument("--columns", help="Moedas separadas por vírgula (padrão: todas).")
+    args = parser.parse_args()
+
+    columns = args.columns.split(",") if args.columns else None
+    index = GoldIndex.load(args.date, columns=columns)
+    df = index.changes_frame([args.date], bases=[args.base])
+    if df.empty:
+        print(f"[ERRO] Nenhuma observação GOLD {args.base} em ou antes de {args.date}.")
+    else:
+        print(df.T.to_string(header=False))
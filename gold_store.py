@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+from config import GOLD_DIR, GOLD_DATASET_DIR, GOLD_COMPACT_MIN_FILES
+from catalog import dataset_catalog
+
+try:
+    import fcntl  # Trava entre processos (compactação x gravação); indisponível no Windows
+except ImportError:
+    fcntl = None
+
+# Esquema das partições Hive: data_layers/gold/dataset/year=2025/month=09/part-0.parquet
+PARTITION_SCHEMA = pa.schema([("year", pa.int16()), ("month", pa.int8())])
+PARTITION_FILE = "part-0.parquet"
+
+# Cada upsert num mês que já tem dados grava um arquivo delta ao lado do
+# part-0.parquet (delta-<ns>-<pid>-<thread>.parquet), sem reescrever o mês. As
+# leituras combinam part-0 + deltas (em ordem de gravação, a última linha de cada
+# chave vence) e a compactação funde os deltas de volta no part-0.parquet.
+# Os arquivos podem ter colunas diferentes (moedas novas ou que sumiram): as
+# leituras unificam os esquemas e as colunas ausentes num arquivo ficam nulas.
+DELTA_PREFIX = "delta-"
+LOCK_FILE = ".lock"
+KEY_METADATA = b"key_columns"  # chaves do upsert, guardadas nos metadados de cada arquivo
+
+# Um row group por semana: as estatísticas min/max de collected_date de cada
+# row group permitem ao pyarrow pular os grupos fora do intervalo consultado.
+# Cada dia tem uma linha por moeda base, então o tamanho em linhas é 7 x bases.
+ROW_GROUP_DAYS = 7
+
+KEY_COLUMNS = ['collected_date', 'base_currency']
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _to_date(value):
+    """Converte str (YYYY-MM-DD), datetime ou date em date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+def _partition_dir(root, year, month):
+    return os.path.join(root, f"year={year}", f"month={month:02d}")
+
+def _is_delta(path):
+    return os.path.basename(path).startswith(DELTA_PREFIX)
+
+def _delta_name():
+    # Nomes ordenáveis pelo horário da gravação: a ordem dos nomes é a ordem do upsert
+    return f"{DELTA_PREFIX}{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}.parquet"
+
+def _file_order(path):
+    """Ordem de leitura: por partição, o part-0.parquet antes dos deltas (do mais antigo ao mais novo)."""
+    name = os.path.basename(path)
+    return os.path.dirname(path), name != PARTITION_FILE, name
+
+def partition_files(partition_dir):
+    """Arquivos de uma partição em ordem de leitura (part-0.parquet e deltas)."""
+    try:
+        names = os.listdir(partition_dir)
+    except FileNotFoundError:
+        return []
+    names = [n for n in names if n == PARTITION_FILE or (n.startswith(DELTA_PREFIX) and n.endswith(".parquet"))]
+    return sorted((os.path.join(partition_dir, n) for n in names), key=_file_order)
+
+@contextmanager
+def _partition_lock(partition_dir, blocking=True):
+    """Trava exclusiva da partição (threads e processos); produz False se blocking=False e ela estiver ocupada."""
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(os.path.abspath(partition_dir), threading.Lock())
+    if not thread_lock.acquire(blocking):
+        yield False
+        return
+    try:
+        with open(os.path.join(partition_dir, LOCK_FILE), 'a') as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+            yield True
+    finally:
+        thread_lock.release()
+
+def _key_columns(schema, default=KEY_COLUMNS):
+    metadata = schema.metadata or {}
+    return json.loads(metadata[KEY_METADATA]) if KEY_METADATA in metadata else list(default)
+
+def _merge_frames(frames, key_columns):
+    """Concatena (união das colunas) e mantém a última linha de cada chave."""
+    df = pd.concat(frames, ignore_index=True, sort=False) if len(frames) > 1 else frames[0]
+    return (
+        df.drop_duplicates(subset=key_columns, keep='last')
+        .sort_values(key_columns)
+        .reset_index(drop=True)
+    )
+
+def _row_group_size(df):
+    """Linhas de uma semana no arquivo (as linhas estão ordenadas por data)."""
+    bases = df['base_currency'].nunique() if 'base_currency' in df.columns else 1
+    return ROW_GROUP_DAYS * max(1, bases)
+
+def _write_partition_file(df, file_path, key_columns, root):
+    """Grava um arquivo da partição (escrita atômica) e o registra no catálogo do dataset."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), KEY_METADATA: json.dumps(key_columns).encode()})
+
+    # Escrita atômica: um leitor nunca enxerga o arquivo pela metade
+    tmp_path = f"{file_path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=_row_group_size(df))
+    os.replace(tmp_path, file_path)
+    dataset_catalog(root).register(
+        file_path, df['collected_date'].min(), date_end=df['collected_date'].max(),
+        rows=len(df), schema={field.name: str(field.type) for field in table.schema},
+    )
+    return file_path
+
+def write_gold_partition(df_gold, root=GOLD_DATASET_DIR, key_columns=KEY_COLUMNS, compact=True):
+    """Grava (upsert) as linhas GOLD nas partições mensais do dataset.
+
+    Um mês novo recebe o part-0.parquet; nos demais, as linhas vão para um
+    arquivo delta e nada do que já existe é reescrito, então o custo de gravar
+    um dia não depende do tamanho do histórico. Linhas com a mesma chave
+    (padrão: collected_date, base_currency) substituem as anteriores na leitura.
+    Meses com GOLD_COMPACT_MIN_FILES deltas ou mais são compactados numa thread
+    em segundo plano (compact=False desliga). Retorna os arquivos gravados.
+    """
+    df_gold = df_gold.copy()
+    df_gold['collected_date'] = pd.to_datetime(df_gold['collected_date']).dt.date
+
+    written, to_compact = [], []
+    months = df_gold['collected_date'].map(lambda d: (d.year, d.month))
+    for (year, month), df_month in df_gold.groupby(months):
+        partition_dir = _partition_dir(root, year, month)
+        os.makedirs(partition_dir, exist_ok=True)
+        df_month = _merge_frames([df_month], key_columns)
+
+        with _partition_lock(partition_dir):
+            # Mês novo: a primeira gravação já é o arquivo compactado (sob a trava,
+            # para que duas gravações simultâneas não criem ambas o part-0)
+            base_path = os.path.join(partition_dir, PARTITION_FILE)
+            if not os.path.exists(base_path):
+                written.append(_write_partition_file(df_month, base_path, key_columns, root))
+                continue
+        written.append(_write_partition_file(df_month, os.path.join(partition_dir, _delta_name()), key_columns, root))
+        if sum(_is_delta(path) for path in partition_files(partition_dir)) >= GOLD_COMPACT_MIN_FILES:
+            to_compact.append(partition_dir)
+
+    if compact and to_compact:
+        compact_in_background(to_compact, root)
+    return written
+
+def compact_partition(partition_dir, root=GOLD_DATASET_DIR):
+    """Funde os deltas de uma partição no part-0.parquet e os remove.
+
+    Só o mês é reescrito. Se outra compactação da partição estiver em andamento,
+    nada é feito. Retorna o caminho do part-0.parquet (ou None se não havia o que compactar).
+    """
+    with _partition_lock(partition_dir, blocking=False) as locked:
+        files = partition_files(partition_dir) if locked else []
+        deltas = [path for path in files if _is_delta(path)]
+        if not deltas:
+            return None
+
+        key_columns = _key_columns(pq.read_schema(deltas[-1]))
+        df = _merge_frames([pd.read_parquet(path) for path in files], key_columns)
+        file_path = _write_partition_file(df, os.path.join(partition_dir, PARTITION_FILE), key_columns, root)
+
+        # Um leitor que ainda veja um delta removido relê a lista pelo catálogo (ver query_gold)
+        catalog = dataset_catalog(root)
+        for path in deltas:
+            catalog.remove(path)
+            os.remove(path)
+    return file_path
+
+def compact_gold(root=GOLD_DATASET_DIR):
+    """Compacta todas as partições com deltas; retorna os part-0.parquet regravados."""
+    partition_dirs = sorted({os.path.dirname(entry["path"]) for entry in dataset_catalog(root).entries()})
+    return [path for path in (compact_partition(d, root) for d in partition_dirs) if path]
+
+def compact_in_background(partition_dirs, root=GOLD_DATASET_DIR):
+    """Compacta as partições numa thread separada, fora do caminho da gravação.
+
+    A thread não é daemon: o processo só termina depois que ela conclui (uma
+    interrupção no meio não corrompe nada, pois cada arquivo é trocado atomicamente).
+    """
+    def run():
+        for partition_dir in partition_dirs:
+            try:
+                compact_partition(partition_dir, root)
+            except Exception as e:
+                print(f"   [AVISO] Falha ao compactar {partition_dir}: {e}")
+
+    thread = threading.Thread(target=run, name="gold-compaction")
+    thread.start()
+    return thread
+
+def gold_partition_files(start_date, end_date=None, root=GOLD_DATASET_DIR):
+    """Lista (pelo catálogo) os arquivos de partição com dados no intervalo."""
+    start = _to_date(start_date)
+    end = _to_date(end_date) if end_date is not None else start
+    return dataset_catalog(root).find(start, end)
+
+def _read_dataset(paths, columns, date_filter, root):
+    """Lê os arquivos com o esquema unificado e resolve os upserts pendentes nos deltas."""
+    paths = sorted(paths, key=_file_order)
+    schemas = [pq.read_schema(path) for path in paths]
+    # Moedas ausentes num arquivo viram colunas nulas (o rodapé de cada arquivo basta)
+    schema = pa.unify_schemas(
+        [s.remove_metadata() for s in schemas] + [PARTITION_SCHEMA], promote_options="permissive",
+    )
+    dataset = ds.dataset(
+        paths,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        partition_base_dir=root,
+    )
+
+    delta_schemas = [s for path, s in zip(paths, schemas) if _is_delta(path)]
+    key_columns = _key_columns(delta_schemas[-1]) if delta_schemas else []
+    if columns is not None:
+        columns = [col for col in columns if col in schema.names]
+        read_columns = columns + [col for col in key_columns if col not in columns]
+    else:
+        read_columns = None
+
+    # A tabela preserva a ordem dos arquivos: com drop_duplicates(keep='last'), o delta mais novo vence
+    df = dataset.to_table(columns=read_columns, filter=date_filter).to_pandas()
+    if key_columns:
+        df = _merge_frames([df], key_columns)
+    if columns is not None:
+        return df[columns]
+    # As colunas de partição são derivadas do caminho, não fazem parte do GOLD
+    return df.drop(columns=['year', 'month'], errors='ignore')
+
+def query_gold(start_date, end_date=None, columns=None, root=GOLD_DATASET_DIR):
+    """Lê o dataset GOLD para um intervalo de datas, com poda de partições e row groups.
+
+    Somente os arquivos dos meses do intervalo são lidos (a lista vem do
+    catálogo) e o filtro em collected_date descarta row groups pelas
+    estatísticas do Parquet. Arquivos delta ainda não compactados são
+    combinados na leitura. Retorna um DataFrame (vazio se não houver dados no intervalo).
+    """
+    start = _to_date(start_date)
+    end = _to_date(end_date) if end_date is not None else start
+
+    if columns is not None:
+        # As chaves sempre acompanham as colunas pedidas
+        columns = KEY_COLUMNS + [col for col in columns if col not in KEY_COLUMNS]
+
+    date_filter = (
+        (ds.field('collected_date') >= pa.scalar(start, pa.date32()))
+        & (ds.field('collected_date') <= pa.scalar(end, pa.date32()))
+    )
+    catalog = dataset_catalog(root)
+    for attempt in range(3):
+        paths = []
+        for path in gold_partition_files(start, end, root=root):
+            if os.path.exists(path):
+                paths.append(path)
+            else:
+                catalog.remove(path)  # delta compactado antes de a gravação registrá-lo
+        if not paths:
+            return pd.DataFrame(columns=columns or KEY_COLUMNS)
+        try:
+            return _read_dataset(paths, columns, date_filter, root)
+        except FileNotFoundError:
+            # Uma compactação removeu um delta entre a consulta ao catálogo e a leitura
+            if attempt == 2:
+                raise
+
+def latest_gold_date(root=GOLD_DATASET_DIR):
+    """Retorna a data mais recente presente no dataset GOLD (ou None).
+
+    Consulta o catálogo do dataset: nenhum diretório é listado e nenhuma
+    partição é lida.
+    """
+    latest = dataset_catalog(root).latest_date()
+    return _to_date(latest) if latest else None
+
+def migrate_daily_gold_files(gold_dir=GOLD_DIR, root=GOLD_DATASET_DIR):
+    """Importa os antigos arquivos <data>_gold.parquet para o dataset particionado."""
+    try:
+        files = sorted(f for f in os.listdir(gold_dir) if f.endswith('_gold.parquet'))
+    except FileNotFoundError:
+        files = []
+
+    if not files:
+        print("   Nenhum arquivo GOLD diário para migrar.")
+        return 0
+
+    df_all = pd.concat([pd.read_parquet(os.path.join(gold_dir, f)) for f in files], ignore_index=True)
+    write_gold_partition(df_all, root=root)
+    print(f"   [SUCESSO] {len(files)} arquivos diários migrados para: {root}")
+    return len(files)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta ao dataset GOLD particionado.")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD). Padrão: data mais recente.")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    parser.add_argument("--columns", help="Lista de colunas separadas por vírgula.")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Migra os arquivos <data>_gold.parquet antigos para o dataset.")
+    parser.add_argument("--compact", action="store_true",
+                        help="Funde os arquivos delta de todas as partições nos part-0.parquet.")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_daily_gold_files()
+    elif args.compact:
+        compacted = compact_gold()
+        print(f"   [SUCESSO] {len(compacted)} partições compactadas.")
+    else:
+        start = args.start or latest_gold_date()
+        if start is None:
+            print("[ERRO] Dataset GOLD vazio. Execute o aggregate_gold.py primeiro.")
+        else:
+            columns = args.columns.split(",") if args.columns else None
+            print(query_gold(start, args.end, columns=columns).to_string(index=False))
@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from config import (
+    GEMINI_API_KEY, GEMINI_BASE_URL, LLM_MODEL, LLM_CACHE_DIR, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES,
+    LLM_OUTPUT_TOKENS_ESTIMATE, LLM_MAX_RETRIES, LLM_BACKOFF_BASE,
+)
+from metrics import track_latency, observe_latency
+from catalog import file_checksum
+
+# Camada compartilhada de chamadas ao LLM: cliente Gemini + cache em disco.
+# As respostas são endereçadas pelo conteúdo (hash de modelo + prompt + checksum
+# dos arquivos GOLD usados), então uma execução repetida com os mesmos dados não
+# chega a acessar a rede.
+
+STATS_FILE = "_stats.json"
+
+# Erros temporários do Gemini: cota excedida (429) ou falha do servidor
+LLM_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def get_client():
+    """Cria o cliente Gemini (ou retorna None se a chave estiver ausente)."""
+    try:
+        if not GEMINI_API_KEY:
+            raise ValueError("A chave GEMINI_API_KEY não foi encontrada no .env.")
+
+        from google import genai
+        http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+        return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+    except ValueError as e:
+        print(f"[ERRO DE CONFIGURAÇÃO] {e}")
+        return None
+
+def cache_key(model, prompt, source_paths=()):
+    """Chave do cache: hash do modelo, do prompt e do checksum de cada arquivo de origem."""
+    digest = hashlib.sha256()
+    digest.update(model.encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(prompt.encode('utf-8'))
+    for path in sorted(source_paths):
+        digest.update(b"\0")
+        digest.update(file_checksum(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """Cache em disco com validade (TTL) e remoção LRU limitada por tamanho.
+
+    Cada resposta é um arquivo <chave>.json; o mtime do arquivo marca o último
+    acesso (é atualizado a cada acerto) e é usado para escolher quem sai primeiro.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 max_bytes=LLM_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Retorna o texto em cache (ou None), contabilizando acertos e falhas."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count("misses")
+            return None
+
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._count("expired")
+            self._count("misses")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+        os.utime(path)  # Marca o acesso para a política LRU
+        self._count("hits")
+        return entry["text"]
+
+    def put(self, key, text, model):
+        """Grava a resposta de forma atômica e aplica o limite de tamanho."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": model, "created_at": time.time(), "text": text}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas menos usadas recentemente até caber em max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and name != STATS_FILE:
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            total -= size
+            self._count("evictions")
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def save_stats(self):
+        """Acumula os contadores desta execução no arquivo de estatísticas do cache."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, STATS_FILE)
+        with self.lock:
+            totals = load_cache_stats(self.directory)
+            for name, value in self.stats.items():
+                totals[name] = totals.get(name, 0) + value
+                self.stats[name] = 0
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(totals, f, indent=2)
+            os.replace(tmp_path, path)
+        return totals
+
+
+def load_cache_stats(directory=LLM_CACHE_DIR):
+    """Contadores acumulados de todas as execuções (hits, misses, expired, evictions)."""
+    try:
+        with open(os.path.join(directory, STATS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+_default_cache = None
+
+def get_cache():
+    """Instância de cache compartilhada pelo processo."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
+
+def generate_text(prompt, model=LLM_MODEL, client=None, source_paths=(), cache=None, on_text=None):
+    """Gera o texto do LLM passando pelo cache.
+
+    Em caso de acerto nenhum cliente é criado e a rede não é acessada. Em caso
+    de falha, o cliente é criado sob demanda (se não foi fornecido); retorna None
+    se o LLM não estiver configurado. Erros da API são propagados ao chamador.
+    Com on_text, a resposta é pedida em streaming e cada trecho é repassado a
+    on_text assim que chega (um acerto do cache é repassado de uma vez).
+    """
+    cache = cache or get_cache()
+    key = cache_key(model, prompt, source_paths)
+
+    text = cache.get(key)
+    if text is not None:
+        cache.save_stats()
+        if on_text is not None:
+            on_text(text)
+        return text
+
+    client = client or get_client()
+    if client is None:
+        cache.save_stats()
+        return None
+
+    try:
+        with track_latency("gemini"):
+            if on_text is None:
+                text = client.models.generate_content(model=model, contents=prompt).text
+            else:
+                text = stream_text(client, model, prompt, on_text)
+        cache.put(key, text, model)
+        return text
+    finally:
+        cache.save_stats()
+
+def stream_text(client, model, prompt, on_text):
+    """generate_content_stream: repassa cada trecho a on_text e retorna o texto completo.
+
+    O tempo até o primeiro trecho fica no histograma de latência "gemini_first_chunk".
+    """
+    started = time.perf_counter()
+    parts = []
+    for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+        if not chunk.text:
+            continue
+        if not parts:
+            observe_latency("gemini_first_chunk", time.perf_counter() - started)
+        parts.append(chunk.text)
+        on_text(chunk.text)
+    return "".join(parts)
+
+def stream_printer(title):
+    """Callback para on_text: imprime o cabeçalho no primeiro trecho e os trechos sem quebra de linha."""
+    started = []
+
+    def on_text(text):
+        if not started:
+            print("\n" + "="*50)
+            print(f"          {title}")
+            print("="*50)
+            started.append(True)
+        print(text, end="", flush=True)
+    return on_text
+
+
+# --- Chamadas assíncronas (enriquecimento em lote) ---
+
+def estimate_tokens(text):
+    """Estimativa barata de tokens (~4 caracteres por token), usada para reservar a cota."""
+    return max(1, len(text) // 4)
+
+
+class TokenBudget:
+    """Token bucket assíncrono da cota de tokens por minuto do Gemini.
+
+    Cada requisição reserva a estimativa de prompt + resposta antes de sair;
+    quando a API informa o consumo real (usage_metadata), a diferença é ajustada.
+    Os pedidos esperam em ordem de chegada (o lock é mantido durante a espera).
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens):
+        """Aguarda até haver `tokens` disponíveis na janela e os consome."""
+        if self.rate <= 0:
+            return
+        tokens = min(tokens, self.capacity)  # um prompt maior que a cota ainda precisa sair
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def adjust(self, tokens):
+        """Corrige a reserva com o consumo real (positivo: gastou mais que o estimado)."""
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= tokens
+
+def retry_after_seconds(error):
+    """Espera pedida pela API em um erro: cabeçalho Retry-After ou RetryInfo.retryDelay ("17s")."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    candidates = [headers.get("Retry-After")]
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for item in details.get("error", {}).get("details", []) or []:
+            if isinstance(item, dict):
+                candidates.append(item.get("retryDelay"))
+    for value in candidates:
+        if value:
+            try:
+                return float(str(value).rstrip("s"))
+            except ValueError:
+                continue
+    return None
+
+async def generate_text_async(prompt, client, model=LLM_MODEL, source_paths=(), cache=None,
+                              budget=None, max_retries=LLM_MAX_RETRIES):
+    """Versão assíncrona de generate_text (client.aio), com cota de tokens e retentativas.
+
+    Erros de cota (429) e do servidor (5xx) são repetidos respeitando o
+    Retry-After informado pela API ou, na falta dele, com backoff exponencial.
+    O chamador é responsável por cache.save_stats() ao fim do lote.
+    """
+    cache = cache or get_cache()
+    key = cache_key(model, prompt, source_paths)
+    text = cache.get(key)
+    if text is not None:
+        return text
+
+    reserved = estimate_tokens(prompt) + LLM_OUTPUT_TOKENS_ESTIMATE
+    for attempt in range(max_retries + 1):
+        if budget is not None:
+            await budget.acquire(reserved)
+        try:
+            with track_latency("gemini"):
+                response = await client.aio.models.generate_content(model=model, contents=prompt)
+        except Exception as e:
+            if getattr(e, "code", None) not in LLM_RETRY_STATUS or attempt == max_retries:
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = LLM_BACKOFF_BASE * (2 ** attempt) * (1 + random.random())
+            await asyncio.sleep(delay)
+            continue
+
+        used = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+        if budget is not None and used:
+            budget.adjust(used - reserved)
+        cache.put(key, response.text, model)
+        return response.text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mostra os contadores de acerto/falha do cache do LLM.")
+    parser.add_argument("--evict", action="store_true", help="Aplica agora o limite de tamanho do cache.")
+    args = parser.parse_args()
+
+    if args.evict:
+        cache = get_cache()
+        if os.path.isdir(cache.directory):
+            cache.evict()
+            cache.save_stats()
+    stats = load_cache_stats()
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    hit_rate = (stats.get("hits", 0) / lookups * 100) if lookups else 0.0
+    print(f"Cache LLM ({LLM_CACHE_DIR}): {json.dumps(stats)} | taxa de acerto: {hit_rate:.1f}%")
@@ -0,0 +1,68 @@
+import pandas as pd
+from config import REPORT_CURRENCIES, LLM_PROMPT_TOKEN_BUDGET, LLM_PROMPT_TOP_MOVERS
+from gold_store import KEY_COLUMNS
+from gold_index import PERIODS, CHANGE_SUFFIXES
+from aggregate_gold import report_view
+from llm import estimate_tokens
+
+# Dados dos prompts do LLM em formato compacto.
+# O GOLD guarda ~160 moedas por linha; uma tabela Markdown com todas (e com as
+# variações DoD/WoW/MoM de cada uma) custaria milhares de tokens de números que o
+# modelo não usa. Aqui entram só as moedas pedidas (REPORT_CURRENCIES) e as de
+# maior variação absoluta, uma por linha no formato "moeda;taxa;DoD%;WoW%;MoM%",
+# até o orçamento LLM_PROMPT_TOKEN_BUDGET.
+
+
+def format_rate(value):
+    """Taxa com 5 algarismos significativos (27.123, 0.18735, 1.2346e-05)."""
+    return f"{value:.5g}"
+
+def format_pct(value):
+    """Variação % com sinal e 2 casas; '-' sem referência."""
+    return "-" if pd.isna(value) else f"{value:+.2f}"
+
+def gold_rates(df_gold):
+    """Taxas (moeda -> valor) da primeira linha GOLD, com as colunas antigas mapeadas e sem nulos."""
+    row = report_view(df_gold.head(1), currencies=None).iloc[0].drop(KEY_COLUMNS)
+    return pd.to_numeric(row, errors='coerce').dropna()
+
+def comparison_changes(row):
+    """Variações % (moedas × DoD/WoW/MoM) das colunas <MOEDA>_CHANGE_PCT, _WOW_PCT e _MOM_PCT de uma linha."""
+    changes = {}
+    for period, suffix in CHANGE_SUFFIXES.items():
+        columns = [col for col in row.index if isinstance(col, str) and col.endswith(suffix)]
+        if columns:
+            changes[period] = pd.Series(row[columns].to_numpy(dtype='float64'), index=[col[:-len(suffix)] for col in columns])
+    return pd.DataFrame(changes)
+
+def select_currencies(rates, changes=None, currencies=REPORT_CURRENCIES, top_k=LLM_PROMPT_TOP_MOVERS, rank_by="DoD"):
+    """(moedas pedidas presentes, top_k demais moedas de maior variação absoluta em rank_by)."""
+    requested = [code for code in dict.fromkeys(currencies) if code in rates.index]
+    if changes is None or changes.empty or top_k <= 0:
+        return requested, []
+    period = rank_by if rank_by in changes.columns else changes.columns[0]
+    magnitude = changes[period].reindex(rates.index).abs().dropna().drop(requested, errors='ignore')
+    return requested, list(magnitude.sort_values(ascending=False, kind='stable').index[:top_k])
+
+def compact_rates_table(rates, changes=None, currencies=REPORT_CURRENCIES, top_k=LLM_PROMPT_TOP_MOVERS,
+                        token_budget=LLM_PROMPT_TOKEN_BUDGET, rank_by="DoD"):
+    """Tabela "moeda;taxa;DoD%;WoW%;MoM%" das moedas pedidas e das de maior variação.
+
+    As moedas pedidas sempre entram; as de maior variação entram em ordem de
+    magnitude enquanto o texto couber em token_budget. Períodos sem nenhuma
+    variação calculada não viram colunas.
+    """
+    if changes is not None:
+        changes = changes[[period for period in PERIODS if period in changes.columns and changes[period].notna().any()]]
+    requested, movers = select_currencies(rates, changes, currencies, top_k, rank_by)
+    periods = list(changes.columns) if changes is not None else []
+
+    lines = [";".join(["moeda", "taxa", *(f"{period}%" for period in periods)])]
+    for position, code in enumerate(requested + movers):
+        values = [format_pct(changes.at[code, period]) if code in changes.index else "-" for period in periods]
+        line = ";".join([code, format_rate(rates[code]), *values])
+        if code in movers and estimate_tokens("\n".join([*lines, line])) > token_budget:
+            lines.append(f"(+{len(requested) + len(movers) - position} moedas de maior variação fora do orçamento)")
+            break
+        lines.append(line)
+    return "\n".join(lines)
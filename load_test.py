@@ -0,0 +1,214 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import date, datetime, timedelta
+import numpy as np
+from fake_services import (
+    RECORDED_BRONZE_DIR, FaultProfile, FakeExchangeRateAPI, FakeGemini, load_answers,
+)
+
+# Teste de carga ponta a ponta contra servidores locais (fake_services.py).
+# Cada dia simulado é uma nova atualização publicada pela API falsa: o coletor
+# contínuo busca todas as moedas base (até --concurrency ao mesmo tempo), a
+# pipeline processa as coletas novas e gera o relatório com o LLM; no fim, os
+# insights de todos os (dia, moeda base) são gerados em lote. Tudo roda num
+# DATA_DIR temporário. O resultado (vazão, latência p50/p95/p99 por tentativa,
+# retentativas e falhas) vem do log de eventos do metrics.py e dos contadores
+# dos servidores, e é gravado em JSON como o do benchmark.py.
+
+RESULTS_DIR = "bench_results"
+
+
+def latency_summary(events, target):
+    """Tentativas, status e percentis de latência (ms) das chamadas registradas para o alvo."""
+    samples = [event for event in events if event.get("target") == target]
+    statuses = {}
+    for event in samples:
+        statuses[event["status"]] = statuses.get(event["status"], 0) + 1
+    seconds = np.array([event["seconds"] for event in samples], dtype=float)
+    summary = {"attempts": len(samples), "statuses": statuses}
+    if len(seconds):
+        p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+        summary.update(p50_ms=round(p50, 2), p95_ms=round(p95, 2), p99_ms=round(p99, 2),
+                       max_ms=round(seconds.max() * 1000, 2))
+    return summary
+
+def read_events(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def run_load_test(days=3, bases=("BRL", "USD", "EUR"), concurrency=4, api_fault=None, llm_fault=None,
+                  recorded_dir=RECORDED_BRONZE_DIR, answers=None, report=True, enrich=True,
+                  rate_limit=0.0, llm_chunk_ms=0.0, keep=False, verbose=False):
+    """Executa coleta -> pipeline -> relatório (e o lote de insights) contra os servidores falsos.
+
+    Com keep=True o DATA_DIR temporário (camadas, relatórios, eventos) é mantido para inspeção.
+    """
+    recorded_dir = os.path.abspath(recorded_dir)
+    start = date.today() - timedelta(days=days)
+    api = FakeExchangeRateAPI(recorded_dir, start_date=start, fault=api_fault).start()
+    llm = FakeGemini(answers, chunk_ms=llm_chunk_ms, fault=llm_fault).start()
+
+    work_dir = tempfile.mkdtemp(prefix="mba_load_")
+    # Endpoints, chaves e DATA_DIR precisam ser definidos antes de importar os módulos da pipeline
+    os.environ.update({
+        "DATA_DIR": os.path.join(work_dir, "data_layers"),
+        "API_BASE_URL": api.url, "API_KEY": "load-test",
+        "GEMINI_BASE_URL": llm.url, "GEMINI_API_KEY": "load-test",
+        "MOEDAS_BASE": ",".join(bases), "API_RATE_LIMIT_PER_SEC": str(rate_limit),
+    })
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)  # O PNG do relatório é salvo no diretório atual
+
+    try:
+        from config import setup_directories
+        from collector_daemon import Collector, run_downstream
+        from enrich_llm import enrich_date_range
+        from metrics import EVENTS_FILE
+
+        output = sys.stdout if verbose else io.StringIO()
+        with contextlib.redirect_stdout(output):
+            setup_directories()
+        timings = {"collect": 0.0, "pipeline": 0.0, "enrich": 0.0}
+        processed = []
+
+        def downstream(changed):
+            started = time.perf_counter()
+            run_downstream(changed, report=report, use_llm=True)
+            timings["pipeline"] += time.perf_counter() - started
+            processed.extend(changed)
+
+        # O relógio do coletor acompanha o dia publicado pela API falsa
+        collector = Collector(list(bases), on_change=downstream, clock=lambda: api.update_unix() + 3600,
+                              state_file=os.path.join(work_dir, "collector_state.json"), max_workers=concurrency)
+        print(f"--- TESTE DE CARGA: {days} dias × {len(bases)} moedas base, concorrência {concurrency} ---")
+        started = time.perf_counter()
+        for day in range(days):
+            api.day = day
+            poll_started = time.perf_counter()
+            pipeline_before = timings["pipeline"]
+            with contextlib.redirect_stdout(output):
+                collector.poll()
+            timings["collect"] += time.perf_counter() - poll_started - (timings["pipeline"] - pipeline_before)
+            print(f"   dia {day + 1}/{days}: {time.perf_counter() - poll_started:7.3f}s")
+
+        insights = 0
+        if enrich:
+            enrich_started = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                df_insights = enrich_date_range(start, start + timedelta(days=days - 1), bases=list(bases),
+                                                max_concurrency=concurrency)
+            timings["enrich"] = time.perf_counter() - enrich_started
+            insights = 0 if df_insights is None else len(df_insights)
+        elapsed = time.perf_counter() - started
+
+        events = [event for event in read_events(EVENTS_FILE) if event.get("message") == "request"]
+    finally:
+        os.chdir(previous_dir)
+        api.stop()
+        llm.stop()
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    api_calls = latency_summary(events, "exchangerate_api")
+    llm_calls = latency_summary(events, "gemini")
+    fetches = collector.stats["requests"]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "cpu_count": os.cpu_count(),
+            "work_dir": work_dir if keep else None,
+            "params": {"days": days, "bases": list(bases), "concurrency": concurrency, "rate_limit": rate_limit,
+                       "report": report, "enrich": enrich},
+            "api_fault": api.fault.as_dict(),
+            "llm_fault": llm.fault.as_dict(),
+        },
+        "seconds": {name: round(value, 4) for name, value in timings.items()} | {"total": round(elapsed, 4)},
+        "collect": {
+            **api_calls,
+            "fetches": fetches,
+            "retries": api_calls["attempts"] - fetches,
+            "written": collector.stats["written"],
+            "failed": collector.stats["errors"],
+            "fetches_per_sec": round(fetches / timings["collect"], 2) if timings["collect"] else None,
+            "server": dict(api.stats),
+        },
+        "pipeline": {
+            "bronze_processed": len(processed),
+            "files_per_sec": round(len(processed) / timings["pipeline"], 2) if timings["pipeline"] else None,
+        },
+        "llm": {
+            **llm_calls,
+            "succeeded": llm_calls["statuses"].get("ok", 0),
+            # Relatórios em streaming: tempo até o primeiro trecho da resposta
+            "first_chunk": latency_summary(events, "gemini_first_chunk"),
+            "insights": insights,
+            "requests_per_sec": round(llm_calls["attempts"] / timings["enrich"], 2) if timings["enrich"] else None,
+            "server": dict(llm.stats),
+        },
+    }
+
+def print_summary(results):
+    seconds = results["seconds"]
+    for target, calls in (("collect", results["collect"]), ("llm", results["llm"]), ("1º trecho", results["llm"]["first_chunk"])):
+        tail = (f"p50 {calls['p50_ms']:.1f} ms  p95 {calls['p95_ms']:.1f} ms  p99 {calls['p99_ms']:.1f} ms"
+                if calls["attempts"] else "sem chamadas")
+        print(f"   {target:<9} tentativas {calls['attempts']:5d}  status {calls['statuses']}  {tail}")
+    collect = results["collect"]
+    print(f"   coleta: {collect['fetches']} buscas em {seconds['collect']:.3f}s ({collect['fetches_per_sec']}/s), "
+          f"{collect['retries']} retentativas, {collect['failed']} falhas")
+    print(f"   pipeline: {results['pipeline']['bronze_processed']} arquivos BRONZE em {seconds['pipeline']:.3f}s")
+    print(f"   LLM: {results['llm']['succeeded']} respostas, {results['llm']['insights']} insights em lote "
+          f"em {seconds['enrich']:.3f}s | total {seconds['total']:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da pipeline contra a API de câmbio e o Gemini simulados.")
+    parser.add_argument("--days", type=int, default=3, help="Atualizações diárias publicadas pela API falsa.")
+    parser.add_argument("--bases", default="BRL,USD,EUR", help="Moedas base coletadas (a primeira deve ser MOEDA_BASE para o relatório).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requisições simultâneas à API e ao LLM.")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requisições/s do cliente à API (0 = sem limite).")
+    parser.add_argument("--recorded", default=RECORDED_BRONZE_DIR, help="Respostas gravadas da API reenviadas pelo servidor.")
+    parser.add_argument("--answers", help="Respostas prontas do LLM (lista JSON ou texto).")
+    parser.add_argument("--seed", type=int, default=0, help="Semente das falhas injetadas.")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After (s) enviado com os 429.")
+    for prefix, latency in (("api", 50.0), ("llm", 300.0)):
+        parser.add_argument(f"--{prefix}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{prefix}-jitter-ms", type=float, default=latency / 2)
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.02, help="Fração de respostas 503.")
+        parser.add_argument(f"--{prefix}-throttle-rate", type=float, default=0.05, help="Fração de respostas 429.")
+    parser.add_argument("--llm-chunk-ms", type=float, default=20.0, help="Intervalo entre os trechos das respostas em streaming.")
+    parser.add_argument("--no-report", action="store_true", help="Não gera o relatório (nem a análise do LLM) por dia.")
+    parser.add_argument("--no-enrich", action="store_true", help="Não gera os insights em lote no fim.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: bench_results/load_<timestamp>.json).")
+    parser.add_argument("--keep", action="store_true", help="Mantém o DATA_DIR temporário do teste.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída das etapas.")
+    args = parser.parse_args()
+
+    def fault(prefix, seed):
+        options = vars(args)
+        return FaultProfile(options[f"{prefix}_latency_ms"], options[f"{prefix}_jitter_ms"], options[f"{prefix}_error_rate"],
+                            options[f"{prefix}_throttle_rate"], args.retry_after, seed)
+
+    results = run_load_test(
+        args.days, [b.strip().upper() for b in args.bases.split(",") if b.strip()], args.concurrency,
+        api_fault=fault("api", args.seed), llm_fault=fault("llm", args.seed + 1), recorded_dir=args.recorded,
+        answers=load_answers(args.answers) if args.answers else None, report=not args.no_report,
+        enrich=not args.no_enrich, rate_limit=args.rate_limit, llm_chunk_ms=args.llm_chunk_ms, keep=args.keep, verbose=args.verbose,
+    )
+    print_summary(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"   [SUCESSO] Resultados salvos em: {output}")
@@ -0,0 +1,242 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import functools
+import contextlib
+import tracemalloc
+from datetime import datetime
+from config import METRICS_DIR, PROFILE_DIR, PIPELINE_PROFILE
+
+# Camada de instrumentação compartilhada por todas as etapas:
+# - stage_timer / timed: duração de cada etapa (e perfil cProfile/tracemalloc no --profile)
+# - record_rows / record_bytes: linhas e bytes lidos/gravados
+# - observe_latency: histograma de latência das chamadas HTTP (API de câmbio, Gemini)
+# Os eventos vão para um log JSON (metrics/events.jsonl) e os agregados para um
+# textfile do Prometheus por script (metrics/pipeline_<script>.prom), lido pelo
+# node_exporter, para que uma etapa não sobrescreva as métricas da outra.
+
+EVENTS_FILE = os.path.join(METRICS_DIR, "events.jsonl")
+
+# Limites (em segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.RLock()
+_stage_runs = {}        # (stage, status) -> quantidade
+_stage_seconds = {}     # stage -> [total, última duração]
+_rows = {}              # (stage, direction) -> linhas
+_bytes = {}             # (stage, direction) -> bytes
+_latency = {}           # (target, status) -> {"buckets": [...], "sum": s, "count": n}
+_profiling = {"enabled": PIPELINE_PROFILE, "depth": 0}
+
+_event_logger = logging.getLogger("pipeline.metrics")
+_event_logger.propagate = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON (campos extras em record.fields)."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False)
+
+def _log_event(message, **fields):
+    if not _event_logger.handlers:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        handler = logging.FileHandler(EVENTS_FILE, encoding='utf-8')
+        handler.setFormatter(JsonFormatter())
+        _event_logger.addHandler(handler)
+        _event_logger.setLevel(logging.INFO)
+    _event_logger.info(message, extra={"fields": fields})
+
+def enable_profiling(enabled=True):
+    """Liga o modo --profile: cada etapa gera relatórios cProfile e tracemalloc."""
+    _profiling["enabled"] = enabled
+
+def record_rows(stage, direction, count):
+    """Acumula linhas lidas ('read') ou gravadas ('written') por uma etapa."""
+    with _lock:
+        _rows[(stage, direction)] = _rows.get((stage, direction), 0) + int(count)
+
+def record_bytes(stage, direction, count):
+    """Acumula bytes lidos ('read') ou gravados ('written') por uma etapa."""
+    with _lock:
+        _bytes[(stage, direction)] = _bytes.get((stage, direction), 0) + int(count)
+
+def record_file_bytes(stage, direction, *paths):
+    """Atalho para record_bytes com o tamanho de arquivos em disco."""
+    record_bytes(stage, direction, sum(os.path.getsize(p) for p in paths if p and os.path.exists(p)))
+
+def observe_latency(target, seconds, status="ok"):
+    """Registra a latência de uma chamada externa no histograma do alvo."""
+    with _lock:
+        histogram = _latency.setdefault(
+            (target, str(status)), {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+    _log_event("request", target=target, status=str(status), seconds=round(seconds, 6))
+
+@contextlib.contextmanager
+def track_latency(target):
+    """Context manager que mede uma chamada externa; o status pode ser ajustado via dict."""
+    outcome = {"status": "ok"}
+    started = time.perf_counter()
+    try:
+        yield outcome
+    except Exception as e:
+        outcome["status"] = type(e).__name__
+        raise
+    finally:
+        observe_latency(target, time.perf_counter() - started, outcome["status"])
+
+def _dump_profile(stage, profiler, snapshot):
+    """Grava o perfil cProfile (.prof + resumo em texto) e o top de alocações do tracemalloc."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    prefix = os.path.join(PROFILE_DIR, f"{stage}_{datetime.now():%Y%m%d_%H%M%S}")
+    profiler.dump_stats(f"{prefix}.prof")
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+    with open(f"{prefix}_cprofile.txt", 'w', encoding='utf-8') as f:
+        f.write(summary.getvalue())
+
+    with open(f"{prefix}_tracemalloc.txt", 'w', encoding='utf-8') as f:
+        for stat in snapshot.statistics("lineno")[:40]:
+            f.write(f"{stat}\n")
+    return prefix
+
+def _stage_counts(counters, stage):
+    """{direção: total} de uma etapa num dos contadores globais (chamar com _lock)."""
+    return {direction: n for (s, direction), n in counters.items() if s == stage}
+
+def _since(counts, before):
+    """Diferença entre dois retratos de _stage_counts (só as direções que mudaram)."""
+    return {direction: n - before.get(direction, 0) for direction, n in counts.items() if n != before.get(direction, 0)}
+
+@contextlib.contextmanager
+def stage_timer(stage):
+    """Mede a duração de uma etapa, registra o resultado e atualiza o textfile do Prometheus.
+
+    No modo --profile, somente a etapa mais externa é perfilada (o cProfile não
+    admite perfis aninhados). O evento traz as linhas e bytes desta execução; os
+    totais do processo (daemon, serviço) ficam no textfile do Prometheus.
+    """
+    profiler = None
+    with _lock:
+        outermost = _profiling["depth"] == 0
+        _profiling["depth"] += 1
+        rows_before = _stage_counts(_rows, stage)
+        bytes_before = _stage_counts(_bytes, stage)
+    if _profiling["enabled"] and outermost:
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _profiling["depth"] -= 1
+            _stage_runs[(stage, status)] = _stage_runs.get((stage, status), 0) + 1
+            totals = _stage_seconds.setdefault(stage, [0.0, 0.0])
+            totals[0] += elapsed
+            totals[1] = elapsed
+
+        fields = {"stage": stage, "status": status, "seconds": round(elapsed, 6)}
+        if profiler is not None:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            fields["peak_python_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            fields["profile"] = _dump_profile(stage, profiler, snapshot)
+        with _lock:
+            fields["rows"] = _since(_stage_counts(_rows, stage), rows_before)
+            fields["bytes"] = _since(_stage_counts(_bytes, stage), bytes_before)
+        _log_event("stage", **fields)
+        write_prometheus_textfile()
+
+def timed(stage):
+    """Decorator equivalente a stage_timer para funções inteiras."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def render_prometheus():
+    """Texto no formato de exposição do Prometheus com todas as métricas do processo."""
+    lines = []
+    with _lock:
+        lines += ["# HELP pipeline_stage_runs_total Execuções de cada etapa por status.",
+                  "# TYPE pipeline_stage_runs_total counter"]
+        lines += [f"pipeline_stage_runs_total{_labels(stage=s, status=st)} {n}" for (s, st), n in sorted(_stage_runs.items())]
+
+        lines += ["# HELP pipeline_stage_seconds_total Tempo acumulado em cada etapa.",
+                  "# TYPE pipeline_stage_seconds_total counter"]
+        lines += [f"pipeline_stage_seconds_total{_labels(stage=s)} {t[0]:.6f}" for s, t in sorted(_stage_seconds.items())]
+
+        lines += ["# HELP pipeline_stage_last_duration_seconds Duração da última execução da etapa.",
+                  "# TYPE pipeline_stage_last_duration_seconds gauge"]
+        lines += [f"pipeline_stage_last_duration_seconds{_labels(stage=s)} {t[1]:.6f}" for s, t in sorted(_stage_seconds.items())]
+
+        lines += ["# HELP pipeline_rows_total Linhas lidas/gravadas por etapa.",
+                  "# TYPE pipeline_rows_total counter"]
+        lines += [f"pipeline_rows_total{_labels(stage=s, direction=d)} {n}" for (s, d), n in sorted(_rows.items())]
+
+        lines += ["# HELP pipeline_bytes_total Bytes lidos/gravados por etapa.",
+                  "# TYPE pipeline_bytes_total counter"]
+        lines += [f"pipeline_bytes_total{_labels(stage=s, direction=d)} {n}" for (s, d), n in sorted(_bytes.items())]
+
+        lines += ["# HELP pipeline_request_duration_seconds Latência das chamadas externas (API de câmbio, LLM).",
+                  "# TYPE pipeline_request_duration_seconds histogram"]
+        for (target, status), h in sorted(_latency.items()):
+            for bound, count in zip(LATENCY_BUCKETS, h["buckets"]):
+                lines.append(f"pipeline_request_duration_seconds_bucket{_labels(target=target, status=status, le=bound)} {count}")
+            lines.append(f"pipeline_request_duration_seconds_bucket{_labels(target=target, status=status, le='+Inf')} {h['count']}")
+            lines.append(f"pipeline_request_duration_seconds_sum{_labels(target=target, status=status)} {h['sum']:.6f}")
+            lines.append(f"pipeline_request_duration_seconds_count{_labels(target=target, status=status)} {h['count']}")
+
+    lines += ["# HELP pipeline_last_update_timestamp_seconds Momento da última atualização destas métricas.",
+              "# TYPE pipeline_last_update_timestamp_seconds gauge",
+              f"pipeline_last_update_timestamp_seconds {time.time():.0f}"]
+    return "\n".join(lines) + "\n"
+
+def prometheus_textfile_path():
+    """Um textfile por script de entrada (ex: metrics/pipeline_collect_bronze.prom)."""
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    return os.path.join(METRICS_DIR, f"pipeline_{script}.prom")
+
+def write_prometheus_textfile(path=None):
+    """Grava o textfile de forma atômica (o node_exporter nunca lê um arquivo pela metade)."""
+    path = path or prometheus_textfile_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
@@ -5,10 +5,19 @@ import re
 from datetime import datetime 
 import logging
 import sys 
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Adicione a importação do config.py AQUI para ter acesso às variáveis de diretório e à função setup_directories
 # IMPORTAÇÃO CORRIGIDA:
-from config import BRONZE_DIR, SILVER_DIR, setup_directories 
+from config import BRONZE_DIR, BRONZE_FORMAT, MOEDA_BASE, SILVER_DIR, SILVER_FORMAT, SILVER_MANIFEST, setup_directories 
+from metrics import timed, record_rows, record_bytes, record_file_bytes, enable_profiling
+from quality import RULES, ROW_RULES, QUARANTINE_COLUMNS, validate_rates, load_silver_history, write_quarantine
+from rate_snapshot import RateSnapshot
+from catalog import bronze_catalog, silver_catalog
+from silver_store import SILVER_SUFFIXES, save_silver_file
+import bronze_archive
 
 # Configuração do logging estruturado e de nível
 logging.basicConfig(
@@ -19,19 +28,170 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_latest_bronze_file():
-    """Encontra o arquivo .json mais recente na pasta BRONZE."""
+def bronze_mtimes(sync=False):
+    """{nome do arquivo BRONZE: mtime} segundo o catálogo, a única fonte de mtime do manifesto.
+
+    A coleta registra cada arquivo no catálogo, então não há varredura do diretório.
+    Com sync=True o catálogo é conciliado antes com o diretório: arquivos copiados à
+    mão (recuperação de uma falha da coleta, por exemplo) entram sem um rebuild completo.
+    """
+    catalog = bronze_catalog()
+    if sync:
+        catalog.sync()
+    return {os.path.basename(entry["path"]): entry["mtime"] for entry in catalog.entries()}
+
+def get_latest_bronze_file(base_currency=MOEDA_BASE):
+    """Encontra o arquivo .json mais recente da moeda base na pasta BRONZE (consulta indexada ao catálogo).
+
+    Sem o filtro, num dia com várias moedas base "2025-09-30_USD.json" venceria "2025-09-30.json".
+    """
+    return bronze_catalog().latest(base_currency=base_currency)
+
+def parse_bronze_snapshot(bronze_data, bronze_filename):
+    """Converte o conteúdo de um arquivo BRONZE (dict ou bytes JSON) num RateSnapshot, sem pandas.
+
+    As taxas ainda não são validadas. Retorna None se o arquivo for inválido.
+    A data de coleta vem do nome do arquivo BRONZE (YYYY-MM-DD...).
+    """
     try:
-        # A variável BRONZE_DIR está disponível graças à importação acima
-        files = [f for f in os.listdir(BRONZE_DIR) if f.endswith('.json')]
-        if not files:
-            return None
-        # Ordena em ordem decrescente (o mais recente com o maior timestamp)
-        files.sort(reverse=True)
-        return os.path.join(BRONZE_DIR, files[0])
-    except FileNotFoundError:
+        return RateSnapshot.from_payload(bronze_data, os.path.basename(bronze_filename)[:10])
+    except (KeyError, ValueError) as e:
+        # Payload incompleto ou data fora do padrão (crucial para o join histórico)
+        logger.error(f"[FALHA] Dados BRONZE inválidos em {os.path.basename(bronze_filename)}: {e}")
+        return None
+
+def parse_bronze_data(bronze_data, bronze_filename):
+    """Converte o conteúdo de um arquivo BRONZE em linhas (currency, rate, base_currency, collected_date).
+
+    As taxas ainda não são validadas. Retorna None se o arquivo for inválido.
+    """
+    snapshot = parse_bronze_snapshot(bronze_data, bronze_filename)
+    return None if snapshot is None else snapshot.to_pandas()
+
+def read_bronze_file(bronze_path):
+    """Lê e converte UM arquivo BRONZE (unidade de trabalho paralela do backfill)."""
+    try:
+        with open(bronze_path, 'rb') as f:
+            raw_bytes = f.read()
+    except OSError as e:
+        logger.error(f"Falha ao ler o arquivo BRONZE: {e}") # Log de ERROR
+        return None
+    return parse_bronze_data(raw_bytes, bronze_path)
+
+def read_bronze_snapshot(name, raw_bytes):
+    """Converte UMA coleta lida dos segmentos BRONZE (bytes crus da API)."""
+    return parse_bronze_data(raw_bytes, name)
+
+def validate_silver(df, history=None, rules=RULES):
+    """GARANTIR QUALIDADE: aplica as regras de quality.py a um ou mais dias já convertidos.
+
+    As regras substituem a antiga limpeza de taxas nulas/negativas; history é a
+    SILVER dos dias anteriores, usada pelas regras de anomalia.
+    Retorna (DataFrame SILVER, DataFrame de quarentena).
+    """
+    initial_count = len(df)
+    df, df_quarantine = validate_rates(df, history, rules)
+
+    final_count = len(df)
+    # Log de INFO para observabilidade
+    logger.info(f"Linhas removidas pelas regras de qualidade: {initial_count - final_count}")
+    record_rows("silver", "read", initial_count)
+    record_rows("silver", "written", final_count)
+    return df, df_quarantine
+
+def validate_snapshot(snapshot, history=None, rules=RULES):
+    """Como validate_silver, para UMA coleta: as regras por linha rodam direto no RateSnapshot.
+
+    Só as demais regras (as de anomalia, que comparam com o histórico) usam o
+    DataFrame, exportado a partir das taxas que sobraram.
+    Retorna (DataFrame SILVER, DataFrame de quarentena).
+    """
+    if not all(rule in rules for rule in ROW_RULES):
+        return validate_silver(snapshot.to_pandas(), history, rules)
+
+    valid, violations = snapshot.validate()
+    for rule, count in Counter(violation['rule'] for violation in violations).items():
+        logger.info(f"Regra de qualidade '{rule}' (drop): {count} linha(s)")
+    frames = []
+    if violations:
+        frames.append(pd.DataFrame(violations, columns=QUARANTINE_COLUMNS).assign(
+            collected_date=lambda df: pd.to_datetime(df['collected_date']),
+        ))
+
+    df = valid.to_pandas()
+    other_rules = [rule for rule in rules if rule not in ROW_RULES]
+    if len(valid) and other_rules:
+        df, df_flagged = validate_rates(df, history, other_rules)
+        frames.append(df_flagged)
+
+    logger.info(f"Linhas removidas pelas regras de qualidade: {len(snapshot) - len(df)}")
+    record_rows("silver", "read", len(snapshot))
+    record_rows("silver", "written", len(df))
+    frames = [frame for frame in frames if not frame.empty]
+    df_quarantine = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    return df, df_quarantine
+
+def normalize_bronze_data(bronze_data, bronze_filename, history=None, rules=RULES):
+    """Valida e normaliza o conteúdo de um arquivo BRONZE já carregado (sem I/O).
+
+    Retorna (DataFrame SILVER, DataFrame de quarentena); o DataFrame SILVER é
+    None se o arquivo for inválido ou nenhuma taxa passar pelas regras.
+    """
+    snapshot = parse_bronze_snapshot(bronze_data, bronze_filename)
+    if snapshot is None:
+        return None, None
+
+    df, df_quarantine = validate_snapshot(snapshot, history, rules)
+    if df.empty:
+        logger.error("[FALHA] Nenhuma taxa válida no arquivo BRONZE.")
+        return None, df_quarantine
+
+    # --- FIM DA VALIDAÇÃO E NORMALIZAÇÃO ---
+    return df, df_quarantine
+
+def silver_path_for(bronze_path, silver_format=SILVER_FORMAT):
+    """Caminho do arquivo SILVER (.arrow ou .csv, conforme SILVER_FORMAT) de um arquivo BRONZE."""
+    filename_from_bronze = os.path.basename(bronze_path).replace(".json", "")
+    return os.path.join(SILVER_DIR, f"{filename_from_bronze}{SILVER_SUFFIXES[silver_format]}")
+
+def save_silver(df, bronze_path):
+    """Salva o DataFrame normalizado na camada SILVER (Arrow IPC ou CSV) e retorna o caminho."""
+    silver_file_path = save_silver_file(df, silver_path_for(bronze_path))
+    record_file_bytes("silver", "written", silver_file_path)
+    logger.info(f"[SUCESSO] Dados normalizados salvos em: {silver_file_path}")
+    return silver_file_path
+
+def normalize_bronze_file(bronze_path):
+    """Lê UM arquivo BRONZE, valida, normaliza e salva o arquivo correspondente na SILVER.
+
+    Retorna o caminho do arquivo SILVER gerado ou None em caso de falha.
+    """
+    logger.info(f"Lendo dados de: {bronze_path}")
+
+    try:
+        with open(bronze_path, 'rb') as f:
+            raw_bytes = f.read()
+    except OSError as e:
+        logger.error(f"Falha ao ler o arquivo BRONZE: {e}") # Log de ERROR
+        return None
+    snapshot = parse_bronze_snapshot(raw_bytes, bronze_path)
+    if snapshot is None:
         return None
+    record_file_bytes("silver", "read", bronze_path)
+    return _validate_and_save(snapshot, bronze_path)
+
+def _validate_and_save(snapshot, bronze_path):
+    # As regras de anomalia comparam o dia com a SILVER dos dias anteriores
+    df, df_quarantine = validate_snapshot(snapshot, load_silver_history(snapshot.collected_date))
+    write_quarantine(df_quarantine)
+    if df.empty:
+        logger.error("[FALHA] Nenhuma taxa válida no arquivo BRONZE.")
+        return None
+
+    # 5. Salva na camada SILVER (formato normalizado, limpo e tipado)
+    return save_silver(df, bronze_path)
 
+@timed("silver")
 def process_and_save_silver():
     """Lê o Bronze, valida, normaliza (Pandas DataFrame) e salva na camada SILVER."""
     
@@ -39,66 +199,229 @@ def process_and_save_silver():
     setup_directories()
     logger.info("--- INICIANDO PROCESSAMENTO SILVER ---") # Log de INFO
     
-    # 1. Encontrar e Ler o arquivo BRONZE
+    # 1. Encontrar e Ler o arquivo BRONZE (ou a coleta mais recente dos segmentos), da moeda base padrão
+    if BRONZE_FORMAT == "segments":
+        latest = bronze_archive.latest_snapshot(MOEDA_BASE)
+        if latest is None:
+            logger.error(f"[ERRO] Nenhuma coleta de {MOEDA_BASE} nos segmentos BRONZE. Execute 'collect_bronze.py' primeiro.")
+            return
+        name, record, raw_bytes = latest
+        logger.info(f"Lendo a coleta {name} de: {record.collected_date[:7]}{bronze_archive.SEGMENT_SUFFIX}")
+        snapshot = parse_bronze_snapshot(raw_bytes, name)
+        record_bytes("silver", "read", record.length)
+        if snapshot is not None and _validate_and_save(snapshot, name):
+            logger.info("--- PROCESSAMENTO SILVER CONCLUÍDO ---")
+        return
+
     bronze_path = get_latest_bronze_file()
     if not bronze_path:
         logger.error("[ERRO] Não foi encontrado nenhum arquivo na camada BRONZE. Execute 'collect_bronze.py' primeiro.") # Log de ERROR
         return
     
-    logger.info(f"Lendo dados de: {bronze_path}")
-    
+    if normalize_bronze_file(bronze_path):
+        logger.info("--- PROCESSAMENTO SILVER CONCLUÍDO ---")
+
+# --- BACKFILL HISTÓRICO (INCREMENTAL E PARALELO) ---
+
+def load_silver_manifest():
+    """Carrega o manifesto da SILVER (watermark + arquivos BRONZE já processados).
+
+    Na primeira execução o manifesto é semeado a partir dos arquivos já existentes,
+    para não reprocessar dias que foram normalizados manualmente no passado.
+    """
     try:
-        with open(bronze_path, 'r', encoding='utf-8') as f:
-            bronze_data = json.load(f)
+        with open(SILVER_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
     except Exception as e:
-        logger.error(f"Falha ao ler o arquivo BRONZE: {e}") # Log de ERROR
-        return
+        logger.error(f"Manifesto SILVER corrompido, será reconstruído: {e}")
 
-    # --- INÍCIO DA VALIDAÇÃO E NORMALIZAÇÃO ---
-    
-    if bronze_data.get("result") != "success" or "conversion_rates" not in bronze_data:
-        logger.error("[FALHA] Dados BRONZE inválidos ou incompletos.")
-        return
+    manifest = {"watermark": None, "processed": {}}
+    silver_files = {os.path.basename(entry["path"]) for entry in silver_catalog().entries()}
+    mtimes = bronze_mtimes()
 
-    # 1. Normalizar
-    rates = bronze_data["conversion_rates"]
-    data_list = [(currency, rate) for currency, rate in rates.items()]
-    df = pd.DataFrame(data_list, columns=['currency', 'rate'])
-    
-    # 2. Adicionar colunas de contexto (base_currency)
-    df['base_currency'] = bronze_data["base_code"]
-    
-    # 3. Extrair a data do nome do arquivo (YYYY-MM-DD)
-    filename = os.path.basename(bronze_path)
+    for silver_name in silver_files:
+        suffix = next(suffix for suffix in SILVER_SUFFIXES.values() if silver_name.endswith(suffix))
+        bronze_name = silver_name[:-len(suffix)] + ".json"
+        if bronze_name in mtimes:
+            manifest["processed"][bronze_name] = {
+                "silver": silver_name,
+                "mtime": mtimes[bronze_name],
+            }
+    if manifest["processed"]:
+        manifest["watermark"] = max(name[:10] for name in manifest["processed"])
+    return manifest
+
+def save_silver_manifest(manifest):
+    """Grava o manifesto de forma atômica (arquivo temporário + os.replace)."""
+    tmp_path = f"{SILVER_MANIFEST}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, SILVER_MANIFEST)
+
+def get_pending_bronze_files(manifest, mtimes=None):
+    """Lista os arquivos BRONZE que ainda não têm SILVER correspondente.
+
+    Os arquivos e seus mtimes vêm do catálogo BRONZE.
+    Dias anteriores ao watermark que já constam no manifesto são pulados;
+    apenas arquivos novos ou do dia do watermark (que pode ter sido
+    sobrescrito pela coleta) são verificados pelo mtime.
+    """
+    mtimes = bronze_mtimes() if mtimes is None else mtimes
+    processed = manifest["processed"]
+    watermark = manifest.get("watermark") or ""
+    pending = []
+    for name, mtime in mtimes.items():
+        entry = processed.get(name)
+        if entry is None or (name[:10] >= watermark and mtime != entry.get("mtime")):
+            pending.append(os.path.join(BRONZE_DIR, name))
+    return sorted(pending)
+
+def get_pending_bronze_snapshots(manifest):
+    """Como get_pending_bronze_files, para os segmentos: [(segmento, Record)] ainda sem SILVER.
+
+    O horário da coleta (collected_at) faz o papel do mtime do arquivo JSON.
+    Só os índices são lidos; os payloads são lidos depois, um de cada vez.
+    """
+    processed = manifest["processed"]
+    watermark = manifest.get("watermark") or ""
+    pending = []
+    for segment, record in bronze_archive.records():
+        name = bronze_archive.record_name(record.collected_date, record.base_currency)
+        entry = processed.get(name)
+        if entry is None or (name[:10] >= watermark and record.collected_at != entry.get("mtime")):
+            pending.append((segment, record))
+    return pending
+
+def _read_pending_files(executor, pending):
+    """Leitura paralela dos arquivos BRONZE: retorna os DataFrames com a coluna _source."""
+    frames = []
+    futures = {executor.submit(read_bronze_file, path): path for path in pending}
+    for future in as_completed(futures):
+        bronze_path = futures[future]
+        try:
+            df_raw = future.result()
+        except Exception as e:
+            logger.error(f"Falha ao processar {bronze_path}: {e}")
+            continue
+        if df_raw is not None:
+            frames.append(df_raw.assign(_source=bronze_path))
+            record_file_bytes("silver_backfill", "read", bronze_path)
+    return frames
+
+def _read_pending_snapshots(pending):
+    """Leitura em streaming das coletas dos segmentos (uma coleta descomprimida por vez)."""
+    frames = []
+    for name, record, raw_bytes in bronze_archive.iter_snapshots(selection=pending):
+        df_raw = read_bronze_snapshot(name, raw_bytes)
+        if df_raw is not None:
+            frames.append(df_raw.assign(_source=name))
+            record_bytes("silver_backfill", "read", record.length)
+    return frames
+
+@timed("silver_backfill")
+def backfill_silver(max_workers=None, sync=False):
+    """Normaliza em paralelo todos os dias BRONZE pendentes e atualiza o manifesto.
+
+    A leitura dos arquivos e a gravação da SILVER rodam em processos; a validação
+    roda uma única vez sobre o lote inteiro (todas as datas e moedas base),
+    com o histórico anterior ao dia mais antigo para as regras de anomalia.
+    sync=True concilia antes o catálogo BRONZE com o diretório (arquivos copiados à mão).
+    """
     
+    setup_directories()
+    logger.info("--- INICIANDO BACKFILL SILVER ---")
+
+    manifest = load_silver_manifest()
+    from_segments = BRONZE_FORMAT == "segments"
+    if from_segments:
+        pending = get_pending_bronze_snapshots(manifest)
+    else:
+        catalog_mtimes = bronze_mtimes(sync)
+        pending = get_pending_bronze_files(manifest, catalog_mtimes)
+    if not pending:
+        logger.info("Nenhum arquivo BRONZE pendente. SILVER já está atualizada.")
+        return []
+
+    logger.info(f"Arquivos BRONZE pendentes: {len(pending)}")
+    # O mtime é capturado antes do processamento para que uma sobrescrita
+    # concorrente do arquivo seja reprocessada na próxima execução
+    if from_segments:
+        mtimes = {
+            bronze_archive.record_name(record.collected_date, record.base_currency): record.collected_at
+            for _, record in pending
+        }
+    else:
+        mtimes = {path: catalog_mtimes[os.path.basename(path)] for path in pending}
+
+    generated = []
     try:
-        # Pega os 10 primeiros caracteres (ex: 2025-09-30)
-        timestamp_str = filename[:10] 
-        df['collected_date'] = pd.to_datetime(timestamp_str)
-    except Exception as e:
-        logger.error(f"[ERRO FATAL DE DATA] Não foi possível converter '{timestamp_str}' em data. Detalhes: {e}")
-        return # Aborta, pois a data é crucial para o join histórico
-    
-    # 4. GARANTIR QUALIDADE (Taxas não negativas ou nulas)
-    initial_count = len(df)
-    df['rate'] = pd.to_numeric(df['rate'], errors='coerce') 
-    df.dropna(subset=['rate'], inplace=True) 
-    df = df[df['rate'] > 0] # Remove negativos ou zero
-    
-    final_count = len(df)
-    # Log de INFO para observabilidade
-    logger.info(f"Linhas removidas por valor nulo/negativo: {initial_count - final_count}")
-    
-    # --- FIM DA VALIDAÇÃO E NORMALIZAÇÃO ---
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # 1. Leitura das coletas BRONZE (arquivos em paralelo; segmentos em streaming)
+            frames = _read_pending_snapshots(pending) if from_segments else _read_pending_files(executor, pending)
+            if not frames:
+                return []
 
-    # 5. Salva na camada SILVER (CSV, formato normalizado e limpo)
-    filename_from_bronze = os.path.basename(bronze_path).replace(".json", "")
-    silver_file_path = os.path.join(SILVER_DIR, f"{filename_from_bronze}_silver.csv")
-    
-    df.to_csv(silver_file_path, index=False)
-    
-    logger.info(f"[SUCESSO] Dados normalizados salvos em: {silver_file_path}")
-    logger.info("--- PROCESSAMENTO SILVER CONCLUÍDO ---")
+            # 2. Validação vetorizada do lote inteiro
+            df_batch = pd.concat(frames, ignore_index=True)
+            read_sources = set(df_batch['_source'])
+            history = load_silver_history(df_batch['collected_date'].min())
+            df_batch, df_quarantine = validate_silver(df_batch, history)
+            write_quarantine(df_quarantine)
+
+            # 3. Gravação paralela de um arquivo SILVER por arquivo BRONZE
+            futures = {
+                executor.submit(save_silver, df_day.drop(columns='_source'), bronze_path): bronze_path
+                for bronze_path, df_day in df_batch.groupby('_source', sort=False)
+            }
+            for future in as_completed(futures):
+                bronze_path = futures[future]
+                try:
+                    silver_path = future.result()
+                except Exception as e:
+                    logger.error(f"Falha ao gravar a SILVER de {bronze_path}: {e}")
+                    continue
+
+                bronze_name = os.path.basename(bronze_path)
+                manifest["processed"][bronze_name] = {
+                    "silver": os.path.basename(silver_path),
+                    "mtime": mtimes[bronze_path],
+                }
+                generated.append(silver_path)
+                # Os contadores dos processos filhos se perdem; os bytes são contados aqui
+                record_file_bytes("silver_backfill", "written", silver_path)
+
+            # Arquivos com todas as taxas em quarentena não geram SILVER; ficam no manifesto
+            # (silver: None) para não serem relidos e quarentenados de novo a cada execução
+            for bronze_path in read_sources - set(futures.values()):
+                manifest["processed"][os.path.basename(bronze_path)] = {
+                    "silver": None,
+                    "mtime": mtimes[bronze_path],
+                }
+    finally:
+        if manifest["processed"]:
+            manifest["watermark"] = max(name[:10] for name in manifest["processed"])
+        save_silver_manifest(manifest)
+
+    logger.info(f"Dias normalizados: {len(generated)} de {len(pending)}")
+    logger.info("--- BACKFILL SILVER CONCLUÍDO ---")
+    return sorted(generated)
 
 if __name__ == "__main__":
-    process_and_save_silver()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Processamento da camada SILVER.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Processa todos os dias BRONZE pendentes (incremental e paralelo).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Número de processos usados no backfill (padrão: núcleos da CPU).")
+    parser.add_argument("--sync", action="store_true",
+                        help="Concilia antes o catálogo BRONZE com o diretório (arquivos copiados à mão).")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da etapa.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    if args.backfill:
+        backfill_silver(max_workers=args.workers, sync=args.sync)
+    else:
+        process_and_save_silver()
\ No newline at end of file
@@ -0,0 +1,200 @@
+import logging
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from config import (
+    SILVER_DIR, QUARANTINE_DIR, QUALITY_HISTORY_DAYS, QUALITY_ZSCORE_MAX, QUALITY_MAX_PCT_JUMP,
+)
+from gold_store import write_gold_partition, query_gold
+# Códigos válidos e tolerância da moeda base: os mesmos do núcleo sem pandas (RateSnapshot.validate)
+from rate_snapshot import VALID_CURRENCIES, SELF_RATE_TOLERANCE
+from silver_store import read_silver_range
+
+# Motor de regras de qualidade da camada SILVER.
+# Cada regra recebe o lote inteiro (qualquer quantidade de dias e moedas base)
+# e devolve uma máscara booleana das linhas que a violam, então validar um
+# backfill de anos custa uma passada vetorizada por regra, e não um loop por arquivo.
+# Regras 'drop' removem a linha da SILVER; regras 'flag' apenas a registram.
+# Toda violação vai para a tabela de quarentena (silver/quarantine/year=/month=).
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ['collected_date', 'base_currency', 'currency']
+QUARANTINE_KEY = ['collected_date', 'base_currency', 'currency', 'rule']
+QUARANTINE_COLUMNS = ['collected_date', 'base_currency', 'currency', 'rate', 'raw_value', 'rule', 'action', 'detail']
+
+# Mínimo de variações anteriores para calcular o z-score de uma série
+MIN_HISTORY_POINTS = 10
+# Variações abaixo disso não contam como anomalia de z-score (moedas com paridade
+# fixa têm desvio padrão quase zero e qualquer arredondamento viraria outlier)
+ZSCORE_MIN_JUMP = 0.005
+
+Rule = namedtuple("Rule", ["name", "action", "check"])
+
+
+# --- Regras (cada uma recebe o lote, a máscara das linhas ainda ativas e o contexto) ---
+
+def check_rate_positive(df, active, context):
+    """Taxa não numérica, nula, zero ou negativa."""
+    return active & ~(df['rate'] > 0), None
+
+def check_currency_code(df, active, context):
+    """Moeda ou moeda base fora da ISO-4217 (e dos territórios cotados pela API)."""
+    valid = df['currency'].isin(VALID_CURRENCIES) & df['base_currency'].isin(VALID_CURRENCIES)
+    return active & ~valid, None
+
+def check_duplicates(df, active, context):
+    """Mesma (data, base, moeda) repetida no lote: a primeira ocorrência é mantida."""
+    duplicated = df.loc[active].duplicated(subset=KEY_COLUMNS, keep='first')
+    return duplicated.reindex(df.index, fill_value=False), None
+
+def check_base_self_rate(df, active, context):
+    """A moeda base deve valer 1 em relação a si mesma; senão o dia/base inteiro é suspeito."""
+    group_ids = df.groupby(['collected_date', 'base_currency'], sort=False).ngroup().to_numpy()
+    self_ok = active & (df['currency'] == df['base_currency']) & ((df['rate'] - 1.0).abs() <= SELF_RATE_TOLERANCE)
+    good_groups = np.unique(group_ids[self_ok.to_numpy()])
+    return active & ~np.isin(group_ids, good_groups), None
+
+def rate_jump_features(df, active, history=None, window=QUALITY_HISTORY_DAYS):
+    """Variação diária e z-score de cada taxa contra os `window` dias anteriores da série.
+
+    As séries (base, moeda) do lote são concatenadas ao histórico já validado,
+    ordenadas por data, e as estatísticas móveis são calculadas por groupby,
+    sem laço em Python. Retorna um DataFrame com 'jump' (variação relativa ao
+    dia anterior) e 'zscore' (da variação logarítmica), alinhado ao lote.
+    """
+    columns = ['collected_date', 'base_currency', 'currency', 'rate']
+    current = df.loc[active, columns].assign(_row=df.index[active])
+    frames = [current]
+    if history is not None and len(history):
+        frames.insert(0, history[columns].assign(_row=-1))
+
+    combined = pd.concat(frames, ignore_index=True)
+    combined['collected_date'] = pd.to_datetime(combined['collected_date'])
+    combined = combined.sort_values(['base_currency', 'currency', 'collected_date'], kind='stable', ignore_index=True)
+
+    keys = [combined['base_currency'], combined['currency']]
+    log_rate = np.log(combined['rate'])
+    log_return = log_rate - log_rate.groupby(keys, sort=False).shift(1)
+    # Estatísticas das variações ANTERIORES (a variação do próprio dia não entra)
+    previous = log_return.groupby(keys, sort=False).shift(1)
+    rolling = previous.groupby(keys, sort=False).rolling(window, min_periods=MIN_HISTORY_POINTS)
+    mean = rolling.mean().reset_index(level=[0, 1], drop=True)
+    std = rolling.std().reset_index(level=[0, 1], drop=True)
+
+    features = pd.DataFrame({
+        'jump': np.expm1(log_return),
+        'zscore': (log_return - mean) / std.where(std > 0),
+    })
+    rows = combined['_row'].to_numpy()
+    features = features[rows >= 0].set_axis(rows[rows >= 0])
+    return features.reindex(df.index)
+
+def _features(df, active, context):
+    if 'features' not in context:
+        context['features'] = rate_jump_features(df, active, context.get('history'))
+    return context['features']
+
+def check_zscore_outlier(df, active, context):
+    """Variação diária muito fora da volatilidade recente da série (|z| acima do limite)."""
+    features = _features(df, active, context)
+    mask = active & (features['zscore'].abs() > QUALITY_ZSCORE_MAX) & (features['jump'].abs() > ZSCORE_MIN_JUMP)
+    return mask, features['zscore'].round(2).map("z={}".format)
+
+def check_pct_jump(df, active, context):
+    """Salto percentual em relação ao dia anterior acima do limite configurado."""
+    features = _features(df, active, context)
+    mask = active & (features['jump'].abs() > QUALITY_MAX_PCT_JUMP)
+    return mask, (features['jump'] * 100).round(2).map("jump={}%".format)
+
+
+# Regras por linha (independem de histórico) e regras de anomalia entre dias
+ROW_RULES = [
+    Rule("rate_positive", "drop", check_rate_positive),
+    Rule("iso_4217_code", "drop", check_currency_code),
+    Rule("duplicate", "drop", check_duplicates),
+    Rule("base_self_rate", "drop", check_base_self_rate),
+]
+OUTLIER_RULES = [
+    Rule("zscore_outlier", "flag", check_zscore_outlier),
+    Rule("pct_jump", "flag", check_pct_jump),
+]
+RULES = ROW_RULES + OUTLIER_RULES
+
+
+def validate_rates(df, history=None, rules=RULES):
+    """Aplica as regras a um lote de taxas (currency, rate, base_currency, collected_date).
+
+    history é a SILVER já validada dos dias anteriores ao lote, usada pelas
+    regras de anomalia. As regras rodam na ordem da lista e cada uma enxerga
+    apenas as linhas que as regras 'drop' anteriores mantiveram.
+    Retorna (DataFrame válido, DataFrame de quarentena); colunas extras do lote
+    são preservadas no DataFrame válido.
+    """
+    df = df.reset_index(drop=True)
+    raw_values = df['rate']
+    df = df.assign(rate=pd.to_numeric(raw_values, errors='coerce'))
+
+    context = {'history': history}
+    active = pd.Series(True, index=df.index)
+    quarantined = []
+    for rule in rules:
+        mask, detail = rule.check(df, active, context)
+        count = int(mask.sum())
+        if not count:
+            continue
+        logger.info(f"Regra de qualidade '{rule.name}' ({rule.action}): {count} linha(s)")
+        quarantined.append(pd.DataFrame({
+            'collected_date': df.loc[mask, 'collected_date'],
+            'base_currency': df.loc[mask, 'base_currency'],
+            'currency': df.loc[mask, 'currency'],
+            'rate': df.loc[mask, 'rate'],
+            'raw_value': raw_values[mask].astype(str),
+            'rule': rule.name,
+            'action': rule.action,
+            'detail': detail[mask] if detail is not None else None,
+        }))
+        if rule.action == "drop":
+            active &= ~mask
+
+    df_quarantine = (
+        pd.concat(quarantined, ignore_index=True) if quarantined
+        else pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    )
+    return df.loc[active].reset_index(drop=True), df_quarantine
+
+def load_silver_history(before_date, days=QUALITY_HISTORY_DAYS, silver_dir=SILVER_DIR):
+    """SILVER dos `days` dias anteriores a before_date (todas as moedas base), ou None."""
+    end = pd.Timestamp(before_date).normalize()
+    start = end - pd.Timedelta(days=days)
+    return read_silver_range(start, end - pd.Timedelta(days=1), silver_dir=silver_dir)
+
+def write_quarantine(df_quarantine, root=QUARANTINE_DIR):
+    """Grava (upsert) as violações na tabela de quarentena particionada por mês."""
+    if df_quarantine is None or df_quarantine.empty:
+        return []
+    df_quarantine = df_quarantine.astype({'rate': 'float64', 'raw_value': 'string', 'detail': 'string'})
+    return write_gold_partition(df_quarantine, root=root, key_columns=QUARANTINE_KEY)
+
+def query_quarantine(start_date, end_date=None, root=QUARANTINE_DIR):
+    """Violações registradas no intervalo de datas (DataFrame possivelmente vazio)."""
+    return query_gold(start_date, end_date, root=root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta a tabela de quarentena da SILVER.")
+    parser.add_argument("start", help="Data inicial (YYYY-MM-DD).")
+    parser.add_argument("end", nargs="?", help="Data final (YYYY-MM-DD). Padrão: igual à inicial.")
+    parser.add_argument("--rule", help="Mostra apenas as violações desta regra.")
+    args = parser.parse_args()
+
+    df = query_quarantine(args.start, args.end)
+    if args.rule and not df.empty:
+        df = df[df['rule'] == args.rule]
+    if df.empty:
+        print("Nenhuma violação registrada no período.")
+    else:
+        print(df.groupby(['rule', 'action']).size().rename('linhas').to_string())
+        print()
+        print(df.to_string(index=False))
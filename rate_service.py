@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from config import (
+    CROSS_RATES_DIR, MOEDA_BASE, SERVICE_HOST, SERVICE_PORT, SERVICE_CACHE_DAYS, SERVICE_RELOAD_SECONDS,
+)
+from cross_rates import _date_str, load_currency_index, currency_index_path, matrix_path
+from catalog import matrix_catalog
+
+# Serviço de conversão de baixa latência sobre as matrizes GOLD de taxas cruzadas.
+# Para cada data só é preciso o vetor "1 BASE = v[j] unidades de j" (a linha da
+# moeda base na matriz do dia, lida via memory-map): A -> B = v[B] / v[A].
+# Os vetores ficam num cache LRU por data pedida; datas sem cotação (fins de
+# semana, feriados, falhas de coleta) usam o último dia anterior disponível (as-of).
+# Não há thread de recarga: a cada SERVICE_RELOAD_SECONDS uma consulta verifica o
+# mtime do diretório das matrizes, e um novo dia gravado invalida o índice.
+
+
+class RateService:
+    """API em processo: convert() para um valor e convert_bulk() para arrays inteiros."""
+
+    def __init__(self, directory=CROSS_RATES_DIR, base=MOEDA_BASE, cache_size=SERVICE_CACHE_DAYS,
+                 reload_interval=SERVICE_RELOAD_SECONDS):
+        self.directory = directory
+        self.base = base
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.vectors = OrderedDict()  # data pedida (YYYY-MM-DD) -> (data as-of, vetor)
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0}
+        self._checked_at = 0.0
+        self._version = None
+        self.reload()
+
+    def _directory_version(self):
+        # os.replace de uma matriz nova (ou regravada) altera o mtime do diretório
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self):
+        """Relê o índice de moedas e as datas disponíveis; esvazia o cache de vetores."""
+        version = self._directory_version()
+        codes = load_currency_index(currency_index_path(self.directory))
+        entries = matrix_catalog(self.directory).entries(base_currency=self.base) if version else []
+        with self.lock:
+            self.codes = codes
+            self.ids = {code: i for i, code in enumerate(codes)}
+            self.dates = np.array([entry["date"] for entry in entries], dtype='datetime64[D]')
+            self.vectors.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+            self.stats["reloads"] += 1
+
+    def maybe_reload(self):
+        """Recarrega se o diretório mudou (verificado no máximo a cada reload_interval segundos)."""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+        if self._directory_version() == self._version:
+            return False
+        self.reload()
+        return True
+
+    def latest_date(self):
+        return str(self.dates[-1]) if len(self.dates) else None
+
+    def _as_of_positions(self, days):
+        """Posição, em self.dates, do último dia disponível <= cada data (-1 se anterior a todos)."""
+        return np.searchsorted(self.dates, days, side='right') - 1
+
+    def _load_vector(self, as_of, ids):
+        matrix = np.load(matrix_path(as_of, self.base, self.directory), mmap_mode='r')
+        # Só a linha da moeda base é lida do disco (e copiada para a memória)
+        return np.array(matrix[ids[self.base]], dtype=np.float64)
+
+    def rate_vector(self, date_value):
+        """(data as-of, vetor BASE -> moeda) usado para a data pedida; KeyError se não houver cotação."""
+        self.maybe_reload()
+        key = _date_str(date_value)
+        with self.lock:
+            cached = self.vectors.get(key)
+            if cached is not None:
+                self.vectors.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+            # Datas, índice e versão lidos juntos: um reload() concorrente não mistura os dois estados
+            dates, ids, version = self.dates, self.ids, self._version
+
+        pos = int(np.searchsorted(dates, np.datetime64(key, 'D'), side='right') - 1)
+        if pos < 0:
+            raise KeyError(f"Sem cotações {self.base} em ou antes de {key}.")
+        as_of = str(dates[pos])
+        entry = (as_of, self._load_vector(as_of, ids))
+        with self.lock:
+            self.stats["misses"] += 1
+            if self._version != version:
+                # Houve reload() durante a leitura: o vetor vale para esta consulta, mas não entra no cache novo
+                return entry
+            self.vectors[key] = entry
+            while len(self.vectors) > self.cache_size:
+                self.vectors.popitem(last=False)
+        return entry
+
+    def quote(self, date_value, from_code, to_code, amount=1.0):
+        """Conversão com os metadados da resposta (data as-of e taxa aplicada)."""
+        as_of, vector = self.rate_vector(date_value)
+        try:
+            rate = vector[self.ids[to_code]] / vector[self.ids[from_code]]
+        except (KeyError, IndexError):
+            raise KeyError(f"Par {from_code}/{to_code} indisponível em {as_of}.")
+        if np.isnan(rate):
+            raise KeyError(f"Par {from_code}/{to_code} indisponível em {as_of}.")
+        return {
+            "date": _date_str(date_value), "as_of": as_of, "from": from_code, "to": to_code,
+            "amount": amount, "rate": float(rate), "result": float(rate) * amount,
+        }
+
+    def convert(self, date_value, from_code, to_code, amount=1.0):
+        """Converte amount de from_code para to_code na data (ou no último dia anterior com cotação)."""
+        return self.quote(date_value, from_code, to_code, amount)["result"]
+
+    def convert_bulk(self, dates, from_codes, to_codes, amounts):
+        """Conversão vetorizada de muitas linhas (data, de, para, valor).
+
+        Cada data distinta é resolvida uma vez (as-of via searchsorted) e os
+        vetores do dia são empilhados numa matriz; as linhas são então
+        convertidas com indexação NumPy. Linhas sem cotação resultam em NaN.
+        Retorna (valores convertidos, datas as-of).
+        """
+        self.maybe_reload()
+        days = np.asarray(dates, dtype='datetime64[D]')
+        if not len(self.dates):
+            return np.full(len(days), np.nan), np.full(len(days), np.datetime64('NaT'), dtype='datetime64[D]')
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        positions = self._as_of_positions(unique_days)
+
+        n_codes = len(self.codes)
+        vectors = np.full((len(unique_days), n_codes), np.nan)
+        for row, day in enumerate(unique_days):
+            if positions[row] >= 0:
+                vector = self.rate_vector(str(day))[1]
+                vectors[row, :len(vector)] = vector
+
+        def to_ids(codes):
+            return np.array([self.ids.get(code, -1) for code in codes], dtype=np.int64)
+
+        i, j = to_ids(from_codes), to_ids(to_codes)
+        valid = (i >= 0) & (j >= 0)
+        with np.errstate(invalid='ignore'):
+            rates = vectors[inverse, np.where(valid, j, 0)] / vectors[inverse, np.where(valid, i, 0)]
+        results = np.where(valid, rates, np.nan) * np.asarray(amounts, dtype=np.float64)
+
+        as_of = np.where(positions >= 0, self.dates[np.maximum(positions, 0)], np.datetime64('NaT'))
+        return results, as_of[inverse]
+
+
+# --- Servidor HTTP ---
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    """GET /convert?date=&from=&to=&amount=, POST /convert/bulk e GET /health."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive: o cliente reaproveita a conexão
+    # Cabeçalhos e corpo saem em escritas separadas: sem TCP_NODELAY, o algoritmo
+    # de Nagle + ACK atrasado somaria ~40 ms a cada resposta numa conexão keep-alive
+    disable_nagle_algorithm = True
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.service.maybe_reload()
+            self._send_json(200, {"base": self.service.base, "latest": self.service.latest_date(),
+                                  "days": len(self.service.dates), **self.service.stats})
+            return
+        if url.path != "/convert":
+            self._send_json(404, {"error": "rota inexistente"})
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        missing = [key for key in ("from", "to") if not params.get(key)]
+        if missing:
+            self._send_json(400, {"error": f"parâmetro obrigatório ausente: {', '.join(missing)}"})
+            return
+        try:
+            quote = self.service.quote(
+                params.get("date") or self.service.latest_date(),
+                params["from"].upper(), params["to"].upper(), float(params.get("amount", 1)),
+            )
+        except KeyError as e:
+            self._send_json(404, {"error": str(e).strip("'\"")})
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+        else:
+            self._send_json(200, quote)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/convert/bulk":
+            self._send_json(404, {"error": "rota inexistente"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            rows = json.loads(self.rfile.read(length))["requests"]
+            if not isinstance(rows, list) or not all(
+                isinstance(row, dict) and isinstance(row.get("from"), str) and isinstance(row.get("to"), str)
+                for row in rows
+            ):
+                raise ValueError("cada linha deve ser um objeto com 'from' e 'to' em texto")
+            results, as_of = self.service.convert_bulk(
+                [row.get("date") or self.service.latest_date() for row in rows],
+                [row["from"].upper() for row in rows],
+                [row["to"].upper() for row in rows],
+                [float(row.get("amount", 1)) for row in rows],
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"requisição inválida: {e}"})
+            return
+        self._send_json(200, {"results": [
+            {"result": None if np.isnan(value) else float(value), "as_of": None if np.isnat(day) else str(day)}
+            for value, day in zip(results, as_of)
+        ]})
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha de log por requisição (milhares por segundo)
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT):
+    """Servidor HTTP multithread que responde com a instância de RateService informada."""
+    handler = type("BoundConversionHandler", (ConversionHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de conversão de moedas (HTTP).")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--base", default=MOEDA_BASE, help="Moeda base das matrizes usadas.")
+    args = parser.parse_args()
+
+    server = make_server(RateService(base=args.base), args.host, args.port)
+    print(f"Serviço de conversão em http://{args.host}:{server.server_port} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,241 @@
+import sys
+import json
+import math
+import threading
+from array import array
+from datetime import date, datetime
+
+# Núcleo leve das taxas de UMA coleta (data, moeda base, ~160 taxas), sem pandas.
+# Os códigos de moeda são internados e mapeados para ids inteiros pequenos por
+# um registro do processo; as taxas ficam num buffer contíguo array('d').
+# Parse, validação das regras por linha, troca de base e conversão rodam direto
+# sobre esses buffers; to_arrow()/to_pandas() exportam (sem copiar as taxas)
+# apenas quando uma etapa precisa de um DataFrame. NumPy, pyarrow e pandas só
+# são importados dentro das funções de exportação.
+
+# Códigos ISO-4217 em vigor (e alguns recém-substituídos ainda cotados pela API)
+ISO_4217_CODES = frozenset("""
+    AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BOV BRL BSD
+    BTN BWP BYN BZD CAD CDF CHE CHF CHW CLF CLP CNY COP COU CRC CUC CUP CVE CZK DJF DKK DOP
+    DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD HNL HRK HTG HUF IDR ILS
+    INR IQD IRR ISK JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD KZT LAK LBP LKR LRD LSL LYD
+    MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MXV MYR MZN NAD NGN NIO NOK NPR NZD OMR
+    PAB PEN PGK PHP PKR PLN PYG QAR RON RSD RUB RWF SAR SBD SCR SDG SEK SGD SHP SLE SLL SOS
+    SRD SSP STN SVC SYP SZL THB TJS TMT TND TOP TRY TTD TWD TZS UAH UGX USD USN UYI UYU UYW
+    UZS VED VES VND VUV WST XAF XAG XAU XBA XBB XBC XBD XCD XCG XDR XOF XPD XPF XPT XSU XUA
+    YER ZAR ZMW ZWG ZWL
+""".split())
+
+# Moedas locais de territórios que a ExchangeRate-API cota fora da ISO-4217
+API_TERRITORY_CODES = frozenset({"FOK", "GGP", "IMP", "JEP", "KID", "TVD"})
+VALID_CURRENCIES = ISO_4217_CODES | API_TERRITORY_CODES
+
+# Tolerância da taxa da moeda base contra ela mesma (deve ser exatamente 1)
+SELF_RATE_TOLERANCE = 1e-6
+
+# --- Registro de códigos de moeda (id inteiro por código, estável dentro do processo) ---
+
+_codes = []  # id -> código (string internada)
+_ids = {}    # código -> id
+_registry_lock = threading.Lock()
+
+def currency_id(code):
+    """Id inteiro do código de moeda (registrado no primeiro uso)."""
+    currency = _ids.get(code)
+    if currency is None:
+        with _registry_lock:
+            currency = _ids.get(code)
+            if currency is None:
+                currency = len(_codes)
+                _codes.append(sys.intern(code))
+                _ids[_codes[-1]] = currency
+    return currency
+
+def currency_code(currency):
+    return _codes[currency]
+
+
+def _date_str(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return date.fromisoformat(str(value)[:10]).isoformat()  # ValueError se não for uma data
+
+
+class RateSnapshot:
+    """Taxas de uma coleta: 1 base_currency = rates[i] unidades de currency_code(ids[i]).
+
+    raw_values guarda o valor original das taxas que não eram números (a posição
+    fica NaN em rates) para que a quarentena registre o que a API enviou.
+    """
+
+    __slots__ = ("collected_date", "base_currency", "ids", "rates", "raw_values", "_positions")
+
+    def __init__(self, collected_date, base_currency, ids, rates, raw_values=None):
+        self.collected_date = _date_str(collected_date)
+        self.base_currency = sys.intern(base_currency)
+        self.ids = ids if isinstance(ids, array) else array('i', ids)
+        self.rates = rates if isinstance(rates, array) else array('d', rates)
+        self.raw_values = raw_values or {}
+        self._positions = None
+
+    @classmethod
+    def from_codes(cls, collected_date, base_currency, codes, rates):
+        return cls(collected_date, base_currency, array('i', map(currency_id, codes)), array('d', rates))
+
+    @classmethod
+    def from_payload(cls, payload, collected_date):
+        """Converte a resposta da API (dict ou bytes JSON); ValueError se ela for inválida.
+
+        As taxas ainda não são validadas: valores não numéricos viram NaN.
+        """
+        if isinstance(payload, (bytes, bytearray, str)):
+            payload = json.loads(payload)
+        if not isinstance(payload, dict) or payload.get("result") != "success" or "conversion_rates" not in payload:
+            raise ValueError("Dados BRONZE inválidos ou incompletos.")
+        if not isinstance(payload["conversion_rates"], dict):
+            raise ValueError("conversion_rates não é um objeto {moeda: taxa}.")
+
+        ids, rates, raw_values = array('i'), array('d'), {}
+        for position, (code, value) in enumerate(payload["conversion_rates"].items()):
+            ids.append(currency_id(code))
+            try:
+                rates.append(float(value))
+            except (TypeError, ValueError):
+                rates.append(math.nan)
+                raw_values[position] = value
+        return cls(collected_date, payload["base_code"], ids, rates, raw_values)
+
+    def __len__(self):
+        return len(self.rates)
+
+    def __repr__(self):
+        return f"RateSnapshot({self.collected_date}, {self.base_currency}, {len(self)} taxas)"
+
+    def __reduce__(self):
+        # Os ids só valem no processo que os criou: entre processos viajam os códigos
+        return (_rebuild_snapshot, (self.collected_date, self.base_currency, self.codes(), self.rates, self.raw_values))
+
+    def codes(self):
+        return [_codes[currency] for currency in self.ids]
+
+    def _position(self, code):
+        if self._positions is None:
+            self._positions = {currency: i for i, currency in enumerate(self.ids)}
+        currency = _ids.get(code)
+        position = self._positions.get(currency) if currency is not None else None
+        if position is None:
+            raise KeyError(f"Moeda {code} ausente na coleta {self.base_currency} de {self.collected_date}.")
+        return position
+
+    def rate(self, code):
+        """1 moeda base = rate(code) unidades de code."""
+        return self.rates[self._position(code)]
+
+    def convert(self, amount, from_code, to_code):
+        """Converte amount de from_code para to_code pelas taxas da coleta."""
+        return amount * self.rate(to_code) / self.rate(from_code)
+
+    def rebase(self, base_currency):
+        """Mesma coleta expressa em outra moeda base (uma divisão por taxa)."""
+        pivot = self.rate(base_currency)
+        rates = array('d', (rate / pivot for rate in self.rates))
+        return RateSnapshot(self.collected_date, base_currency, self.ids, rates)
+
+    def validate(self):
+        """Regras por linha da SILVER (as mesmas de quality.ROW_RULES), sem pandas.
+
+        Retorna (RateSnapshot só com as taxas válidas, violações); cada violação é
+        um dict com as colunas da tabela de quarentena.
+        """
+        violations = []
+        keep = []
+        seen = set()
+        base_valid = self.base_currency in VALID_CURRENCIES
+        for i, (currency, rate) in enumerate(zip(self.ids, self.rates)):
+            code = _codes[currency]
+            if not rate > 0:  # NaN, zero ou negativa
+                rule = "rate_positive"
+            elif not base_valid or code not in VALID_CURRENCIES:
+                rule = "iso_4217_code"
+            elif currency in seen:
+                rule = "duplicate"
+            else:
+                seen.add(currency)
+                keep.append(i)
+                continue
+            violations.append(self._violation(i, rule))
+
+        # A moeda base deve valer 1 em relação a si mesma; senão a coleta inteira é suspeita
+        base = _ids.get(self.base_currency)
+        if not any(self.ids[i] == base and abs(self.rates[i] - 1.0) <= SELF_RATE_TOLERANCE for i in keep):
+            violations.extend(self._violation(i, "base_self_rate") for i in keep)
+            keep = []
+
+        valid = RateSnapshot(
+            self.collected_date, self.base_currency,
+            array('i', (self.ids[i] for i in keep)), array('d', (self.rates[i] for i in keep)),
+        )
+        return valid, violations
+
+    def _violation(self, i, rule):
+        rate = self.rates[i]
+        raw_value = self.raw_values.get(i, rate)
+        return {
+            'collected_date': self.collected_date,
+            'base_currency': self.base_currency,
+            'currency': _codes[self.ids[i]],
+            'rate': rate,
+            'raw_value': None if raw_value is None else str(raw_value),
+            'rule': rule,
+            'action': "drop",
+            'detail': None,
+        }
+
+    # --- Exportação (somente quando a etapa precisa de colunas) ---
+
+    def rates_array(self):
+        """Taxas como ndarray float64 que compartilha o buffer do array('d') (sem cópia)."""
+        import numpy as np
+        return np.frombuffer(self.rates, dtype=np.float64)
+
+    def to_arrow(self):
+        """Tabela Arrow (currency/base_currency com dicionário, rate sem cópia, collected_date date32)."""
+        import numpy as np
+        import pyarrow as pa
+        n = len(self)
+        currency = pa.DictionaryArray.from_arrays(
+            pa.array(np.frombuffer(self.ids, dtype=np.int32)), pa.array(_codes[:max(self.ids, default=-1) + 1]),
+        )
+        base_currency = pa.DictionaryArray.from_arrays(
+            pa.array(np.zeros(n, dtype=np.int32)), pa.array([self.base_currency]),
+        )
+        collected_date = pa.array([date.fromisoformat(self.collected_date)] * n, type=pa.date32())
+        return pa.table({
+            'currency': currency,
+            'rate': pa.array(self.rates_array()),
+            'base_currency': base_currency,
+            'collected_date': collected_date,
+        })
+
+    def to_pandas(self):
+        """DataFrame no formato longo da SILVER (currency, rate, base_currency, collected_date)."""
+        import numpy as np
+        import pandas as pd
+        codes = np.array(_codes, dtype=object)
+        rates = self.rates_array()
+        if self.raw_values:
+            # Valores não numéricos voltam como vieram da API (a quarentena os registra)
+            rates = rates.astype(object)
+            for position, value in self.raw_values.items():
+                rates[position] = value
+        return pd.DataFrame({
+            'currency': codes[np.frombuffer(self.ids, dtype=np.int32)],
+            'rate': rates,
+            'base_currency': self.base_currency,
+            'collected_date': pd.Timestamp(self.collected_date),
+        }, copy=False)
+
+def _rebuild_snapshot(collected_date, base_currency, codes, rates, raw_values):
+    snapshot = RateSnapshot.from_codes(collected_date, base_currency, codes, rates)
+    snapshot.raw_values = raw_values
+    return snapshot
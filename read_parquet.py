@@ -1,30 +1,20 @@
-import pandas as pd
-import os
+from gold_store import latest_gold_date, query_gold
+from config import GOLD_DATASET_DIR
 
 def read_gold_parquet():
-    """Lê o arquivo Parquet mais recente da camada GOLD e imprime o conteúdo."""
+    """Lê os dados mais recentes do dataset GOLD particionado e imprime o conteúdo."""
     
-    GOLD_DIR = "data_layers/gold"
-    
-    # Encontra o arquivo .parquet mais recente na pasta GOLD
-    try:
-        files = [f for f in os.listdir(GOLD_DIR) if f.endswith('.parquet')]
-        if not files:
-            print(f"[ERRO] Nenhum arquivo .parquet encontrado em {GOLD_DIR}")
-            return
-            
-        files.sort(reverse=True)
-        latest_file = os.path.join(GOLD_DIR, files[0])
-        
-    except FileNotFoundError:
-        print(f"[ERRO] O diretório {GOLD_DIR} não existe. Execute o aggregate_gold.py primeiro.")
+    # Encontra a data mais recente no dataset GOLD (sem varrer todos os arquivos)
+    latest_date = latest_gold_date()
+    if latest_date is None:
+        print(f"[ERRO] Nenhum dado encontrado em {GOLD_DATASET_DIR}. Execute o aggregate_gold.py primeiro.")
         return
 
-    print(f"--- Lendo o arquivo Parquet mais recente: {latest_file} ---")
+    print(f"--- Lendo o dataset GOLD para a data mais recente: {latest_date} ---")
 
     try:
-        # Lê o Parquet (o pandas usa o pyarrow nos bastidores)
-        df_gold = pd.read_parquet(latest_file)
+        # Lê apenas a partição do mês (o pandas/pyarrow fazem a poda pelo filtro de data)
+        df_gold = query_gold(latest_date)
         
         # Imprime as primeiras 5 linhas e as informações sobre as colunas
         print("\nPrimeiras 5 linhas do DataFrame GOLD:")
@@ -33,7 +23,7 @@ def read_gold_parquet():
         df_gold.info()
 
     except Exception as e:
-        print(f"[ERRO] Falha ao ler o arquivo Parquet: {e}")
+        print(f"[ERRO] Falha ao ler o dataset Parquet: {e}")
 
 if __name__ == "__main__":
-    read_gold_parquet()
\ No newline at end of file
+    read_gold_parquet()
@@ -0,0 +1,292 @@
+import os
+import json
+import hashlib
+import argparse
+from datetime import timedelta
+from graphlib import TopologicalSorter
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import BRONZE_DIR, PIPELINE_STATE_FILE, REPORT_MAX_GAP_DAYS, setup_directories
+from collect_bronze import collect_and_save_bronze
+from process_silver import (
+    normalize_bronze_data, save_silver, get_latest_bronze_file,
+    load_silver_manifest, save_silver_manifest, get_pending_bronze_files, bronze_mtimes,
+)
+from aggregate_gold import build_gold
+from cross_rates import save_cross_rate_matrices
+from gold_store import write_gold_partition
+from quality import ROW_RULES, OUTLIER_RULES, validate_rates, load_silver_history, write_quarantine
+from metrics import timed, record_rows, record_bytes, enable_profiling
+from catalog import bronze_catalog
+
+# DAG da pipeline: cada etapa declara as etapas das quais depende.
+# Os DataFrames passam de uma etapa para a outra em memória; a persistência de
+# cada camada (CSV, matrizes, Parquet) acontece em segundo plano.
+PIPELINE_DAG = {
+    "bronze": [],
+    "silver": ["bronze"],
+    "gold": ["silver"],
+    "report": ["gold"],
+}
+STAGE_ORDER = list(TopologicalSorter(PIPELINE_DAG).static_order())
+
+
+def content_hash(*parts):
+    """SHA-256 de bytes/strings concatenados (usado como impressão digital das etapas)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def stage_fingerprints(bronze_name, raw_bytes):
+    """Impressão digital de cada etapa: hash do nome + impressões das dependências.
+
+    A etapa BRONZE usa o hash do nome do arquivo (de onde vem a data) e do
+    conteúdo bruto; se eles não mudam, nenhuma etapa derivada muda, e todas
+    podem ser puladas.
+    """
+    fingerprints = {"bronze": content_hash(bronze_name, raw_bytes)}
+    for stage in STAGE_ORDER:
+        if stage != "bronze":
+            fingerprints[stage] = content_hash(stage, *(fingerprints[dep] for dep in PIPELINE_DAG[stage]))
+    return fingerprints
+
+def load_pipeline_state():
+    try:
+        with open(PIPELINE_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_pipeline_state(state):
+    tmp_path = f"{PIPELINE_STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, PIPELINE_STATE_FILE)
+
+def is_default_base_file(bronze_path):
+    """Arquivos YYYY-MM-DD.json são os da moeda base padrão (os únicos com relatório)."""
+    return len(os.path.basename(bronze_path)) == len("YYYY-MM-DD.json")
+
+
+class DayRun:
+    """Execução das etapas de UM arquivo BRONZE, com DataFrames calculados sob demanda."""
+
+    def __init__(self, bronze_path, raw_bytes):
+        self.bronze_path = bronze_path
+        self.name = os.path.basename(bronze_path)
+        self.raw_bytes = raw_bytes
+        self.fingerprints = stage_fingerprints(self.name, raw_bytes)
+        self.frames = {}
+
+    def get(self, stage):
+        """Resultado em memória de uma etapa (cada entrada é parseada uma única vez)."""
+        if stage not in self.frames:
+            if stage == "bronze":
+                self.frames[stage] = json.loads(self.raw_bytes)
+            elif stage in ("silver", "quarantine"):
+                # Regras por linha aqui; as de anomalia rodam uma vez sobre o lote (run_pipeline)
+                self.frames["silver"], self.frames["quarantine"] = normalize_bronze_data(
+                    self.get("bronze"), self.name, rules=ROW_RULES,
+                )
+            elif stage == "gold":
+                df_silver = self.get("silver")
+                self.frames[stage] = None if df_silver is None else build_gold(df_silver)
+        return self.frames[stage]
+
+
+@timed("pipeline")
+def run_pipeline(bronze_paths, report=True, use_llm=True, force=False):
+    """Executa silver -> gold -> report para os arquivos BRONZE informados.
+
+    Etapas cuja impressão digital não mudou desde a última execução são puladas.
+    A gravação de CSV e matrizes roda em uma thread de escrita enquanto o próximo
+    dia é processado; as linhas GOLD são gravadas no fim, uma vez por partição.
+    Retorna o dicionário {arquivo BRONZE: etapas executadas}.
+    """
+    setup_directories()
+    print("--- INICIANDO PIPELINE ---")
+
+    state = load_pipeline_state()
+    manifest = load_silver_manifest()
+    # mtimes capturados antes do processamento, da mesma fonte que get_pending_bronze_files
+    # usa: uma sobrescrita durante a execução é reprocessada na próxima
+    mtimes = bronze_mtimes()
+    for stage in STAGE_ORDER:
+        state.setdefault(stage, {})
+
+    # O relatório é gerado apenas para o dia mais recente da moeda base padrão
+    report_target = max((p for p in bronze_paths if is_default_base_file(p)), default=None) if report else None
+
+    executed = {}
+    pending_state = []  # (etapa, arquivo, impressão digital, future ou None)
+    silver_frames = []
+    quarantine_frames = []
+    gold_frames = []
+    gold_by_date = {}
+
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        for bronze_path in sorted(bronze_paths):
+            with open(bronze_path, 'rb') as f:
+                day = DayRun(bronze_path, f.read())
+            record_bytes("pipeline", "read", len(day.raw_bytes))
+
+            stages = [
+                stage for stage in STAGE_ORDER
+                if stage != "bronze"
+                and (stage != "report" or bronze_path == report_target)
+                and (force or state[stage].get(day.name) != day.fingerprints[stage])
+            ]
+            if not stages:
+                print(f"   [PULADO] {day.name}: entradas inalteradas desde a última execução.")
+                continue
+
+            df_silver = day.get("silver")
+            df_quarantine = day.get("quarantine")
+            if df_quarantine is not None and not df_quarantine.empty:
+                quarantine_frames.append(df_quarantine)
+            if df_silver is None:
+                print(f"   [ERRO] {day.name}: dados BRONZE inválidos, dia ignorado.")
+                continue
+
+            if "silver" in stages:
+                future = writer.submit(save_silver, df_silver, bronze_path)
+                pending_state.append(("silver", day.name, day.fingerprints["silver"], future))
+                silver_frames.append(df_silver)
+
+            df_gold = day.get("gold")
+            record_rows("pipeline", "read", len(df_silver))
+            collected_date = pd.Timestamp(df_silver['collected_date'].iloc[0]).date()
+            if is_default_base_file(bronze_path):
+                gold_by_date[collected_date] = df_gold
+
+            if "gold" in stages:
+                future = writer.submit(save_cross_rate_matrices, df_silver)
+                gold_frames.append(df_gold)
+                pending_state.append(("gold", day.name, day.fingerprints["gold"], future))
+
+            if "report" in stages:
+                # Import tardio: o matplotlib só é carregado quando há relatório a gerar
+                from analysis_report import generate_comparison_report
+                # Referência: o último dia anterior já calculado neste lote (na segunda-feira,
+                # a sexta); sem ele, o relatório busca a observação anterior no GOLD
+                previous = max((d for d in gold_by_date if d < collected_date), default=None)
+                if previous is not None and collected_date - previous > timedelta(days=REPORT_MAX_GAP_DAYS + 1):
+                    previous = None
+                try:
+                    report_path = generate_comparison_report(
+                        report_date=collected_date,
+                        df_today=df_gold,
+                        df_yesterday=gold_by_date.get(previous),
+                        use_llm=use_llm,
+                    )
+                except Exception as e:
+                    print(f"   [ERRO] {day.name}: falha ao gerar o relatório: {e}")
+                    report_path = None
+                # Sem relatório (sem referência no GOLD ou falha), a etapa fica pendente para a próxima execução
+                if report_path:
+                    pending_state.append(("report", day.name, day.fingerprints["report"], None))
+
+            executed[day.name] = stages
+
+        # Regras de anomalia: uma passada vetorizada sobre todos os dias normalizados
+        if silver_frames:
+            df_batch = pd.concat(silver_frames, ignore_index=True)
+            history = load_silver_history(df_batch['collected_date'].min())
+            df_flagged = validate_rates(df_batch, history, OUTLIER_RULES)[1]
+            if not df_flagged.empty:
+                quarantine_frames.append(df_flagged)
+        quarantine_future = None
+        if quarantine_frames:
+            quarantine_future = writer.submit(write_quarantine, pd.concat(quarantine_frames, ignore_index=True))
+
+        # Linhas GOLD de todos os dias: uma única regravação por partição mensal
+        gold_future = None
+        if gold_frames:
+            gold_future = writer.submit(write_gold_partition, pd.concat(gold_frames, ignore_index=True))
+
+    # Só registra no estado as etapas cuja persistência terminou sem erro
+    failed = set()
+    if gold_future is not None and gold_future.exception():
+        print(f"   [ERRO] Falha ao gravar o dataset GOLD: {gold_future.exception()}")
+        failed.add("gold")
+    if quarantine_future is not None and quarantine_future.exception():
+        # As linhas rejeitadas se perderiam: os dias normalizados ficam pendentes e a quarentena é refeita
+        print(f"   [ERRO] Falha ao gravar a quarentena: {quarantine_future.exception()}")
+        failed.add("silver")
+    for stage, name, fingerprint, future in pending_state:
+        if future is not None and future.exception():
+            print(f"   [ERRO] {name}: falha ao persistir a etapa {stage}: {future.exception()}")
+            continue
+        if stage in failed:
+            continue
+        state[stage][name] = fingerprint
+        if stage == "silver":
+            bronze_path = next(p for p in bronze_paths if os.path.basename(p) == name)
+            manifest["processed"][name] = {
+                "silver": os.path.basename(future.result()),
+                "mtime": mtimes.get(name, os.path.getmtime(bronze_path)),
+            }
+
+    if manifest["processed"]:
+        manifest["watermark"] = max(name[:10] for name in manifest["processed"])
+    save_silver_manifest(manifest)
+    save_pipeline_state(state)
+
+    print(f"   Dias processados: {len(executed)} de {len(bronze_paths)}")
+    print("--- PIPELINE CONCLUÍDA ---")
+    return executed
+
+def pending_backfill_files():
+    """Arquivos BRONZE pendentes na SILVER ou com a etapa GOLD desatualizada."""
+    manifest = load_silver_manifest()
+    pending = set(get_pending_bronze_files(manifest))
+
+    # Dias normalizados fora do run_pipeline (ex: process_silver.py --backfill)
+    # ou cujo GOLD não foi gravado também entram na lista; dias sem SILVER
+    # (todas as taxas em quarentena) só voltam se o arquivo BRONZE mudar
+    state = load_pipeline_state()
+    silver_done = state.get("silver", {})
+    gold_done = state.get("gold", {})
+    normalized = {name for name, entry in manifest["processed"].items() if entry.get("silver")}
+    for name in normalized | set(silver_done):
+        silver_fingerprint = silver_done.get(name)
+        if silver_fingerprint is None or gold_done.get(name) != content_hash("gold", silver_fingerprint):
+            path = os.path.join(BRONZE_DIR, name)
+            if os.path.exists(path):
+                pending.add(path)
+    return sorted(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa a pipeline bronze -> silver -> gold -> report.")
+    parser.add_argument("--collect", action="store_true", help="Coleta o BRONZE de hoje antes de processar.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Processa todos os dias BRONZE pendentes (relatório apenas do mais recente).")
+    parser.add_argument("--no-report", action="store_true", help="Não gera o relatório comparativo.")
+    parser.add_argument("--no-llm", action="store_true", help="Gera o relatório sem a análise do LLM.")
+    parser.add_argument("--force", action="store_true", help="Executa todas as etapas mesmo sem mudanças.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Concilia antes o catálogo BRONZE com o diretório (arquivos copiados à mão).")
+    parser.add_argument("--profile", action="store_true", help="Gera relatórios cProfile/tracemalloc da execução.")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+
+    if args.collect:
+        collect_and_save_bronze()
+
+    if args.sync:
+        print(f"   Catálogo BRONZE conciliado: {bronze_catalog().sync()} entradas atualizadas.")
+
+    if args.backfill:
+        paths = pending_backfill_files()
+    else:
+        latest = get_latest_bronze_file()
+        paths = [latest] if latest else []
+
+    if not paths:
+        print("[AVISO] Nenhum arquivo BRONZE a processar.")
+    else:
+        run_pipeline(paths, report=not args.no_report, use_llm=not args.no_llm, force=args.force)
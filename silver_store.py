@@ -0,0 +1,220 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+from config import SILVER_DIR
+from catalog import silver_catalog
+
+# Arquivos da camada SILVER em formato colunar tipado (Arrow IPC, sem compressão).
+# O CSV repetia o código da moeda base e a data em texto em todas as linhas e
+# perdia os tipos: cada leitura re-parseava tudo com pd.read_csv. Aqui o esquema
+# é fixo (moedas com dicionário, data date32, taxa float64) e a leitura é feita
+# por memory map, sem cópia das colunas. Um arquivo pode guardar vários dias
+# (pacote mensal YYYY-MM_silver.arrow); o catálogo registra o intervalo de
+# datas de cada arquivo. O CSV continua
+# disponível: SILVER_FORMAT=csv grava CSVs e --export-csv converte os arquivos.
+
+SILVER_SUFFIXES = {"arrow": "_silver.arrow", "csv": "_silver.csv"}
+SILVER_COLUMNS = ['currency', 'rate', 'base_currency', 'collected_date']
+# Índices de dicionário estreitos: ~170 moedas cabem em int16 e as moedas base em
+# int8, e cada linha ocupa 15 bytes (o CSV gasta ~27)
+SILVER_SCHEMA = pa.schema([
+    ('currency', pa.dictionary(pa.int16(), pa.string())),
+    ('rate', pa.float64()),
+    ('base_currency', pa.dictionary(pa.int8(), pa.string())),
+    ('collected_date', pa.date32()),
+])
+
+
+def silver_format(path):
+    """'arrow' ou 'csv', pelo sufixo do arquivo."""
+    return "csv" if path.endswith(SILVER_SUFFIXES["csv"]) else "arrow"
+
+def to_silver_table(data):
+    """DataFrame SILVER (ou tabela Arrow, ex: RateSnapshot.to_arrow()) -> tabela com SILVER_SCHEMA."""
+    if isinstance(data, pa.Table):
+        return data.select(SILVER_COLUMNS).cast(SILVER_SCHEMA)
+    dates = pd.to_datetime(data['collected_date']).to_numpy(dtype='datetime64[D]')
+    return pa.table({
+        'currency': pa.array(data['currency'].to_numpy(dtype=object), pa.string()).dictionary_encode(),
+        'rate': pa.array(data['rate'].to_numpy(dtype='float64')),
+        'base_currency': pa.array(data['base_currency'].to_numpy(dtype=object), pa.string()).dictionary_encode(),
+        'collected_date': pa.array(dates, pa.date32()),
+    }).cast(SILVER_SCHEMA)
+
+def write_silver_file(data, path):
+    """Grava um arquivo SILVER (.arrow ou .csv, pelo sufixo) de forma atômica e retorna a tabela gravada.
+
+    No Arrow o arquivo tem um único record batch (e um dicionário por coluna), mesmo num pacote.
+    """
+    table = to_silver_table(data).unify_dictionaries().combine_chunks()
+    tmp_path = f"{path}.tmp"
+    if silver_format(path) == "csv":
+        silver_frame(table).to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+    else:
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, SILVER_SCHEMA) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(tmp_path, path)
+    return table
+
+def read_silver_table(path, start_date=None, end_date=None):
+    """Tabela SILVER de um arquivo; o .arrow é lido por memory map (as colunas apontam para o arquivo).
+
+    Com start_date/end_date, só as linhas do intervalo (pacotes com vários dias).
+    """
+    if silver_format(path) == "csv":
+        table = to_silver_table(pd.read_csv(path))
+    else:
+        with pa.memory_map(path, 'r') as source:
+            table = ipc.open_file(source).read_all()
+    conditions = []
+    if start_date is not None:
+        conditions.append(pc.field('collected_date') >= pa.scalar(pd.Timestamp(start_date).date(), pa.date32()))
+    if end_date is not None:
+        conditions.append(pc.field('collected_date') <= pa.scalar(pd.Timestamp(end_date).date(), pa.date32()))
+    for condition in conditions:
+        table = table.filter(condition)
+    return table
+
+def _decode(column):
+    """Coluna com dicionário (já unificado) -> array numpy de str; os objetos str do dicionário são compartilhados."""
+    if not column.num_chunks:
+        return np.array([], dtype=object)
+    indices = np.concatenate([chunk.indices.to_numpy(zero_copy_only=False) for chunk in column.chunks])
+    return np.array(column.chunk(0).dictionary.to_pylist(), dtype=object)[indices]
+
+def silver_frame(table):
+    """Tabela SILVER -> DataFrame no formato longo (códigos como str, collected_date datetime64)."""
+    table = table.unify_dictionaries()
+    return pd.DataFrame({
+        'currency': _decode(table['currency']),
+        'rate': table['rate'].to_numpy(),
+        'base_currency': _decode(table['base_currency']),
+        'collected_date': pd.DatetimeIndex(table['collected_date'].to_numpy()),
+    }, copy=False)
+
+def read_silver(path, start_date=None, end_date=None):
+    """DataFrame SILVER de um arquivo (.arrow ou .csv)."""
+    return silver_frame(read_silver_table(path, start_date, end_date))
+
+def read_silver_range(start_date, end_date, base_currency=None, silver_dir=SILVER_DIR):
+    """DataFrame SILVER (em ordem de data) de todos os arquivos que cobrem o intervalo, ou None.
+
+    As tabelas são concatenadas no Arrow e convertidas para pandas uma única vez.
+    Quando o mesmo (dia, moeda base) aparece em mais de um arquivo (um pacote e um
+    dia regravado depois dele), vale o arquivo gravado por último.
+    """
+    # Pacotes com várias moedas base ficam no catálogo sem base_currency
+    entries = sorted((entry for entry in silver_catalog(silver_dir).entries(start_date, end_date)
+                      if not base_currency or entry["base_currency"] in (base_currency, None)),
+                     key=lambda entry: entry["mtime"])
+    tables = []
+    for entry in entries:
+        try:
+            tables.append(read_silver_table(entry["path"], start_date, end_date))
+        except FileNotFoundError:
+            silver_catalog(silver_dir).remove(entry["path"])
+    if not tables:
+        return None
+    df = silver_frame(pa.concat_tables(tables))
+    if base_currency:
+        df = df[df['base_currency'] == base_currency]
+    if any(entry["date"] != entry["date_end"] for entry in entries):
+        df = df.drop_duplicates(['collected_date', 'base_currency', 'currency'], keep='last')
+    return df.sort_values(['collected_date', 'base_currency'], kind='stable', ignore_index=True)
+
+def silver_metadata(table):
+    """Metadados do catálogo: intervalo de datas, moeda base (se única), linhas e esquema."""
+    dates = pc.min_max(table['collected_date']).as_py()
+    bases = pc.unique(table['base_currency'].cast(pa.string())).to_pylist()
+    return {
+        "date_value": dates["min"],
+        "date_end": dates["max"],
+        "base_currency": bases[0] if len(bases) == 1 else None,
+        "rows": len(table),
+        "schema": {field.name: str(field.type) for field in table.schema},
+    }
+
+def save_silver_file(data, path, silver_dir=SILVER_DIR):
+    """Grava um arquivo SILVER, registra no catálogo e remove o arquivo do mesmo nome no outro formato."""
+    table = write_silver_file(data, path)
+    silver_catalog(silver_dir).register(path, **silver_metadata(table))
+    fmt = silver_format(path)
+    other = "csv" if fmt == "arrow" else "arrow"
+    stale = path[:-len(SILVER_SUFFIXES[fmt])] + SILVER_SUFFIXES[other]
+    if os.path.exists(stale):
+        os.remove(stale)
+        silver_catalog(silver_dir).remove(stale)
+    return path
+
+def pack_month(month, silver_dir=SILVER_DIR):
+    """Junta os arquivos diários de um mês (YYYY-MM) num pacote YYYY-MM_silver.arrow e apaga os diários.
+
+    Um pacote já existente entra primeiro e os diários por cima (o último gravado vence).
+    Retorna o caminho do pacote ou None se não havia arquivos diários.
+    """
+    start = pd.Timestamp(f"{month}-01")
+    end = start + pd.offsets.MonthEnd(0)
+    daily = [entry["path"] for entry in silver_catalog(silver_dir).entries(start, end)
+             if entry["date"] == entry["date_end"]]
+    if not daily:
+        return None
+    pack_path = os.path.join(silver_dir, f"{month}{SILVER_SUFFIXES['arrow']}")
+    df = read_silver_range(start, end, silver_dir=silver_dir)
+    df = df.sort_values(['collected_date', 'base_currency'], kind='stable', ignore_index=True)
+    save_silver_file(df, pack_path, silver_dir)
+    for path in daily:
+        if path != pack_path:
+            os.remove(path)
+            silver_catalog(silver_dir).remove(path)
+    return pack_path
+
+def pack_silver(silver_dir=SILVER_DIR):
+    """Empacota os meses completos (anteriores ao mês do último dia da SILVER); retorna os pacotes gravados."""
+    latest = silver_catalog(silver_dir).latest_date()
+    if latest is None:
+        return []
+    months = sorted({entry["date"][:7] for entry in silver_catalog(silver_dir).entries(end_date=latest)
+                     if entry["date"] == entry["date_end"] and entry["date"][:7] < latest[:7]})
+    return [path for path in (pack_month(month, silver_dir) for month in months) if path]
+
+def export_csv(start_date=None, end_date=None, output_dir=None, silver_dir=SILVER_DIR):
+    """Exporta para CSV (mesmo nome, sufixo _silver.csv) os arquivos que cobrem o intervalo; retorna os caminhos.
+
+    Na própria SILVER o CSV substitui o .arrow; os pacotes são exportados inteiros.
+    """
+    output_dir = output_dir or silver_dir
+    os.makedirs(output_dir, exist_ok=True)
+    exported = []
+    for entry in silver_catalog(silver_dir).entries(start_date, end_date):
+        name = os.path.basename(entry["path"])
+        if silver_format(name) == "csv":
+            continue
+        path = os.path.join(output_dir, name[:-len(SILVER_SUFFIXES["arrow"])] + SILVER_SUFFIXES["csv"])
+        table = read_silver_table(entry["path"])
+        if os.path.abspath(output_dir) == os.path.abspath(silver_dir):
+            save_silver_file(table, path, silver_dir)
+        else:
+            write_silver_file(table, path)
+        exported.append(path)
+    return exported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivos da camada SILVER (Arrow IPC / CSV).")
+    parser.add_argument("--pack", action="store_true", help="Junta os dias dos meses completos em pacotes mensais.")
+    parser.add_argument("--export-csv", action="store_true", help="Exporta os arquivos .arrow para CSV.")
+    parser.add_argument("--start", help="Primeiro dia exportado (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Último dia exportado (YYYY-MM-DD).")
+    parser.add_argument("--output", help="Diretório dos CSVs exportados (padrão: a própria SILVER, substituindo os .arrow).")
+    args = parser.parse_args()
+
+    if args.pack:
+        for path in pack_silver():
+            print(f"[SUCESSO] Pacote SILVER gravado: {path}")
+    if args.export_csv:
+        paths = export_csv(args.start, args.end, args.output)
+        print(f"[SUCESSO] {len(paths)} arquivo(s) SILVER exportado(s) para CSV.")
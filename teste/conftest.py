@@ -0,0 +1,9 @@
+import pytest
+
+import metrics
+
+@pytest.fixture(autouse=True)
+def no_metrics_files(monkeypatch):
+    """As métricas das etapas não devem ir para o data_layers/ do repositório."""
+    monkeypatch.setattr(metrics, "write_prometheus_textfile", lambda *a, **k: None)
+    monkeypatch.setattr(metrics, "_log_event", lambda *a, **k: None)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import RollingState, compute_rolling_stats, refresh_rolling_state, load_rate_history
+from cross_rates import save_cross_rate_matrices
+
+def make_history(days=40, seed=7):
+    """Histórico sintético (dias × moedas) com passeio aleatório nas taxas."""
+    rng = np.random.default_rng(seed)
+    codes = ["USD", "EUR", "JPY"]
+    steps = rng.normal(0, 0.01, size=(days, len(codes)))
+    rates = np.array([0.19, 0.16, 27.0]) * np.exp(np.cumsum(steps, axis=0))
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    return pd.DataFrame(rates, index=dates, columns=codes)
+
+# --- TESTES UNITÁRIOS ---
+
+@pytest.mark.parametrize("window", [3, 7, 30])
+def test_incremental_state_matches_full_recomputation(window):
+    """Atualizar o estado dia a dia deve dar o mesmo resultado do cálculo vetorizado completo."""
+    df_rates = make_history()
+    state = RollingState(window)
+    for date, row in df_rates.iterrows():
+        state.update(date.strftime("%Y-%m-%d"), row.values)
+
+    incremental = state.snapshot(list(df_rates.columns))
+    full = compute_rolling_stats(df_rates, window).iloc[-1].unstack(level=0)
+
+    for column in incremental.columns:
+        assert np.allclose(incremental[column], full.loc[incremental.index, column]), column
+
+def test_new_currency_is_added_without_rebuilding_state():
+    """Moedas novas no índice entram como colunas vazias no estado existente."""
+    state = RollingState(5)
+    state.update("2025-01-01", np.array([1.0, 2.0]))
+    state.update("2025-01-02", np.array([1.1, 2.2, 3.0]))
+
+    snapshot = state.snapshot(["USD", "EUR", "GBP"])
+    assert snapshot.loc["GBP", "rate"] == 3.0
+    assert np.isnan(snapshot.loc["GBP", "volatility_5"])
+    assert snapshot.loc["USD", "ma_5"] == pytest.approx(1.05)
+
+def test_backfilled_or_rewritten_days_rebuild_the_persisted_state(tmp_path):
+    """Dias anteriores ao último aplicado (backfill ou regravação) não podem ficar de fora do estado."""
+    rates_dir, state_dir = str(tmp_path / "rates"), str(tmp_path / "state")
+
+    def write_day(day, usd):
+        save_cross_rate_matrices(pd.DataFrame({
+            "currency": ["BRL", "USD"], "rate": [1.0, usd], "base_currency": "BRL", "collected_date": day,
+        }), directory=rates_dir)
+
+    def expected(window):
+        df_rates = load_rate_history("BRL", rates_dir)
+        return compute_rolling_stats(df_rates, window).iloc[-1].unstack(level=0).loc["USD"]
+
+    write_day("2025-01-01", 0.20)
+    write_day("2025-01-03", 0.22)
+    state, codes = refresh_rolling_state(3, "BRL", rates_dir, state_dir)
+    assert state.count == 2
+
+    write_day("2025-01-02", 0.30)  # backfill de um dia antigo
+    state, codes = refresh_rolling_state(3, "BRL", rates_dir, state_dir)
+    assert state.count == 3 and state.snapshot(codes).loc["USD", "ma_3"] == pytest.approx(expected(3)["ma_3"])
+
+    write_day("2025-01-02", 0.10)  # dia antigo regravado
+    state, codes = refresh_rolling_state(3, "BRL", rates_dir, state_dir)
+    snapshot = state.snapshot(codes).loc["USD"]
+    assert snapshot["ma_3"] == pytest.approx(expected(3)["ma_3"])
+    assert snapshot["volatility_3"] == pytest.approx(expected(3)["volatility_3"])
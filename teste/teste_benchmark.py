@@ -0,0 +1,59 @@
+import os
+import json
+import pytest
+
+from benchmark import compare_results, generate_synthetic_bronze, measure
+from rate_snapshot import RateSnapshot
+
+def run(seconds, trace_memory=False):
+    """Resultado de uma execução do benchmark com os tempos {etapa: segundos}."""
+    return {
+        "meta": {"params": {"trace_memory": trace_memory}},
+        "stages": {name: {"seconds": value} for name, value in seconds.items()},
+    }
+
+# --- TESTES UNITÁRIOS ---
+
+def test_synthetic_bronze_follows_the_collector_layout(tmp_path):
+    assert generate_synthetic_bronze(str(tmp_path), days=3, currencies=5, bases=2) == 6
+    names = sorted(os.listdir(tmp_path))
+    assert names[:2] == ["2020-01-01.json", "2020-01-01_AED.json"]  # códigos do arquivo de exemplo
+    assert len(names) == 6
+
+    with open(tmp_path / "2020-01-02.json", 'rb') as f:
+        raw_bytes = f.read()
+    with open(tmp_path / "2020-01-02_AED.json", 'r', encoding='utf-8') as f:
+        aed = json.load(f)["conversion_rates"]
+    snapshot = RateSnapshot.from_payload(raw_bytes, "2020-01-02")
+    assert snapshot.base_currency == "BRL" and len(snapshot) == 5
+    # As moedas base vêm do mesmo passeio aleatório: as taxas cruzadas são consistentes
+    brl = json.loads(raw_bytes)["conversion_rates"]
+    assert brl["BRL"] == aed["AED"] == 1.0
+    code = next(code for code in brl if code not in ("BRL", "AED"))
+    assert aed[code] == pytest.approx(brl[code] / brl["AED"], rel=1e-2)
+
+def test_synthetic_bronze_is_reproducible(tmp_path):
+    for name in ("a", "b"):
+        generate_synthetic_bronze(str(tmp_path / name), days=2, currencies=4, bases=1, seed=7)
+    assert (tmp_path / "a" / "2020-01-02.json").read_bytes() == (tmp_path / "b" / "2020-01-02.json").read_bytes()
+
+def test_compare_results_flags_only_relevant_slowdowns():
+    baseline = run({"silver_backfill": 1.0, "query_week": 0.01, "report": 2.0, "removida": 1.0})
+    current = run({"silver_backfill": 1.5, "query_week": 0.05, "report": 2.1, "nova": 9.0})
+    # query_week ficou 5x mais lenta, mas só 0.04s: ruído abaixo de min_seconds
+    assert compare_results(current, baseline, threshold=0.2) == [("silver_backfill", 1.0, 1.5, 1.5)]
+    assert compare_results(current, baseline, threshold=0.6) == []
+
+def test_compare_results_skips_runs_with_and_without_tracemalloc():
+    baseline = run({"silver_backfill": 1.0})
+    current = run({"silver_backfill": 5.0}, trace_memory=True)
+    assert compare_results(current, baseline, threshold=0.2) == []
+
+def test_measure_records_the_rss_change_of_each_stage():
+    results = {}
+    assert measure("alloc", lambda: len(bytearray(64 * 2**20)), results) == 64 * 2**20
+    measure("noop", lambda: None, results)
+    # O pico acumulado da etapa anterior não aparece na etapa seguinte
+    assert results["noop"]["peak_rss_growth_mb"] == 0
+    assert abs(results["noop"]["rss_delta_mb"]) < 16
+    assert set(results["alloc"]) == {"seconds", "rss_delta_mb", "peak_rss_growth_mb", "children_peak_rss_growth_mb"}
@@ -0,0 +1,59 @@
+import os
+import json
+
+import bronze_archive as archive
+from catalog import LayerCatalog, index_bronze_file
+
+def payload(base, usd):
+    # Formatação "crua" proposital: o arquivo deve devolver exatamente estes bytes
+    return ('{"result":"success", "base_code":"%s",\n "conversion_rates":{"%s":1,"USD":%s}}' % (base, base, usd)).encode()
+
+# --- TESTES UNITÁRIOS ---
+
+def test_append_and_stream_keep_payload_bytes(tmp_path):
+    directory = str(tmp_path)
+    archive.append_snapshot(payload("BRL", 0.18), "2025-08-31", "BRL", collected_at=1.0, directory=directory)
+    archive.append_snapshot(payload("BRL", 0.19), "2025-09-01", "BRL", collected_at=2.0, directory=directory)
+    archive.append_snapshot(payload("BRL", 0.20), "2025-09-01", "BRL", collected_at=3.0, directory=directory)  # intradiário
+    archive.append_snapshot(payload("USD", 1), "2025-09-01", "USD", collected_at=4.0, directory=directory)
+
+    assert [os.path.basename(p) for p in archive.list_segments(directory)] == ["2025-08.jsonl.gz", "2025-09.jsonl.gz"]
+    snapshots = list(archive.iter_snapshots("2025-09-01", "2025-09-30", directory=directory))
+    assert [(name, raw) for name, _, raw in snapshots] == [
+        ("2025-09-01.json", payload("BRL", 0.20)),
+        ("2025-09-01_USD.json", payload("USD", 1)),
+    ]
+    assert len(archive.records(latest_only=False, directory=directory)) == 4
+    assert archive.latest_snapshot("BRL", directory=directory)[2] == payload("BRL", 0.20)
+
+def test_rebuild_index_recovers_from_torn_write(tmp_path):
+    directory = str(tmp_path)
+    for day in ("2025-09-01", "2025-09-02"):
+        archive.append_snapshot(payload("BRL", 0.19), day, "BRL", directory=directory)
+    segment = archive.segment_path("2025-09-01", directory)
+    size = os.path.getsize(segment)
+    with open(segment, 'ab') as f:
+        f.write(b"\x1f\x8b\x08 membro incompleto")  # queda no meio de uma gravação
+    os.remove(archive.index_path(segment))
+
+    assert archive.rebuild_index(segment) == 2
+    assert os.path.getsize(segment) == size
+    assert [r.collected_date for _, r in archive.records(directory=directory)] == ["2025-09-01", "2025-09-02"]
+
+def test_migration_copies_json_files_and_is_idempotent(tmp_path):
+    bronze_dir = tmp_path / "bronze"
+    bronze_dir.mkdir()
+    originals = {}
+    for name, base in [("2025-09-29.json", "BRL"), ("2025-09-30_USD.json", "USD")]:
+        originals[name] = json.dumps({"result": "success", "base_code": base,
+                                      "conversion_rates": {base: 1}}, indent=4).encode()
+        (bronze_dir / name).write_bytes(originals[name])
+    catalog = LayerCatalog(str(bronze_dir), ".json", index_bronze_file)
+    directory = str(tmp_path / "segments")
+
+    assert archive.migrate_json_files(directory=directory, catalog=catalog) == (2, 0)
+    assert archive.migrate_json_files(remove=True, directory=directory, catalog=catalog) == (0, 2)
+
+    assert not any(name.endswith(".json") for name in os.listdir(bronze_dir))
+    assert catalog.entries() == []
+    assert {name: raw for name, _, raw in archive.iter_snapshots(directory=directory)} == originals
@@ -0,0 +1,90 @@
+import os
+import json
+
+import pandas as pd
+
+import aggregate_gold
+import process_silver
+from catalog import LayerCatalog, index_bronze_file, silver_catalog
+from silver_store import save_silver_file
+
+def write_bronze(directory, name, base="BRL"):
+    """Grava um arquivo BRONZE mínimo e retorna o caminho."""
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"result": "success", "base_code": base, "conversion_rates": {base: 1, "USD": 0.2}}, f)
+    return path
+
+# --- TESTES UNITÁRIOS ---
+
+def test_latest_and_range_lookups(tmp_path):
+    """'Mais recente', 'por data' e 'por intervalo' respondem pelo índice, com filtro de base."""
+    catalog = LayerCatalog(str(tmp_path), ".json", index_bronze_file)
+    for name, day, base in [("2025-09-28.json", "2025-09-28", "BRL"),
+                            ("2025-09-29.json", "2025-09-29", "BRL"),
+                            ("2025-09-29_USD.json", "2025-09-29", "USD")]:
+        catalog.register(write_bronze(str(tmp_path), name, base), day, base_currency=base, rows=2)
+
+    assert os.path.basename(catalog.latest("BRL")) == "2025-09-29.json"
+    assert os.path.basename(catalog.latest("USD")) == "2025-09-29_USD.json"
+    assert catalog.latest_date() == "2025-09-29"
+    assert [os.path.basename(p) for p in catalog.find("2025-09-29")] == ["2025-09-29.json", "2025-09-29_USD.json"]
+    assert len(catalog.find("2025-09-01", "2025-09-30", base_currency="BRL")) == 2
+    assert catalog.find("2025-10-01") == []
+
+def test_deleted_files_are_skipped_by_latest(tmp_path):
+    catalog = LayerCatalog(str(tmp_path), ".json", index_bronze_file)
+    older = write_bronze(str(tmp_path), "2025-09-28.json")
+    newer = write_bronze(str(tmp_path), "2025-09-29.json")
+    catalog.register(older, "2025-09-28", base_currency="BRL")
+    catalog.register(newer, "2025-09-29", base_currency="BRL")
+
+    os.remove(newer)
+    assert catalog.latest() == older
+    assert len(catalog.entries()) == 1
+
+def test_new_catalog_is_bootstrapped_from_existing_files(tmp_path):
+    """Arquivos gravados antes do catálogo existir entram na primeira consulta."""
+    write_bronze(str(tmp_path), "2025-09-29.json")
+    write_bronze(str(tmp_path), "2025-09-29_EUR.json", base="EUR")
+
+    entries = LayerCatalog(str(tmp_path), ".json", index_bronze_file).entries()
+
+    assert [(e["date"], e["base_currency"], e["rows"]) for e in entries] == [
+        ("2025-09-29", "BRL", 2), ("2025-09-29", "EUR", 2),
+    ]
+    assert all(len(e["checksum"]) == 64 for e in entries)
+
+def test_latest_bronze_file_uses_default_base(tmp_path, monkeypatch):
+    """Com várias moedas base no mesmo dia, a SILVER/relatório partem da coleta da moeda base padrão."""
+    catalog = LayerCatalog(str(tmp_path), ".json", index_bronze_file)
+    for name, base in [("2025-09-30.json", "BRL"), ("2025-09-30_USD.json", "USD")]:
+        catalog.register(write_bronze(str(tmp_path), name, base), "2025-09-30", base_currency=base, rows=2)
+    monkeypatch.setattr(process_silver, "bronze_catalog", lambda: catalog)
+
+    assert os.path.basename(process_silver.get_latest_bronze_file("BRL")) == "2025-09-30.json"
+    assert os.path.basename(process_silver.get_latest_bronze_file("USD")) == "2025-09-30_USD.json"
+
+def test_latest_silver_file_uses_default_base(tmp_path, monkeypatch):
+    """Num dia em que só outra moeda base foi coletada, o GOLD continua partindo da base padrão."""
+    silver_dir = str(tmp_path)
+    for day, base, suffix in [("2025-09-30", "BRL", ""), ("2025-10-01", "USD", "_USD")]:
+        df = pd.DataFrame({'currency': ["EUR"], 'rate': [0.16], 'base_currency': base, 'collected_date': pd.Timestamp(day)})
+        save_silver_file(df, os.path.join(silver_dir, f"{day}{suffix}_silver.arrow"), silver_dir)
+    monkeypatch.setattr(aggregate_gold, "silver_catalog", lambda: silver_catalog(silver_dir))
+
+    assert os.path.basename(aggregate_gold.get_latest_silver_file("BRL")) == "2025-09-30_silver.arrow"
+    assert os.path.basename(aggregate_gold.get_latest_silver_file("USD")) == "2025-10-01_USD_silver.arrow"
+
+def test_sync_registers_copied_files_and_drops_deleted_ones(tmp_path):
+    """Arquivos copiados à mão entram no catálogo sem rebuild; apagados saem."""
+    catalog = LayerCatalog(str(tmp_path), ".json", index_bronze_file)
+    catalog.register(write_bronze(str(tmp_path), "2025-09-29.json"), "2025-09-29", base_currency="BRL", rows=2)
+    deleted = write_bronze(str(tmp_path), "2025-09-30.json")
+    catalog.register(deleted, "2025-09-30", base_currency="BRL", rows=2)
+    os.remove(deleted)
+    write_bronze(str(tmp_path), "2025-09-01_USD.json", base="USD")  # cópia manual de um dia antigo
+
+    assert catalog.sync() == 2
+    assert [(entry["date"], entry["base_currency"]) for entry in catalog.entries()] == [("2025-09-01", "USD"), ("2025-09-29", "BRL")]
+    assert catalog.sync() == 0
@@ -0,0 +1,112 @@
+import json
+import pytest
+import requests
+
+import collect_bronze
+from collect_bronze import RateLimiter, _retry_delay, fetch_with_backoff, collect_many_bronze
+
+class FakeClock:
+    """Substitui time.monotonic/time.sleep do módulo: o sleep só avança o relógio."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(body or {}).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}")
+
+class FakeSession:
+    """Devolve as respostas (ou levanta as exceções) da lista, uma por GET."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(collect_bronze.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(collect_bronze.time, "sleep", clock.sleep)
+    return clock
+
+# --- TESTES UNITÁRIOS ---
+
+def test_rate_limiter_allows_the_burst_then_paces_requests(clock):
+    limiter = RateLimiter(rate_per_sec=2, burst=2)
+    for _ in range(4):
+        limiter.acquire()
+    # 2 tokens iniciais; os outros 2 esperam 0.5 s cada
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 101.0
+
+    RateLimiter(rate_per_sec=0).acquire()
+    assert clock.sleeps == [0.5, 0.5]
+
+def test_retry_delay_prefers_retry_after_and_falls_back_to_backoff(monkeypatch):
+    monkeypatch.setattr(collect_bronze, "API_BACKOFF_BASE", 1.0)
+    assert _retry_delay(3, FakeResponse(429, headers={"Retry-After": "7"})) == 7.0
+    # Retry-After em formato de data não é número: cai no backoff exponencial com jitter
+    delay = _retry_delay(2, FakeResponse(429, headers={"Retry-After": "Wed, 21 Oct 2025 07:28:00 GMT"}))
+    assert 4.0 <= delay < 8.0
+    assert 1.0 <= _retry_delay(0) < 2.0
+
+def test_fetch_with_backoff_retries_throttling_and_connection_errors(clock):
+    session = FakeSession([
+        FakeResponse(429, headers={"Retry-After": "3"}),
+        requests.exceptions.ConnectionError("reset"),
+        FakeResponse(200, {"base_code": "USD"}),
+    ])
+    assert fetch_with_backoff(session, "http://api", max_retries=2) == {"base_code": "USD"}
+    assert session.calls == 3 and clock.sleeps[0] == 3.0
+
+    # Esgotadas as tentativas, o último 429/5xx vira HTTPError e a conexão perdida é propagada
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetch_with_backoff(FakeSession([FakeResponse(503), FakeResponse(503)]), "http://api", max_retries=1)
+    with pytest.raises(requests.exceptions.Timeout):
+        fetch_with_backoff(FakeSession([requests.exceptions.Timeout("lento")]), "http://api", max_retries=0)
+
+def test_save_failure_of_one_base_does_not_abort_the_others(monkeypatch):
+    monkeypatch.setattr(collect_bronze, "setup_directories", lambda: None)
+    monkeypatch.setattr(collect_bronze, "create_session", lambda pool_size: FakeSession([]))
+    monkeypatch.setattr(collect_bronze, "fetch_with_backoff", lambda session, url, limiter, raw: url.encode())
+
+    def save(raw_bytes, moeda_base):
+        if moeda_base == "EUR":
+            raise OSError("disco cheio")
+        if moeda_base == "JPY":
+            raise ValueError("resposta não é JSON")
+        return f"{moeda_base}.json"
+    monkeypatch.setattr(collect_bronze, "_save_bronze", save)
+
+    results = collect_many_bronze(["USD", "EUR", "JPY", "BRL"], max_workers=2, rate_per_sec=0)
+    assert results == {"USD": "USD.json", "EUR": None, "JPY": None, "BRL": "BRL.json"}
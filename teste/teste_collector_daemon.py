@@ -0,0 +1,150 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+
+import collector_daemon
+import silver_store
+from collector_daemon import Collector, load_collector_state, run_downstream
+
+class FakeApi:
+    """Respostas da API por moeda base; o horário de atualização muda com update()."""
+
+    def __init__(self, last_update, next_update):
+        self.last_update, self.next_update = last_update, next_update
+        self.calls = []
+        self.fail = set()
+
+    def fetch(self, base):
+        self.calls.append(base)
+        if base in self.fail:
+            raise requests.exceptions.ConnectionError("sem rede")
+        return json.dumps({
+            "result": "success", "base_code": base,
+            "time_last_update_unix": self.last_update,
+            "time_next_update_unix": self.next_update,
+            "conversion_rates": {base: 1.0},
+        }).encode()
+
+def silver_day(day, base):
+    return pd.DataFrame({'currency': ["EUR"], 'rate': [0.16], 'base_currency': base,
+                         'collected_date': pd.Timestamp(day)})
+
+def build_collector(tmp_path, api, clock):
+    saved, changes = [], []
+
+    def save(raw_bytes, base, collected_date, collected_at):
+        saved.append((base, collected_date, collected_at))
+        return f"{collected_date}_{base}.json"
+
+    collector = Collector(
+        ["BRL", "USD"], on_change=changes.append, fetch=api.fetch, save=save,
+        clock=lambda: clock[0], state_file=str(tmp_path / "state.json"),
+    )
+    return collector, saved, changes
+
+# --- TESTES UNITÁRIOS ---
+
+def test_schedule_follows_next_update_and_skips_unchanged(tmp_path):
+    day = 1759190400  # 2025-09-30 00:00 UTC
+    api = FakeApi(last_update=day + 60, next_update=day + 86460)
+    clock = [day + 3600]
+    collector, saved, changes = build_collector(tmp_path, api, clock)
+
+    assert collector.poll() == {"BRL": "2025-09-30_BRL.json", "USD": "2025-09-30_USD.json"}
+    assert saved == [("BRL", "2025-09-30", day + 60), ("USD", "2025-09-30", day + 60)]
+    assert collector.next_fetch("BRL") == day + 86460 + 60  # próxima atualização + folga
+
+    # Antes do horário anunciado nada é buscado
+    clock[0] = day + 86400
+    assert collector.poll() == {} and len(api.calls) == 2
+
+    # Horário anunciado passou, mas a API ainda não atualizou: sem gravação nem etapas seguintes
+    clock[0] = day + 86520
+    assert collector.poll() == {}
+    assert len(saved) == 2 and len(changes) == 1
+    assert collector.next_fetch("USD") > clock[0]
+
+    # O estado sobrevive a um reinício do processo
+    assert load_collector_state(str(tmp_path / "state.json"))["USD"]["last_update_unix"] == day + 60
+
+def test_only_changed_bases_go_downstream(tmp_path):
+    day = 1759190400
+    api = FakeApi(last_update=day + 60, next_update=day + 86460)
+    clock = [day + 3600]
+    collector, saved, changes = build_collector(tmp_path, api, clock)
+    api.fail.add("USD")
+    collector.poll()
+    assert changes == [{"BRL": "2025-09-30_BRL.json"}]
+    assert collector.stats["errors"] == 1
+
+    # O USD com erro volta antes da próxima atualização; o BRL, já coletado, não
+    api.fail.clear()
+    clock[0] += 600
+    collector.poll()
+    assert changes[-1] == {"USD": "2025-09-30_USD.json"}
+    assert api.calls.count("BRL") == 1
+
+def test_save_and_downstream_failures_do_not_stop_the_collector(tmp_path):
+    day = 1759190400
+    api = FakeApi(last_update=day + 60, next_update=day + 86460)
+    clock = [day + 3600]
+    saved = []
+
+    def save(raw_bytes, base, collected_date, collected_at):
+        if base == "USD":
+            raise OSError("disco cheio")
+        saved.append(base)
+        return f"{collected_date}_{base}.json"
+
+    def on_change(changed):
+        raise RuntimeError("pipeline falhou")
+
+    collector = Collector(["BRL", "USD"], on_change=on_change, fetch=api.fetch, save=save,
+                          clock=lambda: clock[0], state_file=str(tmp_path / "state.json"))
+    assert collector.poll() == {"BRL": "2025-09-30_BRL.json"}
+    assert collector.stats["errors"] == 1 and collector.stats["downstream_errors"] == 1
+
+    # O BRL gravado fica agendado para a próxima atualização; o USD volta em COLLECTOR_RETRY_SECONDS
+    state = load_collector_state(str(tmp_path / "state.json"))
+    assert state["BRL"]["last_update_unix"] == day + 60
+    assert "last_update_unix" not in state["USD"] and collector.next_fetch("USD") < collector.next_fetch("BRL")
+
+def test_segments_mode_reports_the_latest_default_base_day(monkeypatch):
+    import aggregate_gold
+    import analysis_report
+    import process_silver
+    silver = {
+        "2025-09-29_silver.arrow": silver_day("2025-09-29", "BRL"),
+        "2025-09-30_silver.arrow": silver_day("2025-09-30", "BRL"),
+        "2025-10-01_USD_silver.arrow": silver_day("2025-10-01", "USD"),
+    }
+    reports, gold = [], []
+    monkeypatch.setattr(collector_daemon, "BRONZE_FORMAT", "segments")
+    monkeypatch.setattr(process_silver, "backfill_silver", lambda: list(silver))
+    monkeypatch.setattr(silver_store, "read_silver", silver.get)
+    monkeypatch.setattr(aggregate_gold, "save_gold", lambda df_silver, df_gold: gold.append(df_gold))
+    monkeypatch.setattr(analysis_report, "generate_comparison_report", lambda **kwargs: reports.append(kwargs))
+
+    run_downstream({"BRL": "segmento@0"}, report=True, use_llm=True)
+    assert len(gold) == 3
+    assert reports == [{"report_date": pd.Timestamp("2025-09-30").date(), "use_llm": True}]
+
+    run_downstream({"BRL": "segmento@0"}, report=False)
+    assert len(reports) == 1
+
+def test_api_session_is_created_once_across_threads(tmp_path, monkeypatch):
+    sessions = []
+
+    def create_session(pool_size):
+        time.sleep(0.01)  # janela em que outra thread também encontraria _session vazio
+        sessions.append(pool_size)
+        return object()
+    monkeypatch.setattr(collector_daemon, "create_session", create_session)
+    monkeypatch.setattr(collector_daemon, "fetch_with_backoff", lambda session, url, limiter, raw: session)
+
+    collector = Collector(["BRL", "USD", "EUR", "JPY"], state_file=str(tmp_path / "state.json"), max_workers=4)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        used = set(map(id, executor.map(collector._fetch_from_api, collector.bases)))
+    assert sessions == [4] and len(used) == 1
@@ -0,0 +1,57 @@
+import pytest
+import pandas as pd
+import numpy as np
+
+from cross_rates import (
+    build_cross_rate_matrix, save_cross_rate_matrices, convert, convert_batch, currency_ids,
+)
+
+def make_silver(collected_date="2025-09-30"):
+    """Monta um DataFrame no formato da camada Silver (base BRL)."""
+    rates = {"BRL": 1.0, "USD": 0.20, "EUR": 0.16, "JPY": 28.0}
+    return pd.DataFrame({
+        "currency": list(rates),
+        "rate": list(rates.values()),
+        "base_currency": "BRL",
+        "collected_date": collected_date,
+    })
+
+# --- TESTES UNITÁRIOS ---
+
+def test_matrix_is_outer_division_of_base_rates():
+    """M[i, j] deve ser (BASE -> j) / (BASE -> i), com diagonal igual a 1."""
+    codes = ["BRL", "USD", "EUR"]
+    matrix = build_cross_rate_matrix(codes, [1.0, 0.20, 0.16], codes)
+
+    assert matrix.shape == (3, 3)
+    assert np.allclose(np.diag(matrix), 1.0)
+    assert matrix[1, 2] == pytest.approx(0.16 / 0.20)  # 1 USD em EUR
+    assert matrix[1, 0] == pytest.approx(5.0)          # 1 USD em BRL
+
+def test_convert_single_and_batch(tmp_path):
+    """As conversões individual e em lote devem usar a mesma matriz salva."""
+    save_cross_rate_matrices(make_silver(), directory=str(tmp_path))
+
+    assert convert("2025-09-30", "USD", "BRL", 10, directory=str(tmp_path)) == pytest.approx(50.0)
+
+    result = convert_batch(
+        "2025-09-30", ["USD", "EUR", "XXX"], ["EUR", "JPY", "BRL"], [1.0, 2.0, 3.0],
+        directory=str(tmp_path),
+    )
+    assert result[0] == pytest.approx(0.8)
+    assert result[1] == pytest.approx(2 * 28.0 / 0.16)
+    assert np.isnan(result[2]), "Moedas desconhecidas devem resultar em NaN."
+
+def test_currency_ids_are_stable_across_days(tmp_path):
+    """Uma moeda nova não pode alterar o id das moedas já indexadas."""
+    save_cross_rate_matrices(make_silver("2025-09-29"), directory=str(tmp_path))
+    index_file = str(tmp_path / "currency_index.json")
+    ids_before = currency_ids(["BRL", "USD", "EUR", "JPY"], index_file)
+
+    df_new = make_silver("2025-09-30")
+    df_new.loc[len(df_new)] = ["GBP", 0.14, "BRL", "2025-09-30"]
+    save_cross_rate_matrices(df_new, directory=str(tmp_path))
+
+    assert list(currency_ids(["BRL", "USD", "EUR", "JPY"], index_file)) == list(ids_before)
+    # A matriz antiga não conhece a moeda nova
+    assert np.isnan(convert_batch("2025-09-29", ["GBP"], ["BRL"], [1.0], directory=str(tmp_path))[0])
@@ -0,0 +1,105 @@
+import asyncio
+import pandas as pd
+
+from google.genai.errors import ClientError
+from gold_store import write_gold_partition
+import enrich_llm
+from enrich_llm import enrich_date_range, query_insights
+from llm import LLMCache
+
+class StubModels:
+    """Simula client.aio.models do SDK Gemini: mede a concorrência e devolve 429 na primeira chamada."""
+    def __init__(self, quota_errors=1):
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.quota_errors = quota_errors
+
+    async def generate_content(self, model, contents):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.quota_errors:
+                self.quota_errors -= 1
+                raise ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": [
+                    {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "0.01s"},
+                ]}})
+            usage = type("Usage", (), {"total_token_count": 100})()
+            return type("Response", (), {"text": f"insights {self.calls}", "usage_metadata": usage})()
+        finally:
+            self.active -= 1
+
+class StubClient:
+    def __init__(self, **kwargs):
+        self.aio = type("Aio", (), {})()
+        self.aio.models = StubModels(**kwargs)
+
+def write_gold(root):
+    dates = pd.date_range("2025-09-01", periods=5)
+    df = pd.DataFrame({
+        'collected_date': list(dates) * 2,
+        'base_currency': ["BRL"] * 5 + ["USD"] * 5,
+        'BRL_to_USD': 0.19,
+        'BRL_to_EUR': 0.16,
+    })
+    write_gold_partition(df, root=str(root))
+
+# --- TESTES UNITÁRIOS ---
+
+def test_batch_respects_concurrency_and_retries_quota_errors(tmp_path):
+    write_gold(tmp_path / "gold")
+    client = StubClient()
+
+    df = enrich_date_range(
+        "2025-09-01", "2025-09-05", client=client, max_concurrency=3,
+        root=str(tmp_path / "insights"), gold_root=str(tmp_path / "gold"),
+        cache=LLMCache(directory=str(tmp_path / "cache")),
+    )
+
+    assert len(df) == 10
+    assert client.aio.models.calls == 11  # 10 pedidos + 1 repetição após o 429
+    assert client.aio.models.peak <= 3
+    stored = query_insights("2025-09-01", "2025-09-05", root=str(tmp_path / "insights"))
+    assert sorted(stored['base_currency'].unique()) == ["BRL", "USD"]
+    assert stored['insights'].str.startswith("insights").all()
+
+def test_batch_skips_pairs_already_enriched(tmp_path):
+    write_gold(tmp_path / "gold")
+    kwargs = dict(root=str(tmp_path / "insights"), gold_root=str(tmp_path / "gold"),
+                  cache=LLMCache(directory=str(tmp_path / "cache")))
+
+    enrich_date_range("2025-09-01", "2025-09-02", bases=["BRL"], client=StubClient(quota_errors=0), **kwargs)
+    client = StubClient(quota_errors=0)
+    df = enrich_date_range("2025-09-01", "2025-09-03", bases=["BRL"], client=client, **kwargs)
+
+    assert client.aio.models.calls == 1
+    assert [str(d)[:10] for d in df['collected_date']] == ["2025-09-03"]
+    assert len(query_insights("2025-09-01", "2025-09-05", root=str(tmp_path / "insights"))) == 3
+
+def test_batch_writes_each_month_as_soon_as_it_completes(tmp_path, monkeypatch):
+    dates = pd.to_datetime(["2025-08-30", "2025-08-31", "2025-09-01", "2025-09-02"])
+    write_gold_partition(pd.DataFrame({
+        'collected_date': dates, 'base_currency': "BRL", 'BRL_to_USD': 0.19, 'BRL_to_EUR': 0.16,
+    }), root=str(tmp_path / "gold"))
+    client = StubClient(quota_errors=0)
+    writes = []
+    write_insights = enrich_llm.write_insights
+
+    def spy(df_insights, root):
+        writes.append((client.aio.models.calls, sorted(df_insights['collected_date'].astype(str).str[:10])))
+        return write_insights(df_insights, root=root)
+    monkeypatch.setattr(enrich_llm, "write_insights", spy)
+
+    df = enrich_date_range(
+        "2025-08-30", "2025-09-02", client=client, max_concurrency=1,
+        root=str(tmp_path / "insights"), gold_root=str(tmp_path / "gold"),
+        cache=LLMCache(directory=str(tmp_path / "cache")),
+    )
+
+    # Agosto é gravado antes do último pedido de setembro ser feito
+    assert [days for _, days in writes] == [["2025-08-30", "2025-08-31"], ["2025-09-01", "2025-09-02"]]
+    assert writes[0][0] < 4
+    assert [str(d)[:10] for d in df['collected_date']] == ["2025-08-30", "2025-08-31", "2025-09-01", "2025-09-02"]
+    assert len(query_insights("2025-08-01", "2025-09-30", root=str(tmp_path / "insights"))) == 4
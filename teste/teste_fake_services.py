@@ -0,0 +1,48 @@
+import json
+import asyncio
+import pytest
+import requests
+
+import llm
+from collect_bronze import fetch_with_backoff, check_payload
+from fake_services import FaultProfile, FakeExchangeRateAPI, FakeGemini
+from llm import LLMCache, generate_text_async
+
+# --- TESTES UNITÁRIOS ---
+
+def test_fake_api_replays_rebased_days_and_throttles():
+    # Todas as respostas da primeira rodada são 429 com Retry-After: 0
+    fault = FaultProfile(throttle_rate=1.0, retry_after=0, seed=1)
+    with FakeExchangeRateAPI(start_date="2025-09-29", fault=fault) as api, requests.Session() as session:
+        url = f"{api.url}/chave/latest/USD"
+        with pytest.raises(requests.exceptions.HTTPError):
+            fetch_with_backoff(session, url, max_retries=1)
+        assert api.stats["429"] == 2
+
+        fault.throttle_rate = 0.0
+        day0 = fetch_with_backoff(session, url)
+        api.day = 1
+        day1 = fetch_with_backoff(session, url)
+        assert day0["base_code"] == "USD" and day0["conversion_rates"]["USD"] == 1.0
+        assert day1["time_last_update_unix"] - day0["time_last_update_unix"] == 86400
+        assert day1["conversion_rates"]["BRL"] != day0["conversion_rates"]["BRL"]
+        assert check_payload(json.dumps(day1).encode(), "USD") == len(day1["conversion_rates"])
+
+        assert session.get(f"{api.url}/chave/latest/XXX").status_code == 404
+
+def test_gemini_client_is_pointed_at_fake_server(monkeypatch, tmp_path):
+    fault = FaultProfile(throttle_rate=1.0, retry_after=0.01)
+    with FakeGemini(["resposta pronta"], fault=fault) as server:
+        monkeypatch.setattr(llm, "GEMINI_API_KEY", "teste")
+        monkeypatch.setattr(llm, "GEMINI_BASE_URL", server.url)
+        client = llm.get_client()
+
+        with pytest.raises(Exception) as error:
+            client.models.generate_content(model="gemini-2.5-flash", contents="oi")
+        assert error.value.code == 429 and llm.retry_after_seconds(error.value) == 0.01
+
+        # Com a semente 3 a próxima resposta é 429 e a seguinte 200: o caminho assíncrono repete
+        fault.throttle_rate = 0.5
+        fault.random.seed(3)
+        text = asyncio.run(generate_text_async("prompt", client, cache=LLMCache(str(tmp_path))))
+        assert text == "resposta pronta" and server.stats == {"429": 2, "200": 1}
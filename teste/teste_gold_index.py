@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from gold_index import GoldIndex
+from analysis_report import build_chart_jobs
+
+def gold_history():
+    # Sexta 26/09, segunda 29/09 e terça 30/09 (fim de semana sem cotação) + 29/08 para o MoM
+    return pd.DataFrame({
+        'collected_date': pd.to_datetime(["2025-08-29", "2025-09-26", "2025-09-29", "2025-09-30"]).date,
+        'base_currency': "BRL",
+        'USD': [0.18, 0.20, 0.21, 0.22],
+        'EUR': [0.15, 0.16, 0.16, None],
+    })
+
+# --- TESTES UNITÁRIOS ---
+
+def test_as_of_resolves_weekends_and_gaps():
+    index = GoldIndex(gold_history())
+    observed, rates = index.as_of("BRL", ["2025-09-28", "2025-09-30", "2025-08-01"])
+    assert [str(d) for d in observed] == ["2025-09-26", "2025-09-30", "NaT"]
+    assert rates[0].tolist() == [0.20, 0.16] and np.isnan(rates[2]).all()
+
+    # Observações mais antigas que a tolerância não substituem a data pedida
+    assert np.isnat(index.as_of("BRL", ["2025-09-20"], tolerance_days=5)[0][0])
+
+    # Segunda-feira: DoD contra a sexta; MoM contra a última observação até 30/08
+    df = index.changes_frame(["2025-09-29", "2025-09-30"]).set_index('collected_date')
+    assert str(df.loc["2025-09-29", "DoD_reference"].date()) == "2025-09-26"
+    assert round(df.loc["2025-09-29", "USD_CHANGE_PCT"], 6) == 5.0
+    assert round(df.loc["2025-09-30", "USD_MOM_PCT"], 6) == round((0.22 / 0.18 - 1) * 100, 6)
+    assert np.isnan(df.loc["2025-09-30", "EUR_CHANGE_PCT"])
+
+def test_chart_jobs_compare_monday_with_friday():
+    jobs, missing = build_chart_jobs(gold_history(), pd.Timestamp("2025-09-26").date(), pd.Timestamp("2025-09-30").date())
+
+    assert sorted(jobs) == [("2025-09-29", "BRL"), ("2025-09-30", "BRL")]
+    assert [(str(day), base) for day, base in missing] == [("2025-09-26", "BRL")]  # 29/08 está longe demais
+    _, _, labels, values = jobs[("2025-09-30", "BRL")]
+    assert labels == ["USD_CHANGE_PCT"] and len(values) == 1
@@ -0,0 +1,77 @@
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+
+import gold_store
+
+from aggregate_gold import build_gold, report_view
+from gold_store import write_gold_partition, query_gold, compact_gold, partition_files
+
+def silver_day(day, rates):
+    return pd.DataFrame({
+        'collected_date': day,
+        'base_currency': "BRL",
+        'currency': list(rates),
+        'rate': list(rates.values()),
+    })
+
+# --- TESTES UNITÁRIOS ---
+
+def test_upsert_with_new_and_vanished_currencies(tmp_path):
+    root = str(tmp_path)
+    write_gold_partition(build_gold(silver_day("2025-09-01", {"USD": 0.19, "EUR": 0.16})), root=root)
+    # Moeda nova (JPY) e moeda que sumiu (EUR) num delta; o dia 01 é corrigido por upsert
+    write_gold_partition(build_gold(silver_day("2025-09-02", {"USD": 0.20, "JPY": 27.0})), root=root)
+    write_gold_partition(build_gold(silver_day("2025-09-01", {"USD": 0.18, "EUR": 0.16})), root=root)
+
+    partition_dir = os.path.join(root, "year=2025", "month=09")
+    assert len(partition_files(partition_dir)) == 3  # part-0 + 2 deltas, nada reescrito
+
+    df = query_gold("2025-09-01", "2025-09-02", root=root)
+    assert list(df['USD']) == [0.18, 0.20]
+    assert pd.isna(df['EUR'].iloc[1]) and pd.isna(df['JPY'].iloc[0])
+    assert list(query_gold("2025-09-02", columns=['JPY'], root=root).columns) == ['collected_date', 'base_currency', 'JPY']
+
+    compact_gold(root)
+    assert [os.path.basename(p) for p in partition_files(partition_dir)] == ["part-0.parquet"]
+    pd.testing.assert_frame_equal(query_gold("2025-09-01", "2025-09-02", root=root), df)
+
+def test_report_view_selects_report_currencies_and_legacy_columns():
+    df_gold = pd.DataFrame({
+        'collected_date': ["2025-09-01", "2025-09-02"],
+        'base_currency': "BRL",
+        'BRL_to_USD': [0.19, None],
+        'USD': [None, 0.20],
+        'ARS': [200.0, 201.0],
+    })
+    view = report_view(df_gold, currencies=["USD", "EUR"])
+    assert list(view.columns) == ['collected_date', 'base_currency', 'USD']
+    assert list(view['USD']) == [0.19, 0.20]
+
+def test_range_query_reads_only_matching_months_and_weekly_row_groups(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    days = pd.date_range("2025-08-01", "2025-10-31").strftime("%Y-%m-%d")
+    df_silver = pd.concat([
+        silver_day(day, {"USD": 0.19, "EUR": 0.16}).assign(base_currency=base) for day in days for base in ("BRL", "USD")
+    ], ignore_index=True)
+    write_gold_partition(build_gold(df_silver), root=root)
+
+    read_paths = []
+    read_dataset = gold_store._read_dataset
+
+    def spy(paths, *args):
+        read_paths.extend(paths)
+        return read_dataset(paths, *args)
+    monkeypatch.setattr(gold_store, "_read_dataset", spy)
+
+    df = query_gold("2025-09-05", "2025-09-10", root=root)
+    assert read_paths == [os.path.join(root, "year=2025", "month=09", "part-0.parquet")]
+    assert sorted(set(pd.to_datetime(df['collected_date']).dt.strftime("%Y-%m-%d"))) == [
+        f"2025-09-{day:02d}" for day in range(5, 11)
+    ]
+    assert len(df) == 12  # 6 dias x 2 moedas base
+
+    # Row groups de uma semana inteira (7 dias x 2 moedas base), não de 7 linhas
+    metadata = pq.ParquetFile(read_paths[0]).metadata
+    assert metadata.num_row_groups == 5
+    assert [metadata.row_group(i).num_rows for i in range(5)] == [14, 14, 14, 14, 4]
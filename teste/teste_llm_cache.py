@@ -0,0 +1,64 @@
+import os
+import time
+import pytest
+
+from llm import LLMCache, generate_text
+
+class FakeModels:
+    """Simula client.models do SDK Gemini, contando as chamadas à 'rede'."""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        return type("Response", (), {"text": f"resposta {self.calls}"})()
+
+class FakeClient:
+    def __init__(self):
+        self.models = FakeModels()
+
+# --- TESTES UNITÁRIOS ---
+
+def test_second_call_is_served_from_cache(tmp_path):
+    """O mesmo modelo + prompt + dados não deve chamar o LLM duas vezes."""
+    cache = LLMCache(directory=str(tmp_path))
+    client = FakeClient()
+
+    first = generate_text("prompt", client=client, cache=cache)
+    second = generate_text("prompt", client=client, cache=cache)
+
+    assert first == second == "resposta 1"
+    assert client.models.calls == 1
+    totals = cache.save_stats()
+    assert totals["hits"] == 1 and totals["misses"] == 1
+
+def test_source_file_change_invalidates_entry(tmp_path):
+    """Se o arquivo GOLD mudar, a chave muda e o LLM é chamado novamente."""
+    cache = LLMCache(directory=str(tmp_path / "cache"))
+    client = FakeClient()
+    gold_file = tmp_path / "part-0.parquet"
+    gold_file.write_bytes(b"dia 1")
+
+    generate_text("prompt", client=client, source_paths=[str(gold_file)], cache=cache)
+    gold_file.write_bytes(b"dia 2")
+    generate_text("prompt", client=client, source_paths=[str(gold_file)], cache=cache)
+
+    assert client.models.calls == 2
+
+def test_expired_and_lru_entries_are_removed(tmp_path):
+    """Entradas vencidas não são servidas e o tamanho total respeita max_bytes."""
+    cache = LLMCache(directory=str(tmp_path), ttl_seconds=60, max_bytes=10_000)
+    cache.put("antiga", "x" * 4000, "modelo")
+    cache.put("nova", "y" * 4000, "modelo")
+    old_time = time.time() - 120
+    os.utime(tmp_path / "antiga.json", (old_time, old_time))
+
+    cache.put("terceira", "z" * 4000, "modelo")  # Estoura o limite: sai a menos usada
+
+    assert not (tmp_path / "antiga.json").exists()
+    assert cache.get("nova") == "y" * 4000
+    assert cache.stats["evictions"] == 1
+
+    expired_cache = LLMCache(directory=str(tmp_path), ttl_seconds=-1)
+    assert expired_cache.get("nova") is None, "Entradas vencidas não devem ser servidas."
+    assert expired_cache.stats["expired"] == 1
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from llm import LLMCache, generate_text, estimate_tokens
+from llm_prompt import compact_rates_table, comparison_changes, gold_rates
+
+class StreamingModels:
+    """Simula client.models com generate_content_stream (três trechos)."""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content_stream(self, model, contents):
+        self.calls += 1
+        for text in ["Resumo ", None, "Executivo: ", "estável."]:
+            yield type("Chunk", (), {"text": text})()
+
+# --- TESTES UNITÁRIOS ---
+
+def test_compact_table_keeps_requested_currencies_and_top_movers_within_budget():
+    codes = [f"C{i:02d}" for i in range(150)]
+    df_gold = pd.DataFrame([{
+        'collected_date': "2025-09-30", 'base_currency': "BRL",
+        'BRL_to_USD': 0.18735, 'EUR': 0.16, **{code: 1.5 + i for i, code in enumerate(codes)},
+    }])
+    row = pd.Series({'USD_CHANGE_PCT': 0.1, 'EUR_CHANGE_PCT': None, 'EUR_MOM_PCT': -2.0,
+                     **{f"{code}_CHANGE_PCT": i / 10 for i, code in enumerate(codes)}})
+    rates, changes = gold_rates(df_gold), comparison_changes(row)
+
+    table = compact_rates_table(rates, changes, currencies=["USD", "EUR", "JPY"], top_k=3)
+    assert table.splitlines() == [
+        "moeda;taxa;DoD%;MoM%", "USD;0.18735;+0.10;-", "EUR;0.16;-;-2.00",
+        "C149;150.5;+14.90;-", "C148;149.5;+14.80;-", "C147;148.5;+14.70;-",
+    ]
+
+    # O orçamento corta as maiores variações, nunca as moedas pedidas
+    table = compact_rates_table(rates, changes, currencies=["USD", "EUR"], top_k=100, token_budget=20)
+    assert estimate_tokens(table) <= 20 + 15
+    assert table.splitlines()[1:3] == ["USD;0.18735;+0.10;-", "EUR;0.16;-;-2.00"]
+    assert table.endswith("moedas de maior variação fora do orçamento)")
+
+def test_streamed_response_is_forwarded_and_cached(tmp_path):
+    cache = LLMCache(directory=str(tmp_path))
+    client = type("Client", (), {"models": StreamingModels()})()
+    chunks = []
+
+    text = generate_text("prompt", client=client, cache=cache, on_text=chunks.append)
+    assert chunks == ["Resumo ", "Executivo: ", "estável."] and text == "Resumo Executivo: estável."
+
+    # Um acerto do cache chega ao callback de uma vez
+    chunks.clear()
+    assert generate_text("prompt", client=client, cache=cache, on_text=chunks.append) == text
+    assert chunks == [text] and client.models.calls == 1
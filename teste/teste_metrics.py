@@ -0,0 +1,49 @@
+import pytest
+
+import metrics
+
+# --- TESTES UNITÁRIOS ---
+
+def test_stage_timer_records_runs_rows_and_errors():
+    """Cada execução (ok ou erro) entra nos contadores expostos no textfile do Prometheus."""
+
+    @metrics.timed("teste_etapa")
+    def etapa(falhar=False):
+        metrics.record_rows("teste_etapa", "written", 10)
+        if falhar:
+            raise ValueError("falha")
+
+    etapa()
+    with pytest.raises(ValueError):
+        etapa(falhar=True)
+
+    text = metrics.render_prometheus()
+    assert 'pipeline_stage_runs_total{stage="teste_etapa",status="ok"} 1' in text
+    assert 'pipeline_stage_runs_total{stage="teste_etapa",status="error"} 1' in text
+    assert 'pipeline_rows_total{stage="teste_etapa",direction="written"} 20' in text
+
+def test_stage_event_reports_only_this_run(monkeypatch):
+    """Num processo longo (daemon, serviço) cada evento traz as contagens da execução, não o total acumulado."""
+    events = []
+    monkeypatch.setattr(metrics, "_log_event", lambda message, **fields: events.append(fields))
+
+    for rows in (10, 3):
+        with metrics.stage_timer("teste_evento"):
+            metrics.record_rows("teste_evento", "read", rows)
+            metrics.record_bytes("teste_evento", "read", rows * 100)
+    with metrics.stage_timer("teste_evento"):
+        pass
+
+    assert [(event["rows"], event["bytes"]) for event in events] == [
+        ({"read": 10}, {"read": 1000}), ({"read": 3}, {"read": 300}), ({}, {}),
+    ]
+    assert 'pipeline_rows_total{stage="teste_evento",direction="read"} 13' in metrics.render_prometheus()
+
+def test_latency_histogram_buckets_are_cumulative(monkeypatch):
+    metrics.observe_latency("teste_api", 0.3, 200)
+    metrics.observe_latency("teste_api", 3.0, 200)
+
+    text = metrics.render_prometheus()
+    assert 'pipeline_request_duration_seconds_bucket{target="teste_api",status="200",le="0.5"} 1' in text
+    assert 'pipeline_request_duration_seconds_bucket{target="teste_api",status="200",le="5.0"} 2' in text
+    assert 'pipeline_request_duration_seconds_count{target="teste_api",status="200"} 2' in text
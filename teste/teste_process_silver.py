@@ -0,0 +1,78 @@
+import os
+import json
+import pytest
+
+from catalog import bronze_catalog
+from config import BRONZE_DIR, SILVER_MANIFEST, setup_directories
+from process_silver import (
+    backfill_silver, load_silver_manifest, normalize_bronze_file, parse_bronze_snapshot, silver_path_for,
+)
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """DATA_DIR é relativo ("data_layers"): cada teste roda num diretório vazio."""
+    monkeypatch.chdir(tmp_path)
+    setup_directories()
+
+def write_bronze(day, usd, mtime=None, register=True, rates=None):
+    """Grava um arquivo BRONZE; como na coleta, ele é registrado no catálogo (register=False: cópia à mão)."""
+    path = os.path.join(BRONZE_DIR, f"{day}.json")
+    rates = rates or {"BRL": 1, "USD": usd, "EUR": 0.16, "JPY": 27.5}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"result": "success", "base_code": "BRL", "conversion_rates": rates}, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    if register:
+        bronze_catalog().register(path, day, base_currency="BRL", rows=len(rates))
+    return path
+
+# --- TESTES UNITÁRIOS ---
+
+def test_first_run_seeds_the_manifest_from_existing_silver():
+    # Dia normalizado manualmente antes de existir o manifesto
+    normalize_bronze_file(write_bronze("2025-09-29", 0.188))
+    write_bronze("2025-09-30", 0.190)
+
+    manifest = load_silver_manifest()
+    assert manifest["watermark"] == "2025-09-29"
+    assert list(manifest["processed"]) == ["2025-09-29.json"]
+    assert manifest["processed"]["2025-09-29.json"]["silver"] == os.path.basename(silver_path_for("2025-09-29.json"))
+
+    # Só o dia sem SILVER é processado
+    assert backfill_silver(max_workers=1) == [silver_path_for("2025-09-30.json")]
+    with open(SILVER_MANIFEST, 'r', encoding='utf-8') as f:
+        assert json.load(f)["watermark"] == "2025-09-30"
+
+def test_rerun_skips_processed_days_and_picks_up_rewrites_and_dropped_days():
+    for day, usd in (("2025-09-29", 0.188), ("2025-09-30", 0.190)):
+        write_bronze(day, usd, mtime=1_700_000_000)
+    assert len(backfill_silver(max_workers=1)) == 2
+    assert backfill_silver(max_workers=1) == []
+
+    # O dia do watermark foi sobrescrito pela coleta: é reprocessado
+    write_bronze("2025-09-30", 0.195, mtime=1_700_000_100)
+    assert backfill_silver(max_workers=1) == [silver_path_for("2025-09-30.json")]
+
+    # Um dia anterior ao watermark copiado à mão para a BRONZE só entra com a conciliação do catálogo
+    write_bronze("2025-09-28", 0.187, register=False)
+    assert backfill_silver(max_workers=1) == []
+    assert backfill_silver(max_workers=1, sync=True) == [silver_path_for("2025-09-28.json")]
+    assert sorted(load_silver_manifest()["processed"]) == ["2025-09-28.json", "2025-09-29.json", "2025-09-30.json"]
+    assert backfill_silver(max_workers=1) == []
+
+def test_corrupt_bronze_payload_is_skipped():
+    assert parse_bronze_snapshot(b'["nao", "objeto"]', "2025-09-30.json") is None
+    assert parse_bronze_snapshot({"result": "success", "base_code": "BRL", "conversion_rates": "x"}, "2025-09-30.json") is None
+
+def test_fully_quarantined_day_is_recorded_and_not_reread(monkeypatch):
+    import process_silver
+    write_bronze("2025-09-30", -0.19, rates={"BRL": -1, "USD": -0.19, "EUR": 0.0})
+
+    assert backfill_silver(max_workers=1) == []
+    assert load_silver_manifest()["processed"]["2025-09-30.json"]["silver"] is None
+
+    # Na execução seguinte o dia não é relido nem vai de novo para a quarentena
+    quarantined = []
+    monkeypatch.setattr(process_silver, "write_quarantine", quarantined.append)
+    assert backfill_silver(max_workers=1) == []
+    assert quarantined == []
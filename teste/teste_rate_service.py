@@ -0,0 +1,108 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+
+from cross_rates import save_cross_rate_matrices
+from rate_service import RateService, make_server
+
+def silver_day(day, usd, eur):
+    return pd.DataFrame({
+        'collected_date': day,
+        'base_currency': "BRL",
+        'currency': ["BRL", "USD", "EUR"],
+        'rate': [1.0, usd, eur],
+    })
+
+def build_service(directory, **kwargs):
+    # 2025-09-26 (sexta) e 2025-09-29 (segunda): o fim de semana fica sem cotação
+    save_cross_rate_matrices(silver_day("2025-09-26", 0.20, 0.16), directory=directory)
+    save_cross_rate_matrices(silver_day("2025-09-29", 0.25, 0.20), directory=directory)
+    return RateService(directory=directory, **kwargs)
+
+# --- TESTES UNITÁRIOS ---
+
+def test_convert_uses_last_available_day_for_gaps(tmp_path):
+    service = build_service(str(tmp_path))
+
+    assert service.convert("2025-09-29", "BRL", "USD", 100) == 25.0
+    assert service.quote("2025-09-28", "USD", "EUR")["as_of"] == "2025-09-26"
+    assert abs(service.convert("2025-09-28", "USD", "EUR", 10) - 8.0) < 1e-12
+
+    results, as_of = service.convert_bulk(
+        ["2025-09-25", "2025-09-27", "2025-10-05", "2025-09-29"],
+        ["BRL", "BRL", "EUR", "XXX"], ["USD", "USD", "USD", "USD"], [1, 1, 2, 1],
+    )
+    assert np.isnan(results[0]) and np.isnat(as_of[0])  # antes do primeiro dia
+    assert results[1] == 0.20 and str(as_of[1]) == "2025-09-26"
+    assert abs(results[2] - 2.5) < 1e-12 and str(as_of[2]) == "2025-09-29"
+    assert np.isnan(results[3])  # moeda desconhecida
+
+def test_new_gold_day_is_hot_reloaded_and_cache_is_bounded(tmp_path):
+    service = build_service(str(tmp_path), cache_size=2, reload_interval=0)
+    for day in ("2025-09-26", "2025-09-27", "2025-09-28", "2025-09-30"):
+        service.convert(day, "BRL", "USD")
+    assert len(service.vectors) == 2
+    assert service.quote("2025-09-30", "BRL", "USD")["as_of"] == "2025-09-29"
+
+    save_cross_rate_matrices(silver_day("2025-09-30", 0.30, 0.24), directory=str(tmp_path))
+
+    assert service.quote("2025-09-30", "BRL", "USD") == {
+        "date": "2025-09-30", "as_of": "2025-09-30", "from": "BRL", "to": "USD",
+        "amount": 1.0, "rate": 0.30, "result": 0.30,
+    }
+    assert service.stats["reloads"] == 2
+
+def test_vector_read_during_reload_is_not_cached(tmp_path):
+    service = build_service(str(tmp_path), reload_interval=3600)
+    load_vector = service._load_vector
+
+    def load_with_concurrent_reload(as_of, ids):
+        # Um dia novo chega e outra thread recarrega enquanto esta lê a matriz antiga
+        save_cross_rate_matrices(silver_day("2025-09-30", 0.30, 0.24), directory=str(tmp_path))
+        service.reload()
+        return load_vector(as_of, ids)
+    service._load_vector = load_with_concurrent_reload
+
+    assert service.quote("2025-09-30", "BRL", "USD")["as_of"] == "2025-09-29"
+    assert "2025-09-30" not in service.vectors
+    del service._load_vector
+    assert service.quote("2025-09-30", "BRL", "USD")["as_of"] == "2025-09-30"
+
+def test_http_single_and_bulk_requests(tmp_path):
+    server = make_server(build_service(str(tmp_path)), "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with urllib.request.urlopen(f"{url}/convert?date=2025-09-27&from=brl&to=eur&amount=50") as response:
+            assert json.load(response)["result"] == 8.0
+
+        body = json.dumps({"requests": [{"date": "2025-09-29", "from": "USD", "to": "BRL"},
+                                        {"from": "BRL", "to": "JPY"}]}).encode()
+        with urllib.request.urlopen(urllib.request.Request(f"{url}/convert/bulk", data=body)) as response:
+            results = json.load(response)["results"]
+        assert results == [{"result": 4.0, "as_of": "2025-09-29"}, {"result": None, "as_of": "2025-09-29"}]
+
+        # Parâmetro ausente é requisição inválida; par sem cotação é 404
+        for query, status in (("from=brl", 400), ("from=brl&to=xxx", 404)):
+            try:
+                urllib.request.urlopen(f"{url}/convert?{query}")
+            except urllib.error.HTTPError as error:
+                assert error.code == status
+            else:
+                raise AssertionError(f"{query} deveria falhar")
+
+        # Linhas malformadas no lote também são 400 (e o servidor continua respondendo)
+        for rows in (["x"], [{"from": 1, "to": "USD"}], [{"from": "BRL"}], {"from": "BRL", "to": "USD"}):
+            request = urllib.request.Request(f"{url}/convert/bulk", data=json.dumps({"requests": rows}).encode())
+            try:
+                urllib.request.urlopen(request)
+            except urllib.error.HTTPError as error:
+                assert error.code == 400
+            else:
+                raise AssertionError(f"{rows} deveria falhar")
+    finally:
+        server.shutdown()
+        server.server_close()
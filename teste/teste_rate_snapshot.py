@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import pickle
+import subprocess
+import numpy as np
+import pytest
+
+from rate_snapshot import RateSnapshot
+
+PAYLOAD = {
+    "result": "success",
+    "base_code": "BRL",
+    "conversion_rates": {"BRL": 1, "USD": 0.2, "EUR": 0.16, "JPY": "abc", "XYZ": 3.0, "GBP": -0.1},
+}
+
+# --- TESTES UNITÁRIOS ---
+
+def test_parse_and_validate_without_dataframes():
+    snapshot = RateSnapshot.from_payload(json.dumps(PAYLOAD).encode(), "2025-09-30")
+    valid, violations = snapshot.validate()
+
+    assert valid.codes() == ["BRL", "USD", "EUR"]
+    assert {(v['currency'], v['rule'], v['raw_value']) for v in violations} == {
+        ("JPY", "rate_positive", "abc"), ("GBP", "rate_positive", "-0.1"), ("XYZ", "iso_4217_code", "3.0"),
+    }
+
+    # Sem a taxa 1.0 da própria base, a coleta inteira é descartada
+    broken = dict(PAYLOAD, conversion_rates={"BRL": 0.9, "USD": 0.2})
+    valid, violations = RateSnapshot.from_payload(broken, "2025-09-30").validate()
+    assert len(valid) == 0 and {v['rule'] for v in violations} == {"base_self_rate"}
+
+    # Payloads corrompidos (não objeto, taxas fora de um objeto) também são ValueError
+    for payload in ({"result": "error"}, b"[1, 2]", dict(PAYLOAD, conversion_rates=[["USD", 0.2]])):
+        with pytest.raises(ValueError):
+            RateSnapshot.from_payload(payload, "2025-09-30")
+
+def test_rebase_convert_and_zero_copy_exports():
+    snapshot = RateSnapshot.from_codes("2025-09-30", "BRL", ["BRL", "USD", "EUR"], [1.0, 0.2, 0.16])
+    assert snapshot.convert(10, "USD", "EUR") == pytest.approx(8.0)
+    usd = snapshot.rebase("USD")
+    assert usd.base_currency == "USD" and usd.rate("BRL") == pytest.approx(5.0)
+    with pytest.raises(KeyError):
+        snapshot.rate("CHF")
+
+    table = snapshot.to_arrow()
+    assert table.column('currency').to_pylist() == ["BRL", "USD", "EUR"]
+    assert str(table.schema.field('collected_date').type) == "date32[day]"
+    assert np.shares_memory(snapshot.rates_array(), np.frombuffer(snapshot.rates))
+
+    df = snapshot.to_pandas()
+    assert list(df.columns) == ['currency', 'rate', 'base_currency', 'collected_date']
+    assert list(df['rate']) == [1.0, 0.2, 0.16]
+
+    # Entre processos os ids são refeitos a partir dos códigos
+    assert pickle.loads(pickle.dumps(snapshot)).codes() == ["BRL", "USD", "EUR"]
+
+def test_collection_and_snapshot_do_not_import_pandas():
+    code = "import sys, collect_bronze, rate_snapshot; print('pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,106 @@
+import os
+import pytest
+import pandas as pd
+
+import analysis_report
+from gold_store import write_gold_partition
+from gold_index import GoldIndex
+from analysis_report import render_reports, load_render_state, generate_comparison_report
+
+def write_gold(root, usd_rates):
+    days = pd.date_range("2025-09-01", periods=len(usd_rates))
+    df = pd.DataFrame({
+        'collected_date': list(days) * 2,
+        'base_currency': ["BRL"] * len(days) + ["USD"] * len(days),
+        'BRL_to_USD': list(usd_rates) * 2,
+        'BRL_to_EUR': 0.16,
+    })
+    write_gold_partition(df, root=str(root))
+
+# --- TESTES UNITÁRIOS ---
+
+def test_batch_renders_each_day_and_base_and_skips_unchanged(tmp_path):
+    gold, out = tmp_path / "gold", tmp_path / "reports"
+    write_gold(gold, [0.190, 0.191, 0.189, 0.192])
+    kwargs = dict(max_workers=2, output_dir=str(out), gold_root=str(gold))
+
+    rendered = render_reports("2025-09-01", "2025-09-04", **kwargs)
+
+    # 01/09 não tem dia anterior: 3 dias × 2 moedas base
+    assert sorted(rendered) == [(d, b) for d in ("2025-09-02", "2025-09-03", "2025-09-04") for b in ("BRL", "USD")]
+    assert all(os.path.getsize(path) > 0 for path in rendered.values())
+    assert os.path.basename(rendered[("2025-09-02", "USD")]) == "exchange_report_20250902_USD.png"
+    assert len(load_render_state(str(out))) == 6
+    assert render_reports("2025-09-01", "2025-09-04", **kwargs) == {}
+
+    # Mudar 03/09 altera os gráficos de 03/09 e 04/09 (que compara com ele)
+    write_gold(gold, [0.190, 0.191, 0.180, 0.192])
+    rendered = render_reports("2025-09-01", "2025-09-04", **kwargs)
+    assert sorted(rendered) == [(d, b) for d in ("2025-09-03", "2025-09-04") for b in ("BRL", "USD")]
+
+def test_report_uses_the_default_base_rows(tmp_path, monkeypatch):
+    """Com várias moedas base no GOLD, gráfico e título são os da MOEDA_BASE (não da primeira em ordem alfabética)."""
+    monkeypatch.chdir(tmp_path)
+    days = pd.date_range("2025-09-01", periods=2)
+    df_gold = pd.DataFrame({
+        'collected_date': list(days) * 2,
+        'base_currency': ["BRL", "BRL", "USD", "USD"],
+        'EUR': [0.16, 0.16, 0.90, 0.99],
+    })
+    write_gold_partition(df_gold, root=str(tmp_path / "gold"))
+    load = GoldIndex.load
+    monkeypatch.setattr(analysis_report.GoldIndex, "load",
+                        classmethod(lambda cls, *args, **kwargs: load(*args, **kwargs, root=str(tmp_path / "gold"))))
+    monkeypatch.setattr(analysis_report, "MOEDA_BASE", "USD")
+    monkeypatch.setattr(analysis_report, "REPORT_CURRENCIES", ["EUR"])
+    monkeypatch.setattr(analysis_report, "record_file_bytes", lambda *args: None)
+    charts = []
+    monkeypatch.setattr(analysis_report, "render_chart", lambda path, title, labels, values: charts.append((path, title, values)))
+
+    generate_comparison_report(report_date=days[1].date(), use_llm=False)
+    path, title, values = charts[0]
+    assert os.path.basename(path) == "exchange_report_20250902.png" and "Base USD" in title
+    assert title.endswith("02/09/2025 vs 01/09/2025")
+    assert list(values) == [pytest.approx(10.0)]
+
+def test_chart_layout_is_redone_when_y_tick_labels_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_report, "_layout_key", None)
+    ax = analysis_report._get_axes()
+    layouts = []
+    tight_layout = ax.figure.tight_layout
+    monkeypatch.setattr(ax.figure, "tight_layout", lambda: layouts.append(1) or tight_layout())
+
+    labels = ["BRL/USD", "BRL/EUR"]
+    title = analysis_report.chart_title("BRL", pd.Timestamp("2025-09-30"), pd.Timestamp("2025-09-29"))
+    for name, values in (("a", [0.5, -0.2]), ("b", [-0.2, 0.5]), ("c", [1250.0, -980.0])):
+        analysis_report.render_chart(str(tmp_path / f"{name}.png"), title, labels, values)
+    # Mesmos rótulos e mesmos ticks do eixo y: só o primeiro e o terceiro (ticks de 4 dígitos) refazem as margens
+    assert len(layouts) == 2
+
+def test_failed_chart_does_not_lose_the_state_of_the_others(tmp_path, monkeypatch):
+    gold, out = tmp_path / "gold", tmp_path / "reports"
+    # Sexta 05/09 e segunda 08/09: o título mostra a referência as-of, não "ontem"
+    write_gold_partition(pd.DataFrame({
+        'collected_date': pd.to_datetime(["2025-09-05", "2025-09-08"] * 2),
+        'base_currency': ["BRL", "BRL", "USD", "USD"],
+        'BRL_to_USD': [0.190, 0.192, 5.2, 5.3],
+        'BRL_to_EUR': 0.16,
+    }), root=str(gold))
+    render_chart = analysis_report.render_chart
+    titles = []
+
+    def flaky_render(path, title, labels, values):
+        titles.append(title)
+        if "_USD" in os.path.basename(path):
+            raise RuntimeError("falha no desenho")
+        return render_chart(path, title, labels, values)
+    monkeypatch.setattr(analysis_report, "render_chart", flaky_render)
+    kwargs = dict(max_workers=1, output_dir=str(out), gold_root=str(gold))
+
+    assert list(render_reports("2025-09-08", **kwargs)) == [("2025-09-08", "BRL")]
+    assert list(load_render_state(str(out))) == ["exchange_report_20250908.png"]
+    assert titles[0].endswith("08/09/2025 vs 05/09/2025")
+
+    # Na execução seguinte só o gráfico que falhou é refeito
+    monkeypatch.setattr(analysis_report, "render_chart", render_chart)
+    assert list(render_reports("2025-09-08", **kwargs)) == [("2025-09-08", "USD")]
@@ -0,0 +1,86 @@
+import os
+import json
+import pytest
+
+import run_pipeline
+from config import BRONZE_DIR, SILVER_DIR, PIPELINE_STATE_FILE, setup_directories
+from run_pipeline import run_pipeline as run, load_pipeline_state, pending_backfill_files
+from silver_store import read_silver
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """DATA_DIR é relativo ("data_layers"): cada teste roda num diretório vazio."""
+    monkeypatch.chdir(tmp_path)
+    setup_directories()
+
+def write_bronze(day, usd, **extra_rates):
+    path = os.path.join(BRONZE_DIR, f"{day}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"result": "success", "base_code": "BRL",
+                   "conversion_rates": {"BRL": 1, "USD": usd, "EUR": 0.16, "JPY": 27.5, **extra_rates}}, f)
+    return path
+
+# --- TESTES UNITÁRIOS ---
+
+def test_second_run_skips_and_changed_payload_reruns_silver_and_gold():
+    paths = [write_bronze("2025-09-29", 0.188), write_bronze("2025-09-30", 0.190)]
+    assert run(paths, report=False) == {name: ["silver", "gold"] for name in ("2025-09-29.json", "2025-09-30.json")}
+    assert os.path.exists(PIPELINE_STATE_FILE)
+
+    # Entradas iguais: nenhuma etapa roda de novo
+    assert run(paths, report=False) == {}
+    assert pending_backfill_files() == []
+
+    # Payload de um dia regravado: SILVER e GOLD desse dia são refeitas
+    write_bronze("2025-09-30", 0.195)
+    assert run(paths, report=False) == {"2025-09-30.json": ["silver", "gold"]}
+    df_silver = read_silver(os.path.join(SILVER_DIR, "2025-09-30_silver.arrow"))
+    assert df_silver.set_index('currency').loc["USD", "rate"] == 0.195
+
+def test_failed_write_is_not_recorded_in_state(monkeypatch):
+    paths = [write_bronze("2025-09-30", 0.190)]
+
+    save_cross_rate_matrices = run_pipeline.save_cross_rate_matrices
+
+    def failing_save(df_silver):
+        raise OSError("disco cheio")
+    monkeypatch.setattr(run_pipeline, "save_cross_rate_matrices", failing_save)
+    run(paths, report=False)
+
+    state = load_pipeline_state()
+    assert "2025-09-30.json" in state["silver"] and "2025-09-30.json" not in state["gold"]
+    # O dia com GOLD pendente volta na lista do backfill e só a etapa que falhou é refeita
+    assert [os.path.basename(path) for path in pending_backfill_files()] == ["2025-09-30.json"]
+
+    monkeypatch.setattr(run_pipeline, "save_cross_rate_matrices", save_cross_rate_matrices)
+    assert run(paths, report=False) == {"2025-09-30.json": ["gold"]}
+
+def test_report_without_output_is_retried(monkeypatch):
+    import analysis_report
+    paths = [write_bronze("2025-09-30", 0.190)]
+    reports = []
+    monkeypatch.setattr(analysis_report, "generate_comparison_report", lambda **kwargs: reports.append(kwargs) and None)
+
+    # Sem dia anterior no GOLD o relatório não sai: a etapa não é registrada
+    assert run(paths, use_llm=False) == {"2025-09-30.json": ["silver", "gold", "report"]}
+    assert "2025-09-30.json" not in load_pipeline_state()["report"]
+
+    monkeypatch.setattr(analysis_report, "generate_comparison_report", lambda **kwargs: "relatorio.png")
+    assert run(paths, use_llm=False) == {"2025-09-30.json": ["report"]}
+    assert run(paths, use_llm=False) == {}
+    assert len(reports) == 1
+
+def test_failed_quarantine_write_keeps_silver_pending(monkeypatch):
+    # Taxa negativa: a linha vai para a quarentena
+    paths = [write_bronze("2025-09-30", 0.190, GBP=-0.14)]
+    write_quarantine = run_pipeline.write_quarantine
+
+    def failing_quarantine(df_quarantine):
+        raise OSError("disco cheio")
+    monkeypatch.setattr(run_pipeline, "write_quarantine", failing_quarantine)
+    run(paths, report=False)
+    assert "2025-09-30.json" not in load_pipeline_state()["silver"]
+
+    monkeypatch.setattr(run_pipeline, "write_quarantine", write_quarantine)
+    assert run(paths, report=False) == {"2025-09-30.json": ["silver"]}
+    assert "2025-09-30.json" in load_pipeline_state()["silver"]
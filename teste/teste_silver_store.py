@@ -0,0 +1,63 @@
+import os
+import pandas as pd
+
+from catalog import silver_catalog
+from rate_snapshot import RateSnapshot
+from silver_store import (
+    SILVER_SCHEMA, save_silver_file, read_silver_table, read_silver, read_silver_range, pack_silver, export_csv,
+)
+
+def silver_day(day, base, rates):
+    return pd.DataFrame({
+        'currency': list(rates),
+        'rate': list(rates.values()),
+        'base_currency': base,
+        'collected_date': pd.Timestamp(day),
+    })
+
+# --- TESTES UNITÁRIOS ---
+
+def test_typed_file_round_trip_and_csv_export(tmp_path):
+    silver_dir = str(tmp_path)
+    path = os.path.join(silver_dir, "2025-09-30_silver.arrow")
+    df = silver_day("2025-09-30", "BRL", {"USD": 0.18735, "EUR": 0.16, "BRL": 1.0})
+    save_silver_file(df, path, silver_dir)
+
+    table = read_silver_table(path)
+    assert table.schema == SILVER_SCHEMA
+    pd.testing.assert_frame_equal(read_silver(path), df, check_dtype=False)
+    # A tabela Arrow de uma coleta grava no mesmo esquema, sem passar pelo pandas
+    snapshot = RateSnapshot.from_codes("2025-09-30", "USD", ["USD", "BRL"], [1.0, 5.3])
+    save_silver_file(snapshot.to_arrow(), os.path.join(silver_dir, "2025-09-30_USD_silver.arrow"), silver_dir)
+
+    # O CSV exportado na própria SILVER substitui o .arrow (e o catálogo acompanha)
+    exported = export_csv("2025-09-30", silver_dir=silver_dir)
+    assert sorted(name for name in os.listdir(silver_dir) if "_silver" in name) == [
+        "2025-09-30_USD_silver.csv", "2025-09-30_silver.csv",
+    ]
+    assert [entry["path"] for entry in silver_catalog(silver_dir).entries()] == sorted(exported)
+    pd.testing.assert_frame_equal(read_silver(exported[1]), df, check_dtype=False)
+    assert read_silver_range("2025-09-30", "2025-09-30", base_currency="USD", silver_dir=silver_dir)['rate'].tolist() == [1.0, 5.3]
+
+def test_monthly_pack_keeps_days_and_later_rewrites_win(tmp_path):
+    silver_dir = str(tmp_path)
+    for day in ("2025-08-30", "2025-08-31", "2025-09-01"):
+        for base, rate in (("BRL", 0.18), ("USD", 5.3)):
+            save_silver_file(silver_day(day, base, {"EUR": rate}), os.path.join(silver_dir, f"{day}_{base}_silver.arrow"), silver_dir)
+    before = read_silver_range("2025-08-01", "2025-09-30", silver_dir=silver_dir)
+
+    # Só agosto (mês completo) vira pacote
+    assert pack_silver(silver_dir) == [os.path.join(silver_dir, "2025-08_silver.arrow")]
+    assert sorted(name for name in os.listdir(silver_dir) if name.endswith(".arrow")) == [
+        "2025-08_silver.arrow", "2025-09-01_BRL_silver.arrow", "2025-09-01_USD_silver.arrow",
+    ]
+    entry = silver_catalog(silver_dir).entries("2025-08-31", "2025-08-31")[0]
+    assert (entry["date"], entry["date_end"], entry["base_currency"], entry["rows"]) == ("2025-08-30", "2025-08-31", None, 4)
+    assert read_silver_table(entry["path"]).schema == SILVER_SCHEMA
+    pd.testing.assert_frame_equal(read_silver_range("2025-08-01", "2025-09-30", silver_dir=silver_dir), before)
+
+    # Um dia regravado depois do pacote prevalece sobre ele; o catálogo reconstruído lê os intervalos dos dados
+    save_silver_file(silver_day("2025-08-31", "USD", {"EUR": 5.5}), os.path.join(silver_dir, "2025-08-31_USD_silver.arrow"), silver_dir)
+    silver_catalog(silver_dir).rebuild()
+    df = read_silver_range("2025-08-31", "2025-08-31", base_currency="USD", silver_dir=silver_dir)
+    assert df['rate'].tolist() == [5.5]
@@ -2,24 +2,18 @@ import pytest
 import pandas as pd
 import numpy as np
 
-# A função de validação (se ela estivesse separada) seria testada.
-# Como a validação está no process_silver.py, vamos replicar a lógica.
+from quality import validate_rates, ROW_RULES
 
-def clean_and_validate_rates(data: dict) -> pd.DataFrame:
-    """Simula a lógica de validação da Camada Silver."""
-    
-    # 1. Normalizar
-    data_list = [(currency, rate) for currency, rate in data["conversion_rates"].items()]
-    df = pd.DataFrame(data_list, columns=['currency', 'rate'])
-    
-    # 2. Qualidade (A parte que precisa ser testada)
-    initial_count = len(df)
-    df['rate'] = pd.to_numeric(df['rate'], errors='coerce') 
-    df.dropna(subset=['rate'], inplace=True) 
-    df = df[df['rate'] > 0] # Remove negativos/zero
-    
-    # 3. Retorna o resultado
-    return df
+def silver_rows(data: dict) -> pd.DataFrame:
+    """Taxas de uma coleta (base BRL) que passam pelas regras por linha da Camada Silver."""
+    rates = {"BRL": 1.0, **data["conversion_rates"]}
+    df = pd.DataFrame({
+        'currency': list(rates),
+        'rate': pd.Series(list(rates.values()), dtype=object),
+        'base_currency': "BRL",
+        'collected_date': pd.Timestamp("2025-09-30"),
+    })
+    return validate_rates(df, rules=ROW_RULES)[0]
 
 # --- TESTES UNITÁRIOS ---
 
@@ -33,26 +27,27 @@ def test_negative_rates_are_removed():
             "GBP": 6.50
         }
     }
-    df_clean = clean_and_validate_rates(mock_data)
+    df_clean = silver_rows(mock_data)
     
-    # O tamanho final deve ser 2 (USD e GBP)
-    assert len(df_clean) == 2, "Taxas negativas ou zero não foram removidas corretamente."
+    # O tamanho final deve ser 3 (BRL, USD e GBP)
+    assert len(df_clean) == 3, "Taxas negativas ou zero não foram removidas corretamente."
     assert 'EUR' not in df_clean['currency'].values
     assert 'JPY' not in df_clean['currency'].values
 
-def test_non_numeric_rates_are_removed():
+@pytest.mark.parametrize("invalid_rate", ["cinco", None, ""])
+def test_non_numeric_rates_are_removed(invalid_rate):
     """Verifica se taxas não-numéricas são removidas (tratadas como NaN e removidas)."""
     mock_data = {
         "conversion_rates": {
             "USD": 5.00,
-            "EUR": "cinco", # Deve ser removida
+            "EUR": invalid_rate, # Deve ser removida
             "CAD": "4.50"   # Deve ser mantida (string numérica)
         }
     }
-    df_clean = clean_and_validate_rates(mock_data)
+    df_clean = silver_rows(mock_data)
     
-    # O tamanho final deve ser 2 (USD e CAD)
-    assert len(df_clean) == 2, "Taxas não numéricas não foram removidas corretamente."
+    # O tamanho final deve ser 3 (BRL, USD e CAD)
+    assert len(df_clean) == 3, "Taxas não numéricas não foram removidas corretamente."
     assert 'EUR' not in df_clean['currency'].values
 
 def test_all_valid_rates_are_kept():
@@ -64,5 +59,68 @@ def test_all_valid_rates_are_kept():
             "JPY": 0.03
         }
     }
-    df_clean = clean_and_validate_rates(mock_data)
-    assert len(df_clean) == 3, "Taxas válidas não foram mantidas."
\ No newline at end of file
+    df_clean = silver_rows(mock_data)
+    assert len(df_clean) == 4, "Taxas válidas não foram mantidas."
+
+# --- MOTOR DE REGRAS (quality.py) ---
+
+def make_batch(days=15, codes=("BRL", "USD", "EUR"), rates=(1.0, 0.20, 0.16), seed=3):
+    """Lote SILVER bruto de vários dias (base BRL) com pequenas variações diárias."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, day in enumerate(pd.date_range("2025-01-01", periods=days, freq="D")):
+        noise = np.exp(rng.normal(0, 0.002, size=len(codes)))
+        noise[0] = 1.0
+        frames.append(pd.DataFrame({
+            "currency": list(codes),
+            "rate": np.array(rates) * noise,
+            "base_currency": "BRL",
+            "collected_date": day,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def test_row_rules_drop_invalid_codes_duplicates_and_bad_base():
+    """Código fora da ISO-4217, linha duplicada e dia com BRL != 1 vão para a quarentena."""
+    df = make_batch(days=2)
+    df.loc[len(df)] = ["XYZQ", 1.0, "BRL", pd.Timestamp("2025-01-01")]
+    df.loc[len(df)] = ["USD", 0.21, "BRL", pd.Timestamp("2025-01-01")]
+    df.loc[(df["collected_date"] == "2025-01-02") & (df["currency"] == "BRL"), "rate"] = 1.5
+
+    df_valid, df_quarantine = validate_rates(df, rules=ROW_RULES)
+
+    assert set(df_valid["collected_date"]) == {pd.Timestamp("2025-01-01")}
+    assert sorted(df_valid["currency"]) == ["BRL", "EUR", "USD"]
+    rules = df_quarantine.groupby("rule").size()
+    assert rules["iso_4217_code"] == 1
+    assert rules["duplicate"] == 1
+    assert rules["base_self_rate"] == 3
+    assert set(df_quarantine["action"]) == {"drop"}
+
+def test_outliers_are_flagged_but_kept_and_history_is_used():
+    """Um salto de 40% no USD é sinalizado (z-score e %) sem remover a linha da SILVER."""
+    df = make_batch(days=15)
+    history, today = df[df["collected_date"] < "2025-01-15"], df[df["collected_date"] == "2025-01-15"].copy()
+    today.loc[today["currency"] == "USD", "rate"] *= 1.4
+
+    df_valid, df_quarantine = validate_rates(today, history=history)
+
+    assert len(df_valid) == 3
+    assert set(df_quarantine["currency"]) == {"USD"}
+    assert set(df_quarantine["rule"]) == {"zscore_outlier", "pct_jump"}
+    assert set(df_quarantine["action"]) == {"flag"}
+
+def test_batch_validation_matches_day_by_day():
+    """Validar o lote inteiro de uma vez dá as mesmas violações que validar dia a dia."""
+    df = make_batch(days=20)
+    df.loc[(df["collected_date"] == "2025-01-18") & (df["currency"] == "EUR"), "rate"] *= 0.6
+
+    _, batch_quarantine = validate_rates(df)
+    daily = [
+        validate_rates(df[df["collected_date"] == day], history=df[df["collected_date"] < day])[1]
+        for day in df["collected_date"].unique()
+    ]
+    daily_quarantine = pd.concat(daily, ignore_index=True)
+
+    columns = ["collected_date", "currency", "rule"]
+    assert batch_quarantine[columns].values.tolist() == daily_quarantine[columns].values.tolist()
+    assert not batch_quarantine.empty